@@ -56,6 +56,65 @@ class TimpaniAppCfg(object):
 
     # minio vs s3.amazonaws.com vs debug
     s3_store_location = os.environ.get("S3_STORE_LOCATION", "minio:9002")
+    # how many raw store chunks to download ahead while processing (off by default)
+    # and the limit on the total (stored) size of the chunks being prefetched
+    raw_store_prefetch_chunks = int(os.environ.get("RAW_STORE_PREFETCH_CHUNKS", 0))
+    raw_store_prefetch_bytes = int(
+        os.environ.get("RAW_STORE_PREFETCH_BYTES", 256 * 1024 * 1024)
+    )
+    # format for writing raw store chunks to S3 ("jsonl" or "parquet")
+    # and the maximum number of rows in each parquet row group
+    raw_store_chunk_format = os.environ.get("RAW_STORE_CHUNK_FORMAT", "jsonl")
+    raw_store_parquet_row_group_size = int(
+        os.environ.get("RAW_STORE_PARQUET_ROW_GROUP_SIZE", 10000)
+    )
+    # content sources buffer items and write a raw store chunk when either
+    # the number of items or the size of the encoded (uncompressed) items is reached
+    # (each writer holds up to a chunk in memory, so keep these modest)
+    raw_store_chunk_max_items = int(os.environ.get("RAW_STORE_CHUNK_MAX_ITEMS", 5000))
+    raw_store_chunk_max_bytes = int(
+        os.environ.get("RAW_STORE_CHUNK_MAX_BYTES", 32 * 1024 * 1024)
+    )
+    # if set, raw store chunks are cached on local disk in this directory
+    # (see CachingStore) up to a total size
+    raw_store_cache_dir = os.environ.get("RAW_STORE_CACHE_DIR")
+    raw_store_cache_max_bytes = int(
+        os.environ.get("RAW_STORE_CACHE_MAX_BYTES", 10 * 1024 * 1024 * 1024)
+    )
+    # chunks are never rewritten, so cached chunks are trusted unless this is set
+    # (which checks the version of each chunk in the store before using the cache)
+    raw_store_cache_revalidate = (
+        os.environ.get("RAW_STORE_CACHE_REVALIDATE", "false").lower() == "true"
+    )
+    # how long (seconds) the workflow processing holds its claim on a batch of items,
+    # should be well above the time to dispatch a batch (including batch calls to
+    # model services), or another conductor may claim and dispatch the same items
+    claim_lease_seconds = int(os.environ.get("TIMPANI_CLAIM_LEASE_SECONDS", 600))
+    # number of worker processes loading raw store chunks into the content store
+    # during raw import (1 to load chunks sequentially in a single process)
+    raw_import_workers = int(os.environ.get("RAW_IMPORT_WORKERS", 1))
+    # number of junkipedia queries and time bins acquired concurrently (1 to
+    # acquire them one at a time) and the limit on requests per api key
+    junkipedia_max_workers = int(os.environ.get("JUNKIPEDIA_MAX_WORKERS", 1))
+    junkipedia_requests_per_second = float(
+        os.environ.get("JUNKIPEDIA_REQUESTS_PER_SECOND", 5)
+    )
+    # csv content sources stream objects from S3 in ranged requests of this many
+    # bytes, with up to this many requests made ahead in parallel
+    s3_csv_read_part_bytes = int(
+        os.environ.get("S3_CSV_READ_PART_BYTES", 8 * 1024 * 1024)
+    )
+    s3_csv_read_workers = int(os.environ.get("S3_CSV_READ_WORKERS", 4))
+    # outbound http requests (see timpani.util.http_session) keep up to this many
+    # connections open to each host, with default timeouts (seconds) and
+    # retries with exponential backoff for connection failures and 502/503/504
+    http_pool_maxsize = int(os.environ.get("HTTP_POOL_MAXSIZE", 20))
+    http_connect_timeout = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 10))
+    http_read_timeout = float(os.environ.get("HTTP_READ_TIMEOUT", 120))
+    http_max_retries = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+    http_backoff_factor = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.5))
+    # json codec for raw items: "orjson", "json" (stdlib) or "auto" (orjson if installed)
+    json_serializer = os.environ.get("TIMPANI_JSON_SERIALIZER", "auto")
     # updated depending on env so services know what to talk to
     timpani_conductor_api_endpoint = os.environ.get(
         "TIMPANI_CONDUCTOR_API_ENDPOINT", f"http://timpani-conductor.{deploy_env_label}"
@@ -64,6 +123,10 @@ class TimpaniAppCfg(object):
         "TIMPANI_TREND_VIEWER_ENDPOINT",
         f"http://timpani-trend-viewer.{deploy_env_label}",
     )
+    # when true, services send item state callbacks to the conductor in batches
+    coalesce_callbacks = (
+        os.environ.get("TIMPANI_COALESCE_CALLBACKS", "false").lower() == "true"
+    )
     alegre_api_endpoint = os.environ.get(
         "ALEGRE_API_ENDPOINT", f"http://alegre.{deploy_env_label}"
     )
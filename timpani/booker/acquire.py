@@ -1,7 +1,6 @@
 import argparse
 import datetime
 from datetime import timezone
-import requests
 import sentry_sdk
 from timpani.app_cfg import TimpaniAppCfg
 from timpani.workspace_config.workspace_cfg_manager import WorkspaceConfigManager
@@ -19,6 +18,7 @@ from timpani.content_sources.aws_s3_csv_tse_tipline_source import (
 )
 from timpani.content_sources.faker_test_content_source import FakerTestingContentSource
 from timpani.util.run_state import RunState
+from timpani.util.http_session import get_http_session
 
 import timpani.util.timpani_logger
 
@@ -93,6 +93,7 @@ class AcquisitionOrchestrator(object):
         date_id=None,
         trigger_ingest=False,
         limit_downloads=False,
+        run_id=None,
     ):
         """
         Get the releveant updates for all the workspaces, datasources, and registred queries
@@ -118,6 +119,7 @@ class AcquisitionOrchestrator(object):
                         date_id=date_id,
                         trigger_ingest=trigger_ingest,
                         limit_downloads=limit_downloads,
+                        run_id=run_id,
                     )
                 except Exception as e:
                     logging.error(
@@ -134,12 +136,17 @@ class AcquisitionOrchestrator(object):
         date_id=None,
         trigger_ingest=False,
         limit_downloads=False,
+        run_id=None,
     ):
         """
         Get the relavent updates for a workspace, optionally subsetting
         to specific data source and query, and load it into the Raw Store.
         Type of raw store determined by `--env S3_STORE_LOCATION=s3.amazonaws.com`
 
+        The acquisitions for each of the workspace's sources share a run_id. If
+        the run_id of a previous run (with the same date_id) is given, sources
+        that completed are skipped and sources that failed are resumed from the
+        checkpoints recorded in the raw store, instead of downloading again
         """
 
         workspace_cfg = self.workspace_cfgs.get_config_for_workspace(workspace_id)
@@ -181,12 +188,32 @@ class AcquisitionOrchestrator(object):
         # TODO: each of these calls could be passed off to a seperate process
         for source_name in source_types:
             source = self.content_sources[source_name]
-            run = RunState(self.JOB_NAME, date_id=date_id)
+            run = RunState(self.JOB_NAME, date_id=date_id, run_id=run_id)
             partition_id = Store.Partition(
                 workspace_cfg.get_workspace_slug(),
                 source.get_source_name(),
                 run.date_id,
             )
+            if run_id is None:
+                run_id = run.run_id
+            else:
+                previous_run = store.get_partition_run_state(partition_id, run_id)
+                if previous_run is not None:
+                    if previous_run.current_state == run.STATE_COMPLETED:
+                        logging.info(
+                            f"Skipping {source_name} for run {run_id},"
+                            + " it has already completed"
+                        )
+                        continue
+                    if previous_run.current_state == run.STATE_RUNNING:
+                        # the previous attempt didn't record that it failed,
+                        # i.e. the process was killed
+                        previous_run.transitionTo(run.STATE_FAILED)
+                    logging.info(
+                        f"Resuming {source_name} for run {run_id} from checkpoints"
+                        + f" of attempt {previous_run.attempt_id}"
+                    )
+                    run = previous_run
             self.runs.append(run)
             try:
                 run.start_run(
@@ -223,7 +250,7 @@ class AcquisitionOrchestrator(object):
         )
         # "/import_content/<workspace_id>/<source_id>/<date_id>"
         url = f"{self.app_cfg.timpani_conductor_api_endpoint}/import_content/{run.workspace_id}/{run.source_name}/{run.date_id}?trigger_import=True"
-        callback_response = requests.get(url)
+        callback_response = get_http_session("conductor").get(url)
         assert (
             callback_response.ok
         ), f"Unable to process response from Timpani conductor partition import request {url} {callback_response.text}"
@@ -274,6 +301,12 @@ if __name__ == "__main__":
         default=False,
         type=bool,
     )
+    parser.add_argument(
+        "-r",
+        "--run_id",
+        help="run_id of a failed run to resume (with the same date_id)",
+        required=False,
+    )
     app_cfg = TimpaniAppCfg()
 
     sentry_sdk.init(
@@ -282,7 +315,6 @@ if __name__ == "__main__":
         traces_sample_rate=1.0,
     )
 
-    # TODO: run_id (for resuming/rerunning failed downloads)
     args = parser.parse_args()
     print("Starting Content Acquisition Orchestrator with args:{}".format(args))
 
@@ -321,6 +353,7 @@ if __name__ == "__main__":
             date_id=args.date_id,
             trigger_ingest=args.trigger_ingest,
             limit_downloads=args.limit_downloads,
+            run_id=args.run_id,
         )
     else:
         booker.acquire_for_workspace(
@@ -331,4 +364,5 @@ if __name__ == "__main__":
             date_id=args.date_id,
             trigger_ingest=args.trigger_ingest,
             limit_downloads=args.limit_downloads,
+            run_id=args.run_id,
         )
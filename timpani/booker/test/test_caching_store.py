@@ -0,0 +1,185 @@
+import os
+import shutil
+import tempfile
+import unittest
+from timpani.raw_store.store import Store
+from timpani.raw_store.caching_store import CachingStore
+from timpani.raw_store.debugging_file_store import DebuggingFileStore
+from timpani.raw_store.item import Item
+
+
+class TestCachingStore(unittest.TestCase):
+    """
+    Uses the DebuggingFileStore so that these tests can run without any services
+    """
+
+    test_partition_id = Store.Partition("testteam", "testcaching", "20230501")
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.file_store = DebuggingFileStore()
+        # need to delete any content from previous test run
+        self.file_store.delete_partition(self.test_partition_id)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _make_items(self, num_items, prefix="item"):
+        return [
+            Item(
+                run_id="testrun",
+                workspace_id="testteam",
+                source_id="testcaching",
+                query_id="testquery",
+                page_id=None,
+                content_id=f"{prefix}_{i}",
+                content={"text": f"some text {i}"},
+            )
+            for i in range(num_items)
+        ]
+
+    def _list_cache_dir(self):
+        return [
+            name
+            for name in os.listdir(self.cache_dir)
+            if name != CachingStore.LOCK_NAME
+        ]
+
+    def _fetch_content_ids(self, store: Store):
+        return [
+            item.content_id
+            for chunk in store.fetch_item_chunks_in_partition(self.test_partition_id)
+            for item in chunk
+        ]
+
+    def test_read_through_cache(self):
+        store = CachingStore(self.file_store, cache_dir=self.cache_dir)
+        store.append_chunk(self.test_partition_id, self._make_items(3))
+        expected_ids = [f"item_{i}" for i in range(3)]
+
+        # first read fetches from the wrapped store, second from the cache
+        assert self._fetch_content_ids(store) == expected_ids
+        assert (store.hits, store.misses) == (0, 1)
+        assert self._fetch_content_ids(store) == expected_ids
+        assert (store.hits, store.misses) == (1, 1)
+
+        # the cache persists for a new store with the same directory
+        store_2 = CachingStore(self.file_store, cache_dir=self.cache_dir)
+        assert len(store_2.entries) == 1
+        assert self._fetch_content_ids(store_2) == expected_ids
+        assert (store_2.hits, store_2.misses) == (1, 0)
+
+        # new chunks are fetched, cached chunks are not
+        store.append_chunk(self.test_partition_id, self._make_items(2, "more"))
+        assert self._fetch_content_ids(store) == expected_ids + ["more_0", "more_1"]
+        assert (store.hits, store.misses) == (2, 2)
+
+        # chunks are not rewritten, so by default the cached chunks are used
+        # without checking them, but when revalidating modifying a chunk changes
+        # its version, so it is fetched again
+        revalidating = CachingStore(
+            self.file_store, cache_dir=self.cache_dir, revalidate=True
+        )
+        assert self._fetch_content_ids(revalidating) == expected_ids + [
+            "more_0",
+            "more_1",
+        ]
+        assert (revalidating.hits, revalidating.misses) == (0, 2)
+        chunk = next(store.list_chunks_in_partition(self.test_partition_id))
+        file_path = self.file_store.get_file_path(chunk.object_name)
+        modified_ns = os.stat(file_path).st_mtime_ns + 1000
+        os.utime(file_path, ns=(modified_ns, modified_ns))
+        self._fetch_content_ids(revalidating)
+        assert (revalidating.hits, revalidating.misses) == (1, 3)
+        assert self._fetch_content_ids(store) == expected_ids + ["more_0", "more_1"]
+        assert (store.hits, store.misses) == (4, 2)
+
+        # prefetched chunks also go through the cache
+        prefetched = [
+            item.content_id
+            for chunk in store.fetch_item_chunks_in_partition(
+                self.test_partition_id, prefetch_chunks=2
+            )
+            for item in chunk
+        ]
+        assert prefetched == expected_ids + ["more_0", "more_1"]
+        assert (store.hits, store.misses) == (6, 2)
+
+    def test_no_version_requests(self):
+        """
+        Cached chunks are used without asking the store for their versions
+        (a HEAD request per chunk in S3) unless revalidating
+        """
+        versions_requested = []
+
+        def get_chunk_version(object_name):
+            versions_requested.append(object_name)
+            return "v1"
+
+        self.file_store.get_chunk_version = get_chunk_version
+        store = CachingStore(self.file_store, cache_dir=self.cache_dir)
+        store.append_chunk(self.test_partition_id, self._make_items(3))
+        self._fetch_content_ids(store)
+        self._fetch_content_ids(store)
+        assert (store.hits, store.misses) == (1, 1)
+        assert versions_requested == []
+
+    def test_eviction(self):
+        store = CachingStore(self.file_store, cache_dir=self.cache_dir)
+        store.append_chunk(self.test_partition_id, self._make_items(3))
+        self._fetch_content_ids(store)
+        chunk_size = store.cache_bytes
+        assert chunk_size > 0
+
+        # the least recently used chunk is evicted to make space
+        store.MAX_BYTES = chunk_size + 1
+        store.append_chunk(self.test_partition_id, self._make_items(3, "more"))
+        assert len(self._fetch_content_ids(store)) == 6
+        assert len(store.entries) == 1
+        assert store.cache_bytes <= store.MAX_BYTES
+        assert self._list_cache_dir() == list(store.entries.keys())
+
+        # a cache that is too small for a chunk still returns it
+        store.MAX_BYTES = 1
+        assert len(self._fetch_content_ids(store)) == 6
+        assert len(store.entries) == 0
+        assert self._list_cache_dir() == []
+
+    def test_shared_cache_dir(self):
+        """
+        Stores in different processes (i.e. raw import workers) can share a cache
+        """
+        store = CachingStore(self.file_store, cache_dir=self.cache_dir)
+        other_store = CachingStore(self.file_store, cache_dir=self.cache_dir)
+        store.append_chunk(self.test_partition_id, self._make_items(3))
+        store.append_chunk(self.test_partition_id, self._make_items(3, "more"))
+        expected_ids = self._fetch_content_ids(store)
+        assert len(expected_ids) == 6
+        # the chunks cached by the other store are found without scanning the cache
+        assert self._fetch_content_ids(other_store) == expected_ids
+        assert (other_store.hits, other_store.misses) == (2, 0)
+
+        # chunks evicted by the other store are downloaded again
+        other_store.clear_cache()
+        assert self._fetch_content_ids(store) == expected_ids
+        assert (store.hits, store.misses) == (0, 4)
+
+        # eviction accounts for the chunks cached by both stores
+        chunk_size = max(store.entries.values())
+        other_store.MAX_BYTES = 2 * chunk_size
+        store.append_chunk(self.test_partition_id, self._make_items(3, "new"))
+        self._fetch_content_ids(other_store)
+        assert other_store.cache_bytes <= other_store.MAX_BYTES
+        assert len(self._list_cache_dir()) == 2
+
+        # only stale temp files are removed, not downloads in progress elsewhere
+        in_progress = os.path.join(self.cache_dir, "in_progress_123_abc.tmp")
+        stale = os.path.join(self.cache_dir, "stale_456_def.tmp")
+        for path in [in_progress, stale]:
+            with open(path, "wb") as f:
+                f.write(b"partial")
+        stale_time = os.stat(stale).st_mtime - CachingStore.STALE_TEMP_SECONDS - 1
+        os.utime(stale, (stale_time, stale_time))
+        CachingStore(self.file_store, cache_dir=self.cache_dir)
+        assert os.path.exists(in_progress)
+        assert not os.path.exists(stale)
@@ -88,6 +88,16 @@ class TestCloudStore(unittest.TestCase):
         )
         assert obj_name is not None
 
+        # check the partition manifest was updated with the chunk
+        manifest = store.get_partition_manifest(self.test_partition_id)
+        assert manifest.get_object_names() == [obj_name]
+        assert manifest.get_num_items() == 2
+        assert (
+            manifest.chunks[0]["min_content_id"]
+            <= "118550062"
+            <= manifest.chunks[0]["max_content_id"]
+        )
+
         # try to fetch it back and confirm text unchanged
         raw_obj = store.fetch_chunk(object_name=obj_name)
         # parse json lines
@@ -126,6 +136,29 @@ class TestCloudStore(unittest.TestCase):
         assert len(chunks) == 1, f"expected one chunk in partition found {len(chunks)}"
         assert len(chunks[0].splitlines()) == 2
 
+        # check streaming the parsed items from the chunks
+        item_chunks = [
+            list(chunk)
+            for chunk in store.fetch_item_chunks_in_partition(self.test_partition_id)
+        ]
+        assert len(item_chunks) == 1
+        assert [item.content_id for item in item_chunks[0]] == [
+            test_item_1.content_id,
+            test_item_2.content_id,
+        ]
+        assert item_chunks[0][0].content == self.test_content_1
+
+        # check the same items are returned when chunks are prefetched
+        prefetched_chunks = [
+            list(chunk)
+            for chunk in store.fetch_item_chunks_in_partition(
+                self.test_partition_id, prefetch_chunks=2
+            )
+        ]
+        assert [item.content_id for item in prefetched_chunks[0]] == [
+            item.content_id for item in item_chunks[0]
+        ]
+
     def test_minio_local_append_and_fetch_chunk(self):
         """
         Test object store and retrevial for local minio S3 configuration
@@ -138,6 +171,164 @@ class TestCloudStore(unittest.TestCase):
         cs.delete_partition(self.test_partition_id)
         self._local_append_and_fetch_chunk(cs)
 
+    def test_minio_local_parquet_append_and_fetch_chunk(self):
+        """
+        Test storing chunks as parquet in local minio, and that older
+        jsonl chunks in the partition can still be read
+        """
+        cs = self._minio_local_login()
+        cs.delete_partition(self.test_partition_id)
+        jsonl_name = cs.append_chunk(
+            partition_id=self.test_partition_id,
+            payload=[
+                Item(
+                    run_id="testrun",
+                    workspace_id="testteam",
+                    source_id="testsource",
+                    query_id="testquery",
+                    page_id=None,
+                    content_id="jsonl_item",
+                    content=self.test_content_2,
+                )
+            ],
+        )
+        assert jsonl_name.endswith(".jsonl.gz")
+
+        pq = CloudStore(
+            store_location=self.MINIO_S3_TEST_STORE_LOCATION,
+            chunk_format="parquet",
+            row_group_size=1,
+        )
+        pq.login_and_validate(
+            access_key=self.app_cfg.minio_user,
+            secret_key=self.app_cfg.minio_password,
+        )
+        test_item_1 = Item(
+            run_id="testrun",
+            workspace_id="testteam",
+            source_id="testsource",
+            query_id="testquery",
+            content_id="118550062",
+            page_id="0",
+            content=self.test_content_1,
+        )
+        test_item_2 = Item(
+            run_id="testrun",
+            workspace_id="testteam",
+            source_id="testsource",
+            query_id="testquery",
+            page_id=None,
+            content_id=None,
+            content=self.test_content_2,
+        )
+        parquet_name = pq.append_chunk(
+            partition_id=self.test_partition_id, payload=[test_item_1, test_item_2]
+        )
+        assert parquet_name.endswith(".parquet")
+
+        # jsonl text is still available for parquet chunks
+        rows = pq.fetch_chunk(object_name=parquet_name).splitlines()
+        assert rows[0] == test_item_1.toJSON()
+
+        # both chunks are read back from the partition
+        items = [
+            item
+            for chunk in pq.fetch_item_chunks_in_partition(self.test_partition_id)
+            for item in chunk
+        ]
+        assert [item.content_id for item in items] == [
+            "jsonl_item",
+            test_item_1.content_id,
+            test_item_2.content_id,
+        ]
+        assert items[1].content == self.test_content_1
+        assert items[1].created_at == test_item_1.created_at
+        pq.delete_partition(self.test_partition_id)
+
+    def test_minio_local_chunk_writer(self):
+        """
+        Test that the chunk writer buffers pages of items into chunks
+        of the maximum number of items
+        """
+        cs = self._minio_local_login()
+        cs.delete_partition(self.test_partition_id)
+        with cs.chunk_writer(self.test_partition_id, max_items=4) as writer:
+            for page in range(3):
+                writer.write_items(
+                    [
+                        Item(
+                            run_id="testrun",
+                            workspace_id="testteam",
+                            source_id="testsource",
+                            query_id="testquery",
+                            page_id=page,
+                            content_id=f"item_{page}_{i}",
+                            content=self.test_content_2,
+                        )
+                        for i in range(3)
+                    ]
+                )
+        # 9 items written in chunks of 4, 4 and the remaining 1
+        assert len(writer.object_names) == 3
+        manifest = cs.get_partition_manifest(self.test_partition_id)
+        assert [chunk["num_items"] for chunk in manifest.chunks] == [4, 4, 1]
+        items = [
+            item
+            for chunk in cs.fetch_item_chunks_in_partition(self.test_partition_id)
+            for item in chunk
+        ]
+        assert [item.content_id for item in items] == [
+            f"item_{page}_{i}" for page in range(3) for i in range(3)
+        ]
+        cs.delete_partition(self.test_partition_id)
+
+    def test_minio_local_compact_partition(self):
+        """
+        Test that compacting a partition merges its small chunks
+        without losing or reordering the items
+        """
+        cs = self._minio_local_login()
+        cs.delete_partition(self.test_partition_id)
+        old_names = []
+        for page in range(5):
+            old_names.append(
+                cs.append_chunk(
+                    partition_id=self.test_partition_id,
+                    payload=[
+                        Item(
+                            run_id="testrun",
+                            workspace_id="testteam",
+                            source_id="testsource",
+                            query_id="testquery",
+                            page_id=page,
+                            content_id=f"item_{page}_{i}",
+                            content=self.test_content_2,
+                        )
+                        for i in range(3)
+                    ],
+                )
+            )
+        assert cs.compact_partition(self.test_partition_id) == (5, 1)
+
+        manifest = cs.get_partition_manifest(self.test_partition_id)
+        assert manifest.get_num_items() == 15
+        assert manifest.get_object_names()[0] not in old_names
+        items = [
+            item
+            for chunk in cs.fetch_item_chunks_in_partition(self.test_partition_id)
+            for item in chunk
+        ]
+        assert [item.content_id for item in items] == [
+            f"item_{page}_{i}" for page in range(5) for i in range(3)
+        ]
+        # the small chunks have been removed
+        listed = [
+            chunk.object_name
+            for chunk in cs._list_chunk_objects(self.test_partition_id)
+        ]
+        assert listed == manifest.get_object_names()
+        cs.delete_partition(self.test_partition_id)
+
     # don't run these tests in the CI environment because it is
     # fire walled from AWS resources
     @unittest.skipIf(
@@ -0,0 +1,233 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from timpani.raw_store.store import Store
+from timpani.raw_store.debugging_file_store import DebuggingFileStore
+from timpani.raw_store.item import Item
+from timpani.util.run_state import RunState
+
+
+class DeferredManifestStore(DebuggingFileStore):
+    """
+    Counts the chunks appended with defer_manifest and the manifest commits,
+    like a store that keeps partition manifests
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.uncommitted = 0
+        self.commits = []
+
+    def append_chunk_buffer(self, partition_id, chunk_buffer, defer_manifest=False):
+        if defer_manifest:
+            self.uncommitted += 1
+        return super().append_chunk_buffer(partition_id, chunk_buffer)
+
+    def commit_manifest(self, partition_id):
+        self.commits.append(self.uncommitted)
+        self.uncommitted = 0
+
+    def get_num_uncommitted_chunks(self, partition_id):
+        return self.uncommitted
+
+
+class TestDebuggingFileStore(unittest.TestCase):
+    # load in a large example json blob from test file
+    with open("timpani/booker/test/test_item_contents_1.json") as json_file_1:
+        test_content_1 = json.load(
+            json_file_1,
+            strict=False,  # because there are \n and \t
+        )
+
+    test_content_2 = json.loads(
+        """
+        {
+            "data": "I'm a json blob with no ids, add strange things to me to break parsers"
+        }
+        """,
+        strict=False,  # because there are \n and \t
+    )
+
+    test_partition_id = Store.Partition("testteam", "testsource", "20230501")
+
+    def setUp(self):
+        self.base_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.base_path, ignore_errors=True)
+
+    def _append_and_fetch_chunks(self, store: DebuggingFileStore):
+        test_item_1 = Item(
+            run_id="testrun",
+            workspace_id="testteam",
+            source_id="testsource",
+            query_id="testquery",
+            page_id=None,
+            content_id="118550062",
+            content=self.test_content_1,
+        )
+        test_item_2 = Item(
+            run_id="testrun",
+            workspace_id="testteam",
+            source_id="testsource",
+            query_id="testquery",
+            page_id=0,
+            content_id="missing",
+            content=self.test_content_2,
+        )
+        obj_name_1 = store.append_chunk(
+            partition_id=self.test_partition_id, payload=[test_item_1, test_item_2]
+        )
+        obj_name_2 = store.append_chunk(
+            partition_id=self.test_partition_id, payload=[test_item_2]
+        )
+        # same layout as the CloudStore keys
+        assert obj_name_1.startswith(
+            "content_items/date_id=20230501/testteam_testsource_"
+        )
+        assert os.path.exists(store.get_file_path(obj_name_1))
+
+        # try to fetch it back and confirm text unchanged
+        rows = store.fetch_chunk(object_name=obj_name_1).split("\n")
+        assert rows[0] == test_item_1.toJSON()
+        assert json.loads(rows[1], strict=False)["content"] == self.test_content_2
+
+        # chunks are listed in the order they were written
+        chunks = list(store.list_chunks_in_partition(self.test_partition_id))
+        assert [chunk.object_name for chunk in chunks] == [obj_name_1, obj_name_2]
+        assert len(list(store.fetch_chunks_in_partition(self.test_partition_id))) == 2
+
+        # parsed items, with and without prefetching
+        for prefetch_chunks in [0, 2]:
+            items = [
+                item
+                for chunk in store.fetch_item_chunks_in_partition(
+                    self.test_partition_id, prefetch_chunks=prefetch_chunks
+                )
+                for item in chunk
+            ]
+            assert [item.content_id for item in items] == [
+                "118550062",
+                "missing",
+                "missing",
+            ]
+            assert items[0].content == self.test_content_1
+            assert items[0].created_at == test_item_1.created_at
+
+        # other partitions are not affected by deleting
+        other_partition = Store.Partition("testteam", "testsource2", "20230501")
+        store.append_chunk(partition_id=other_partition, payload=[test_item_1])
+        store.delete_partition(self.test_partition_id)
+        assert list(store.list_chunks_in_partition(self.test_partition_id)) == []
+        assert len(list(store.list_chunks_in_partition(other_partition))) == 1
+
+    def test_append_and_fetch_chunks(self):
+        store = DebuggingFileStore(base_path=self.base_path)
+        self._append_and_fetch_chunks(store)
+
+    def test_uncompressed_append_and_fetch_chunks(self):
+        store = DebuggingFileStore(base_path=self.base_path, compress=False)
+        self._append_and_fetch_chunks(store)
+
+    def test_chunk_writer_when_stored(self):
+        """
+        make sure chunk writer callbacks are only called once the items are stored
+        """
+        store = DebuggingFileStore(base_path=self.base_path)
+        stored = []
+        items = [
+            Item("testrun", "testteam", "testsource", "testquery", 0, str(i), {})
+            for i in range(5)
+        ]
+        with store.chunk_writer(self.test_partition_id, max_items=2) as writer:
+            writer.write_items(items[:1], on_stored=lambda: stored.append(1))
+            assert stored == []
+            # the second item fills the chunk, but the third is still buffered
+            writer.write_items(items[1:3], on_stored=lambda: stored.append(3))
+            assert stored == [1]
+            writer.write_items(items[3:4], on_stored=lambda: stored.append(4))
+            assert stored == [1, 3, 4]
+            writer.write_items(items[4:])
+            writer.when_stored(lambda: stored.append(5))
+            assert stored == [1, 3, 4]
+        assert stored == [1, 3, 4, 5]
+        assert len(writer.object_names) == 3
+
+    def test_chunk_writer_batches_manifest(self):
+        """
+        make sure the chunk writer commits chunks to the manifest in batches, and
+        only calls the callbacks once their chunks are committed
+        """
+        store = DeferredManifestStore(base_path=self.base_path)
+        stored = []
+        with store.chunk_writer(self.test_partition_id, max_items=1) as writer:
+            writer.MANIFEST_BATCH_CHUNKS = 3
+            for i in range(5):
+                item = Item("testrun", "testteam", "testsource", "testquery", 0, i, {})
+                writer.write_items([item], on_stored=lambda i=i: stored.append(i))
+                if i == 1:
+                    # the chunks are stored, but not yet in the manifest
+                    assert stored == []
+            assert store.commits == [3]
+            assert stored == [0, 1, 2]
+        assert store.commits == [3, 2]
+        assert stored == [0, 1, 2, 3, 4]
+        assert len(writer.object_names) == 5
+
+    def test_compaction_not_supported(self):
+        """
+        stores without partition manifests report that they can't be compacted
+        """
+        store = DebuggingFileStore(base_path=self.base_path)
+        assert not store.supports_compaction()
+        with self.assertRaises(NotImplementedError) as context:
+            store.compact_partition(self.test_partition_id)
+        assert "not supported by DebuggingFileStore" in str(context.exception)
+
+    def test_record_partition_state(self):
+        """
+        make sure partition state writes out correctly
+        """
+        store = DebuggingFileStore(base_path=self.base_path)
+        state = RunState("test_run")
+        store.record_partition_run_state(state, self.test_partition_id)
+        state.transitionTo(state.STATE_RUNNING)
+        store.record_partition_run_state(state, self.test_partition_id)
+        states_path = os.path.join(self.base_path, "content_states/date_id=20230501")
+        # the state of the run is replaced, not added to
+        assert os.listdir(states_path) == [
+            f"testteam_testsource_{state.run_id}_state.jsonl"
+        ]
+        # states are not chunks of the partition
+        assert list(store.list_chunks_in_partition(self.test_partition_id)) == []
+
+    def test_get_partition_run_state(self):
+        """
+        make sure the latest state of a run can be read back to resume it
+        """
+        store = DebuggingFileStore(base_path=self.base_path)
+        state = RunState("test_run", date_id="20230501")
+        other_state = RunState("test_run", date_id="20230501")
+        state.transitionTo(state.STATE_RUNNING)
+        store.record_partition_run_state(state, self.test_partition_id)
+        state.record_progress("query_1", next_url="https://example.com?page=2")
+        store.record_partition_run_state(state, self.test_partition_id)
+        store.record_partition_run_state(other_state, self.test_partition_id)
+        state.transitionTo(state.STATE_FAILED)
+        store.record_partition_run_state(state, self.test_partition_id)
+
+        resumed = store.get_partition_run_state(self.test_partition_id, state.run_id)
+        assert resumed.to_json() == state.to_json()
+        assert resumed.current_state == state.STATE_FAILED
+        assert resumed.get_progress("query_1") == {
+            "next_url": "https://example.com?page=2"
+        }
+        # the resumed run can be restarted
+        resumed.transitionTo(resumed.STATE_RUNNING)
+        assert resumed.attempt_num == 2
+
+        assert store.get_partition_run_state(self.test_partition_id, "run_x") is None
+        other_partition = Store.Partition("testteam", "testsource2", "20230501")
+        assert store.get_partition_run_state(other_partition, state.run_id) is None
@@ -1,10 +1,23 @@
+import json
+import shutil
+import tempfile
+import time
+import threading
 import unittest
 import datetime
 import requests
+from unittest.mock import patch
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
 
 from timpani.workspace_config.test_workspace_cfg import TestWorkspaceConfig
 from timpani.content_sources.junkipedia_content_source import JunkipediaContentSource
 from timpani.raw_store.debugging_file_store import DebuggingFileStore
+from timpani.raw_store.store import Store
+from timpani.raw_store.chunk_writer import ChunkWriter
+from timpani.util.rate_limiter import RateLimiter
 from timpani.util.run_state import RunState
 from timpani.app_cfg import TimpaniAppCfg
 
@@ -84,5 +97,273 @@ class TestJunkipedia(unittest.TestCase):
             )
 
 
+class FakeJunkipediaResponse(object):
+    """
+    Stands in for the requests response of a junkipedia page
+    """
+
+    def __init__(self, page_obj, status_code=200):
+        self.status_code = status_code
+        self.text = json.dumps(page_obj)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+
+class TestJunkipediaConcurrentAcquisition(unittest.TestCase):
+    """
+    Offline tests of acquiring several queries concurrently, with the junkipedia
+    API replaced by a fake that pages through posts published at known times
+    """
+
+    queries = {
+        "list_1": "/posts?lists=1",
+        "list_2": "/posts?lists=2",
+        "list_3": "/posts?lists=3",
+        "broken": "/posts?lists=666",
+    }
+
+    # the fake api time filters use the same conversion to epoch seconds
+    day_start = int(datetime.datetime(2023, 5, 1).strftime("%s"))
+
+    def setUp(self):
+        self.base_path = tempfile.mkdtemp()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.num_requests = 0
+        # (list_id, published_at_from, page) of each page requested
+        self.requested_pages = []
+        # (list_id, page) of pages that fail (once) with a server error
+        self.failing_pages = set()
+        # publish times of the posts in each list, 4 in each half of the day
+        self.posts = {
+            list_id: [self.day_start + hour * 3600 for hour in [1, 5, 9, 11, 13, 17]]
+            + [self.day_start + 23 * 3600 + i for i in range(2)]
+            for list_id in ["1", "2", "3"]
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.base_path, ignore_errors=True)
+
+    def fake_get(self, url, headers=None, timeout=None):
+        assert headers["Authorization"] == "Bearer fake_api_key"
+        with self.lock:
+            self.in_flight += 1
+            self.num_requests += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.01)
+            params = parse_qs(urlparse(url).query)
+            list_id = params["lists"][0]
+            if list_id == "666":
+                return FakeJunkipediaResponse({"errors": ["not a list"]})
+            published_from = int(params["published_at_from"][0])
+            published_to = int(params["published_at_to"][0])
+            posts = [
+                published_at
+                for published_at in self.posts[list_id]
+                if published_from <= published_at < published_to
+            ]
+            page = int(params.get("page", ["1"])[-1])
+            per_page = int(params["per_page"][0])
+            with self.lock:
+                self.requested_pages.append((list_id, published_from, page))
+                if (list_id, page) in self.failing_pages:
+                    self.failing_pages.remove((list_id, page))
+                    return FakeJunkipediaResponse({}, status_code=500)
+            next_url = None
+            if page * per_page < len(posts):
+                next_url = url + f"&page={page + 1}"
+            page_posts = posts[(page - 1) * per_page : page * per_page]
+            return FakeJunkipediaResponse(
+                {
+                    "data": [{"id": f"{list_id}_{p}"} for p in page_posts],
+                    "links": {"next": next_url},
+                    "meta": {
+                        "total_posts": len(posts),
+                        "posts_count": (page - 1) * per_page + len(page_posts),
+                    },
+                }
+            )
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def patch_api(self, jnk: JunkipediaContentSource, max_workers=4):
+        """
+        Context manager replacing the api with fake_get
+        """
+        return_value = ExitStack()
+        return_value.enter_context(
+            patch.object(jnk.app_cfg, "junkipedia_max_workers", max_workers)
+        )
+        return_value.enter_context(
+            patch.object(jnk.app_cfg, "junkipedia_requests_per_second", 1000)
+        )
+        return_value.enter_context(patch.dict(RateLimiter.shared_limiters, clear=True))
+        return_value.enter_context(
+            patch("requests.Session.get", side_effect=self.fake_get)
+        )
+        return return_value
+
+    @patch("timpani.content_sources.junkipedia_content_source.AccessSSM")
+    def test_concurrent_acquisition(self, mock_ssm):
+        mock_ssm.return_value.get_secret_for_workspace.return_value = "fake_api_key"
+        workspace_cfg = TestWorkspaceConfig()
+        workspace_cfg.junkipedia_queries = self.queries
+        store = DebuggingFileStore(base_path=self.base_path)
+        run_state = RunState("test_acquire", date_id="20230501")
+        partition_id = Store.Partition(
+            workspace_cfg.get_workspace_slug(), "junkipedia", "20230501"
+        )
+
+        jnk = JunkipediaContentSource()
+        jnk.NUM_SUB_TIME_BINS = 2
+        jnk.MAX_ITEMS_PER_BIN = 4
+        with self.patch_api(jnk):
+            # the broken query fails the run, but only after the others complete
+            with self.assertRaises(ValueError):
+                jnk.acquire_new_content(workspace_cfg, store, run_state, partition_id)
+        assert self.max_in_flight > 1, "expected concurrent requests"
+
+        for query_id in ["list_1", "list_2", "list_3"]:
+            assert run_state.query_results[query_id] == {
+                "state": run_state.STATE_COMPLETED,
+                "num_items": 8,
+                "error": None,
+            }
+        assert run_state.query_results["broken"]["state"] == run_state.STATE_FAILED
+        assert "not a list" in run_state.query_results["broken"]["error"]
+
+        items = [
+            item
+            for chunk in store.fetch_item_chunks_in_partition(partition_id)
+            for item in chunk
+        ]
+        assert len(items) == 24
+        assert len(set(item.content_id for item in items)) == 24
+        # the 6 time bins of the good queries share a chunk for each worker
+        assert len(list(store.list_chunks_in_partition(partition_id))) <= 4
+
+    @patch("timpani.content_sources.junkipedia_content_source.AccessSSM")
+    def test_resume_failed_run(self, mock_ssm):
+        mock_ssm.return_value.get_secret_for_workspace.return_value = "fake_api_key"
+        workspace_cfg = TestWorkspaceConfig()
+        workspace_cfg.junkipedia_queries = {"list_1": "/posts?lists=1"}
+        store = DebuggingFileStore(base_path=self.base_path)
+        run_state = RunState("test_acquire", date_id="20230501")
+        partition_id = Store.Partition(
+            workspace_cfg.get_workspace_slug(), "junkipedia", "20230501"
+        )
+        # the third page of one of the time bins fails
+        self.failing_pages = {("1", 3)}
+
+        jnk = JunkipediaContentSource()
+        jnk.NUM_SUB_TIME_BINS = 2
+        jnk.MAX_ITEMS_PER_BIN = 4
+        jnk.JUNKIPEDIA_API_PAGE_SIZE = 1
+        # store a chunk (and so a checkpoint) for every page
+        with self.patch_api(jnk), patch.object(ChunkWriter, "MAX_ITEMS", 1):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                jnk.acquire_new_content(workspace_cfg, store, run_state, partition_id)
+        items = [
+            item
+            for chunk in store.fetch_item_chunks_in_partition(partition_id)
+            for item in chunk
+        ]
+        assert len(items) == 6
+
+        # a retry of the run resumes from the checkpoints recorded in the store
+        resumed_state = store.get_partition_run_state(partition_id, run_state.run_id)
+        assert resumed_state.checkpoints == run_state.checkpoints
+        assert store.get_partition_run_state(partition_id, "some_other_run_id") is None
+        self.requested_pages = []
+        jnk = JunkipediaContentSource()
+        jnk.NUM_SUB_TIME_BINS = 2
+        jnk.MAX_ITEMS_PER_BIN = 4
+        jnk.JUNKIPEDIA_API_PAGE_SIZE = 1
+        with self.patch_api(jnk), patch.object(ChunkWriter, "MAX_ITEMS", 1):
+            jnk.acquire_new_content(workspace_cfg, store, resumed_state, partition_id)
+
+        # without probing the bins again, or requesting the stored pages
+        assert sorted(page for _, _, page in self.requested_pages) == [3, 4]
+        assert len(set(bin_start for _, bin_start, _ in self.requested_pages)) == 1
+        assert resumed_state.query_results["list_1"]["num_items"] == 8
+        items = [
+            item
+            for chunk in store.fetch_item_chunks_in_partition(partition_id)
+            for item in chunk
+        ]
+        assert len(items) == 8
+        assert len(set(item.content_id for item in items)) == 8
+
+    def test_adaptive_time_bins(self):
+        # a burst of posts in a few minutes, and a few quiet posts
+        burst_start = self.day_start + 15 * 3600
+        self.posts["1"] = sorted(
+            [burst_start + i * 10 for i in range(30)]
+            + [self.day_start + hour * 3600 for hour in [2, 8, 20]]
+        )
+        range_start = datetime.datetime(2023, 5, 1)
+        range_end = datetime.datetime(2023, 5, 2)
+
+        jnk = JunkipediaContentSource()
+        jnk.MAX_ITEMS_PER_BIN = 10
+        with self.patch_api(jnk):
+            time_bins = jnk.get_query_time_bins(
+                "/posts?lists=1", "fake_api_key", range_start, range_end
+            )
+            num_probes = self.num_requests
+
+            # the bins cover the range without gaps
+            assert time_bins[0][0] == range_start
+            assert time_bins[-1][1] == range_end
+            for previous_bin, next_bin in zip(time_bins, time_bins[1:]):
+                assert previous_bin[1] == next_bin[0]
+
+            # and each has few enough items to fetch without truncation
+            bin_counts = [
+                jnk.probe_query_count("/posts?lists=1", "fake_api_key", *time_bin)
+                for time_bin in time_bins
+            ]
+            assert sum(bin_counts) == 33
+            assert max(bin_counts) <= 10, f"bins have {bin_counts} items"
+            # the burst was split, but the quiet parts of the day were merged
+            assert 3 <= len(time_bins) <= 6, f"{len(time_bins)} bins"
+
+            # probes of the same bins are cached
+            self.num_requests = 0
+            assert (
+                jnk.get_query_time_bins(
+                    "/posts?lists=1", "fake_api_key", range_start, range_end
+                )
+                == time_bins
+            )
+            assert self.num_requests == 0
+
+            # concurrent probes of a new bin only request it once
+            new_bin = (range_start, range_start + datetime.timedelta(minutes=7))
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                counts = list(
+                    pool.map(
+                        lambda _: jnk.probe_query_count(
+                            "/posts?lists=1", "fake_api_key", *new_bin
+                        ),
+                        range(4),
+                    )
+                )
+            assert counts == [0, 0, 0, 0]
+            assert self.num_requests == 1
+        assert num_probes < 20, f"made {num_probes} probe requests"
+
+
 if __name__ == "__main__":
     unittest.main()
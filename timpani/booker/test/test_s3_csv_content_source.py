@@ -0,0 +1,108 @@
+import gzip
+import unittest
+from unittest.mock import MagicMock
+from timpani.content_sources.aws_s3_csv_content_source import AWSS3CSVContentSource
+from timpani.test.test_s3_range_reader import FakeS3Client
+
+
+class RowsContentSource(AWSS3CSVContentSource):
+    """
+    Returns the csv rows as the payload instead of mapping them to items
+    """
+
+    CSV_CHUNK_SIZE_LINES = 2
+
+    def get_source_name(self):
+        return "test_csv_rows"
+
+    def process_csv_chunk(self, chunk, workspace_id, query_id, page_id):
+        return list(chunk)
+
+
+class TestS3CSVStreaming(unittest.TestCase):
+    """
+    Offline tests of streaming and parsing csv objects, with S3 replaced by
+    an in-memory fake
+    """
+
+    csv_bytes = (
+        b'id,content\r\n1,"a quoted field\r\nover two lines"\r\n'
+        + b'2,plain\r\n3,"with ""quotes"", and commas"\r\n4,\xc3\xa9t\xc3\xa9\r\n'
+        + b'5,"a\nb\nc"\r\n'
+    )
+    expected_rows = [
+        ["1", "a quoted field\r\nover two lines"],
+        ["2", "plain"],
+        ["3", 'with "quotes", and commas'],
+        ["4", "été"],
+        ["5", "a\nb\nc"],
+    ]
+
+    def setUp(self):
+        self.client = FakeS3Client(
+            {
+                "rows.csv": self.csv_bytes,
+                "rows.csv.gz": gzip.compress(self.csv_bytes),
+            }
+        )
+        self.source = RowsContentSource()
+        self.source.s3 = MagicMock()
+        self.source.s3.meta.client = self.client
+
+    def stream_rows(self, key, **kwargs):
+        row_cursor = {}
+        cursors = []
+        rows = []
+        for payload in self.source.process_s3_csv_object(
+            "bucket", key, "test", "query_1", row_cursor=row_cursor, **kwargs
+        ):
+            rows.extend(payload)
+            cursors.append(dict(row_cursor))
+        return rows, cursors
+
+    def test_stream_csv(self):
+        rows, cursors = self.stream_rows("rows.csv")
+        assert rows == self.expected_rows
+        assert [cursor["num_rows"] for cursor in cursors] == [2, 4, 5]
+        assert cursors[-1]["byte_offset"] == len(self.csv_bytes)
+
+    def test_stream_gzip_csv(self):
+        rows, cursors = self.stream_rows("rows.csv.gz")
+        assert rows == self.expected_rows
+        assert [cursor["num_rows"] for cursor in cursors] == [2, 4, 5]
+        # compressed objects can't be resumed from an offset
+        assert cursors[-1]["byte_offset"] is None
+
+    def test_resume_csv(self):
+        _, cursors = self.stream_rows("rows.csv")
+        # resuming from the offset only requests the rest of the object
+        self.client.requested_ranges = []
+        rows, resumed_cursors = self.stream_rows(
+            "rows.csv",
+            skip_rows=cursors[0]["num_rows"],
+            byte_offset=cursors[0]["byte_offset"],
+        )
+        assert rows == self.expected_rows[2:]
+        assert resumed_cursors == cursors[1:]
+        assert self.client.requested_ranges[0][0] == cursors[0]["byte_offset"]
+
+        # compressed objects are read again, skipping the rows already processed
+        rows, resumed_cursors = self.stream_rows("rows.csv.gz", skip_rows=4)
+        assert rows == self.expected_rows[4:]
+        assert resumed_cursors[-1]["num_rows"] == 5
+
+    def test_resume_replaced_csv(self):
+        _, cursors = self.stream_rows("rows.csv")
+        assert cursors[0]["etag"] == self.client.etags["rows.csv"]
+        # the object is replaced with different rows before the run is resumed
+        self.client.objects["rows.csv"] = self.csv_bytes.replace(b"plain", b"new")
+        self.client.etags["rows.csv"] = '"etag_replaced"'
+        rows, resumed_cursors = self.stream_rows(
+            "rows.csv",
+            skip_rows=cursors[0]["num_rows"],
+            byte_offset=cursors[0]["byte_offset"],
+            etag=cursors[0]["etag"],
+        )
+        assert rows[1] == ["2", "new"]
+        assert len(rows) == len(self.expected_rows)
+        assert resumed_cursors[-1]["etag"] == '"etag_replaced"'
@@ -1,10 +1,12 @@
 from collections import namedtuple
 import re
-import requests
 import json
 
 from timpani.app_cfg import TimpaniAppCfg
 from timpani.content_store.content_item import ContentItem
+from timpani.util.callback_coalescer import CallbackCoalescer
+from timpani.util.http_session import get_http_session
+
 import timpani.util.timpani_logger
 
 logging = timpani.util.timpani_logger.get_logger()
@@ -21,6 +23,11 @@ class BasicKeywordsExtrator(object):
     app_cfg = TimpaniAppCfg()
 
     CALLBACK_URL = app_cfg.timpani_conductor_api_endpoint + "/add_keywords"
+    BATCH_CALLBACK_URL = app_cfg.timpani_conductor_api_endpoint + "/update_item_states"
+    # if coalescing, keyword callbacks are queued and sent in batches
+    callback_coalescer = None
+    if app_cfg.coalesce_callbacks:
+        callback_coalescer = CallbackCoalescer(BATCH_CALLBACK_URL)
 
     def get_name(self) -> str:
         return "hashtags"
@@ -79,7 +86,18 @@ class BasicKeywordsExtrator(object):
         """
         Helper function to make sure we do the keyword update callbacks in the same way
         """
-        callback_response = requests.post(
+        if self.callback_coalescer is not None:
+            self.callback_coalescer.add(
+                {
+                    "content_item_id": content_item_id,
+                    "state": target_state,
+                    "workspace_id": workspace_id,
+                    "model_name": self.get_name(),
+                    "keywords": keywords,
+                }
+            )
+            return
+        callback_response = get_http_session("conductor").post(
             self.CALLBACK_URL + f"/{workspace_id}/{content_item_id}",
             data=json.dumps(
                 {
@@ -158,6 +158,40 @@ def content_item_update_state():
         raise e
 
 
+@app.route("/update_item_states", methods=["POST"])
+def content_items_update_states():
+    """
+    Batch version of /update_item_state for services that coalesce their callbacks.
+    Accepts a json list of objects with content_item_id and the requested target state
+    (and optionally workspace_id, model_name and keywords to attach before the
+    transition) and returns a json list with the result for each item
+    """
+    logging.debug(f"content items update called {request.get_json()}")
+    data = request.get_json()
+    # TODO how do we enforce argument validation?
+    try:
+        assert isinstance(data, list), "expected a list of item state updates"
+        results = orchestrator.update_content_item_states(data)
+    except (AssertionError, KeyError) as e:
+        # return information about the error to client
+        # (only appropriate for internal api)
+        msg = f"Failed to update content item states: '{e}'"
+        logging.exception(msg)
+        sentry_sdk.capture_exception(e)
+        abort(
+            500,
+            description=msg,
+        )
+        raise e
+    for result in results:
+        if result["ok"] is not True:
+            logging.warning(
+                f"Failed to update content_item_id '{result['content_item_id']}'"
+                + f" to state '{result['state']}': '{result['error']}'"
+            )
+    return json.dumps(results)
+
+
 @app.route("/import_content/<workspace_id>/<source_id>/<date_id>")
 def import_content(workspace_id: None, source_id=None, date_id=None):
     """
@@ -1,13 +1,18 @@
 #!/usr/local/bin/python
 import argparse
+import datetime
 import time
 import timpani.util.timpani_logger
 
 from timpani.app_cfg import TimpaniAppCfg
-from timpani.raw_store.cloud_store import CloudStore
 from timpani.content_store.content_store import ContentStore
 from timpani.raw_store.store import Store
+from timpani.raw_store.store_factory import StoreFactory
 from timpani.util.run_state import RunState
+from timpani.util.serializer import JsonSerializer
+from timpani.util.serializer import parse_datetime
+from timpani.raw_store.item import Item
+from timpani.raw_store.item import serializer
 from timpani.conductor.process import ContentProcessor
 
 from timpani.workspace_config.workspace_cfg_manager import WorkspaceConfigManager
@@ -89,11 +94,8 @@ class ConductorBenchmark(object):
             "benchmark",
         )
 
-        raw_store = CloudStore()
-        raw_store.login_and_validate(
-            access_key=self.app_cfg.minio_user,
-            secret_key=self.app_cfg.minio_password,
-        )
+        # S3_STORE_LOCATION=DebuggingFileStore to use the local filesystem
+        raw_store = StoreFactory.get_store(self.app_cfg)
 
         partition = Store.Partition(
             self.test_cfg.get_workspace_slug(),
@@ -116,7 +118,7 @@ class ConductorBenchmark(object):
         # load a bunch of fake data into raw store
         fake_source.acquire_new_content(self.test_cfg, raw_store, run_state=run_state)
 
-        processor = ContentProcessor(content_store=self.store)
+        processor = ContentProcessor(content_store=self.store, raw_store=raw_store)
         logging.info("loading benchmark data into raw store")
         content_store_load_start = time.time()
         processor.process_raw_content(partition)
@@ -147,6 +149,124 @@ class ConductorBenchmark(object):
         logging.info(f"benchmark completed. (partition {partition})")
         logging.info(f"Benchmark results:{results}")
 
+    def benchmark_raw_store(self, test_size):
+        """
+        Write fake raw data into the raw store and read it back, without using
+        the content store. With S3_STORE_LOCATION=DebuggingFileStore this
+        runs without any services
+        """
+        fake_source = FakerTestingContentSource(
+            total_items=test_size, page_size=min(test_size, 100)
+        )
+
+        run_state = RunState(
+            "benchmark",
+        )
+
+        raw_store = StoreFactory.get_store(self.app_cfg)
+
+        partition = Store.Partition(
+            self.test_cfg.get_workspace_slug(),
+            fake_source.get_source_name(),
+            run_state.date_id,
+        )
+        # need to delete content from previous run in raw_store
+        raw_store.delete_partition(partition)
+        logging.info("Starting benchmark")
+
+        logging.info("loading benchmark data into raw store")
+        raw_store_write_start = time.time()
+        fake_source.acquire_new_content(self.test_cfg, raw_store, run_state=run_state)
+
+        logging.info("reading benchmark data from raw store")
+        raw_store_read_start = time.time()
+        num_items = 0
+        for chunk in raw_store.fetch_item_chunks_in_partition(
+            partition,
+            prefetch_chunks=self.app_cfg.raw_store_prefetch_chunks,
+            prefetch_bytes=self.app_cfg.raw_store_prefetch_bytes,
+        ):
+            for item in chunk:
+                num_items += 1
+        benchmark_end = time.time()
+        assert (
+            num_items == test_size
+        ), f"Read {num_items} items from raw store, expected {test_size}"
+
+        results = {
+            "date": partition.date_id,
+            "benchmark_size": test_size,
+            "raw_store_write_duration": raw_store_read_start - raw_store_write_start,
+            "raw_store_write_rate": (raw_store_read_start - raw_store_write_start)
+            / test_size,
+            "raw_store_read_duration": benchmark_end - raw_store_read_start,
+            "raw_store_read_rate": (benchmark_end - raw_store_read_start) / test_size,
+        }
+        raw_store.delete_partition(partition)
+
+        logging.info(f"benchmark completed. (partition {partition})")
+        logging.info(f"Benchmark results:{results}")
+
+    def benchmark_serialization(self, test_size):
+        """
+        Time converting fake raw items to and from json with the configured
+        serializer (TIMPANI_JSON_SERIALIZER) compared to the standard library,
+        and parsing the published_at dates of content. Does not need any services
+        """
+        fake_source = FakerTestingContentSource(
+            total_items=test_size, page_size=test_size
+        )
+        items = fake_source.get_fake_content(
+            page_size=test_size,
+            num_items=0,
+            workspace_id=self.test_cfg.get_workspace_slug(),
+            page_id=0,
+            run_id="benchmark",
+        )
+        date_format = "%Y-%m-%dT%H:%M:%S.%fZ"
+        dates = [
+            item.created_at.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+            for item in items
+        ]
+        logging.info(f"Starting benchmark with {serializer.name} serializer")
+
+        results = {
+            "benchmark_size": test_size,
+            "serializer": serializer.name,
+        }
+        json_serializer = JsonSerializer()
+        for name, codec in [("configured", serializer), ("json", json_serializer)]:
+            start = time.time()
+            rows = [codec.dumps(item.content) for item in items]
+            dumps_end = time.time()
+            for row in rows:
+                codec.loads(row)
+            loads_end = time.time()
+            results[f"{name}_dumps_rate"] = (dumps_end - start) / test_size
+            results[f"{name}_loads_rate"] = (loads_end - dumps_end) / test_size
+
+        start = time.time()
+        rows = [item.toJSON() for item in items]
+        to_json_end = time.time()
+        for row in rows:
+            Item.fromJSON(row)
+        from_json_end = time.time()
+        results["item_to_json_rate"] = (to_json_end - start) / test_size
+        results["item_from_json_rate"] = (from_json_end - to_json_end) / test_size
+
+        start = time.time()
+        for date_string in dates:
+            datetime.datetime.strptime(date_string, date_format)
+        strptime_end = time.time()
+        for date_string in dates:
+            parse_datetime(date_string, date_format)
+        parse_end = time.time()
+        results["strptime_rate"] = (strptime_end - start) / test_size
+        results["parse_datetime_rate"] = (parse_end - strptime_end) / test_size
+
+        logging.info("benchmark completed.")
+        logging.info(f"Benchmark results:{results}")
+
     def benchmark_clustering(self, test_size, force_delete=False):
         """
         Load fake raw data and go through clustering as quickly as possible.
@@ -162,12 +282,8 @@ class ConductorBenchmark(object):
             "benchmark",
         )
 
-        raw_store = CloudStore()
-        # TODO: this will use minio in QA?
-        raw_store.login_and_validate(
-            access_key=self.app_cfg.minio_user,
-            secret_key=self.app_cfg.minio_password,
-        )
+        # S3_STORE_LOCATION=DebuggingFileStore to use the local filesystem
+        raw_store = StoreFactory.get_store(self.app_cfg)
 
         partition = Store.Partition(
             self.test_cfg.get_workspace_slug(),
@@ -190,7 +306,7 @@ class ConductorBenchmark(object):
         # load a bunch of fake data into raw store
         fake_source.acquire_new_content(self.test_cfg, raw_store, run_state=run_state)
 
-        processor = ContentProcessor(content_store=self.store)
+        processor = ContentProcessor(content_store=self.store, raw_store=raw_store)
         logging.info("loading benchmark data into raw store")
         content_store_load_start = time.time()
         processor.process_raw_content(partition, workflow_id="default_workflow")
@@ -225,12 +341,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         prog="TimpaniConductorBenchmark",
         description="Process data through various components of the Timpani system to understand performance limits.\n"
-        + "'workflows' - create fake data, ingest into content store, and move from ready to completed-no action",
+        + "'workflows' - create fake data, ingest into content store, and move from ready to completed-no action\n"
+        + "'raw_store' - create fake data in the raw store and read it back\n"
+        + "'serialization' - convert fake raw items to and from json",
         epilog="more details at https://github.com/meedan/timpani#readme",
     )
     parser.add_argument(
         "command",
-        metavar="<command> [workflows, clustering, clean_up]",
+        metavar="<command> [workflows, clustering, raw_store, serialization, clean_up]",
         help="the benchmark command to run",
     )
     parser.add_argument(
@@ -259,6 +377,10 @@ if __name__ == "__main__":
         benchmark.benchmark_clustering(
             test_size=int(args.test_size), force_delete=args.force_delete
         )
+    elif args.command == "raw_store":
+        benchmark.benchmark_raw_store(test_size=int(args.test_size))
+    elif args.command == "serialization":
+        benchmark.benchmark_serialization(test_size=int(args.test_size))
     elif args.command == "clean_up":
         benchmark.clean_up(force_delete=args.force_delete)
     else:
@@ -85,7 +85,7 @@ class Orchestrator(object):
         """
         Called by web callbacks from services to indicate that a state (such as vectorization)
         has completed for a content item
-        TODO: batch
+        NOTE: update_content_item_states() handles batches of updates
         """
         # pull a reference to the content item from the store
         int_id = int(content_item_id)
@@ -98,6 +98,102 @@ class Orchestrator(object):
         # TODO: how do we know the appropriate state model class to use for the item?
         return state
 
+    def update_content_item_states(self, updates):
+        """
+        Batch version of update_content_item_state() for services that coalesce
+        their callbacks. updates is expected to be a list of dicts with
+        content_item_id and state. Items are looked up in a single query and
+        transitioned together, one update per target state.
+        If an update also has model_name and keywords, the keywords are
+        attached to the item as it is transitioned
+        Returns a list of dicts (in the same order) with the content_item_id, state,
+        and whether the update succeeded (and if not, an error message).
+        Each update is validated on its own, so a malformed update only fails
+        its own result
+        """
+        results = []
+        int_ids = []
+        for update in updates:
+            result = {
+                "content_item_id": None,
+                "state": None,
+                "ok": False,
+                "error": None,
+            }
+            results.append(result)
+            int_ids.append(None)
+            if not isinstance(update, dict):
+                result["error"] = f"update must be an object, got {update!r}"
+                continue
+            result["content_item_id"] = update.get("content_item_id")
+            result["state"] = update.get("state")
+            if result["state"] is None:
+                result["error"] = "update is missing the state"
+                continue
+            try:
+                int_ids[-1] = int(update.get("content_item_id"))
+            except (TypeError, ValueError):
+                result["error"] = (
+                    "update has an invalid content_item_id"
+                    + f" {update.get('content_item_id')!r}"
+                )
+                continue
+            if update.get("keywords") is not None and update.get("model_name") is None:
+                result["error"] = "update has keywords but is missing the model_name"
+        items_by_id = {}
+        valid_ids = [
+            int_id
+            for index, int_id in enumerate(int_ids)
+            if int_id is not None and results[index]["error"] is None
+        ]
+        for item in self.content_store.get_items(valid_ids):
+            items_by_id[item.content_item_id] = item
+
+        # group the items by target state (and keyword model) so each group is one batch
+        batches = {}
+        for index, update in enumerate(updates):
+            if results[index]["error"] is not None:
+                # the update was not valid
+                continue
+            item = items_by_id.get(int_ids[index])
+            if item is None:
+                results[index]["error"] = (
+                    "unable to find content_item in content store"
+                    + f" with id {int_ids[index]}"
+                )
+                continue
+            model_name = None
+            if update.get("keywords") is not None:
+                # TODO: auth permissions to access workspace
+                if item.workspace_id != update.get("workspace_id"):
+                    results[index]["error"] = (
+                        f"content_item {int_ids[index]} is not in workspace"
+                        + f" {update.get('workspace_id')}"
+                    )
+                    continue
+                model_name = update["model_name"]
+            batches.setdefault((update["state"], model_name), []).append(index)
+
+        for (state, model_name), indexes in batches.items():
+            items = [items_by_id[int_ids[index]] for index in indexes]
+            if model_name is None:
+                transitioned = self.content_store.transition_items_state(items, state)
+            else:
+                # keywords are added in the same transaction as the transition
+                transitioned = self.content_store.attach_keywords(
+                    items,
+                    keyword_model_name=model_name,
+                    keywords=[updates[index]["keywords"] for index in indexes],
+                    state=state,
+                )
+            for index, ok in zip(indexes, transitioned):
+                results[index]["ok"] = ok
+                if not ok:
+                    results[index][
+                        "error"
+                    ] = f"transition to state '{state}' is not allowed"
+        return results
+
     def update_content_item_property(
         self, content_item_id, property_name, property_value
     ):
@@ -451,15 +547,13 @@ class Orchestrator(object):
         ), f"unable to find content_item in content store with id {int_id} to add keywords"
         assert item.workspace_id == workspace_id
 
-        for keyword in keywords:
-            self.content_store.attach_keyword(
-                item,
-                keyword_model_name=model_name,
-                keyword_text=keyword[0],
-                score=keyword[1],
-            )
-        # try to update it to the requested state
-        state = self.content_store.transition_item_state(item, state)
+        # add the keywords and update it to the requested state together
+        attached = self.content_store.attach_keywords(
+            item, keyword_model_name=model_name, keywords=keywords, state=state
+        )
+        assert attached[
+            0
+        ], f"transition of content_item {int_id} to state '{state}' is not allowed"
         return len(keywords)
 
     def dispatch_presto_keyword_response(self, response):
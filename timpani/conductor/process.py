@@ -1,16 +1,18 @@
 #!/usr/local/bin/python
 import argparse
 import json
-import requests
 import time
+import itertools
 import datetime
+import multiprocessing
 import sentry_sdk
 from datetime import timezone
 from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
 from timpani.app_cfg import TimpaniAppCfg
 from timpani.raw_store.store_factory import StoreFactory
 from timpani.raw_store.store import Store
-from timpani.raw_store.item import Item
 from timpani.content_store.content_store import ContentStore
 from timpani.content_store.content_item import ContentItem
 from timpani.content_store.item_state_model import ContentItemState
@@ -26,6 +28,8 @@ from timpani.conductor.actions.clustering import AlegreClusteringAction
 from timpani.conductor.process_state import ProcessState
 
 from timpani.util.metrics_exporter import TelemetryMeterExporter
+from timpani.util.http_session import get_http_session
+
 import timpani.util.timpani_logger
 
 logging = timpani.util.timpani_logger.get_logger()
@@ -155,6 +159,8 @@ class ContentProcessor(object):
         run=None,
         force_overwrite=False,
         trigger_workflow=False,
+        bulk_insert=False,
+        num_workers=None,
     ):
         """
         Get the chunks of data from a single partition in the raw_store
@@ -165,9 +171,23 @@ class ContentProcessor(object):
 
         Content that fails to parse will still be loaded into
         the database but in a failed state
+
+        When bulk_insert is True, all of the content items extracted from a chunk
+        are inserted together (with their states already ready or failed)
+        instead of one at a time, which is much faster for large partitions
+
+        If the raw store has a manifest for the partition, progress is logged as
+        a percentage of the chunks in the partition
+
+        When num_workers > 1 (default from RAW_IMPORT_WORKERS), the chunks are
+        distributed across a pool of worker processes that each extract and insert
+        items on their own database connection, see _load_chunks_parallel().
+        The chunks are then loaded in no particular order
         """
         if run is None:
             run = ProcessState("process_partition")
+        if num_workers is None:
+            num_workers = self.app_cfg.raw_import_workers
 
         # TODO: state model for this process
         workspace_id = partition_id.workspace_id
@@ -197,49 +217,66 @@ class ContentProcessor(object):
             f"Loading chunks of raw content items from partition {partition_id}"
         )
         try:
-            for chunk in self.raw_store.fetch_chunks_in_partition(partition_id):
-                chunks_read += 1
-                # s3://timpani-raw-store-qa/content_items/date_id=20230704/
-                # update state
-                # TODO: parallelize this
-                # loop over each raw_content item in the chunk
-                for row in chunk.splitlines():
-                    raw_item = Item.fromJSON(row)
-                    raw_items_read += 1
-                    assert raw_item.workspace_id == workspace_id
-                    # ask the workflow how to extract that content
-                    # (may return multiple items)
-                    content_items = workflow.extract_items(
-                        raw_item, partition_id.date_id
-                    )
-                    # TODO: store a reference to the original object path?
-                    for item in content_items:
-                        # initialize a state model with appropriate states
-                        state = workflow.get_state_model()
-                        item_ready = self._insert_content_item(
-                            item, state, force_overwrite
-                        )
-                        if not item_ready:
-                            content_items_errors += 1
-                            # record error metrics for system health
-                            self.content_items_load_errors_metric.add(
-                                1,
-                                attributes={
-                                    "workspace_id": partition_id.workspace_id,
-                                    "source_id": partition_id.source_id,
-                                    "workflow_id": workflow_id,
-                                },
-                            )
-                        content_items_inserted += 1
-                        # record metrics for system health
-                        self.content_items_loaded_metric.add(
-                            1,
-                            attributes={
-                                "workspace_id": partition_id.workspace_id,
-                                "source_id": partition_id.source_id,
-                                "workflow_id": workflow_id,
-                            },
+            total_chunks = None
+            manifest = self.raw_store.get_partition_manifest(partition_id)
+            if manifest is not None:
+                total_chunks = manifest.get_num_chunks()
+                logging.info(
+                    f"Partition {partition_id} manifest lists {total_chunks} chunks to load"
+                    + f" with {manifest.get_num_items()} raw items in total"
+                )
+            # NOTE: chunks loaded by an earlier run are read again rather than
+            # skipped, the content store ignores items it already has (unless
+            # force_overwrite) so a re-import only costs the reads
+            if num_workers > 1:
+                (
+                    chunks_read,
+                    raw_items_read,
+                    content_items_inserted,
+                    content_items_errors,
+                ) = self._load_chunks_parallel(
+                    partition_id,
+                    workflow_id,
+                    num_workers,
+                    total_chunks=total_chunks,
+                    force_overwrite=force_overwrite,
+                    bulk_insert=bulk_insert,
+                )
+            else:
+                chunks = self.raw_store.fetch_item_chunks_in_partition(
+                    partition_id,
+                    prefetch_chunks=self.app_cfg.raw_store_prefetch_chunks,
+                    prefetch_bytes=self.app_cfg.raw_store_prefetch_bytes,
+                )
+                for chunk in chunks:
+                    if total_chunks is not None and total_chunks > 0:
+                        logging.info(
+                            f"Loading chunk {chunks_read + 1} of {total_chunks}"
+                            + f" ({100 * chunks_read / total_chunks:.0f}% complete) from {partition_id}"
                         )
+                    chunks_read += 1
+                    # s3://timpani-raw-store-qa/content_items/date_id=20230704/
+                    # update state
+                    # raw_content items in the chunk are parsed as the chunk
+                    # is streamed from the raw store
+                    num_raw, num_inserted, num_errors = self._load_chunk_items(
+                        chunk,
+                        partition_id,
+                        workflow,
+                        force_overwrite=force_overwrite,
+                        bulk_insert=bulk_insert,
+                    )
+                    raw_items_read += num_raw
+                    content_items_inserted += num_inserted
+                    content_items_errors += num_errors
+                    self._record_load_metrics(
+                        partition_id, workflow_id, num_inserted, num_errors
+                    )
+
+            run.num_chunks = chunks_read
+            run.num_raw_items = raw_items_read
+            run.num_content_items = content_items_inserted
+            run.num_errors = content_items_errors
 
             # case where partition was empty or misspecified
             if chunks_read == 0:
@@ -258,7 +295,7 @@ class ContentProcessor(object):
                     logging.info(f"Requesting processing of workspace {workspace_id}")
                     # /start_workflow/<workspace_id>
                     url = f"{self.app_cfg.timpani_conductor_api_endpoint}/start_workflow/{workspace_id}"
-                    callback_response = requests.get(url)
+                    callback_response = get_http_session("conductor").get(url)
                     if callback_response.ok is not True:
                         logging.warning(
                             f"Unable to process response from Timpani conductor workflow trigger {url} {callback_response.text}"
@@ -276,6 +313,149 @@ class ContentProcessor(object):
             self.content_store.record_process_state(run)
             raise e
 
+    def _load_chunk_items(
+        self,
+        chunk,
+        partition_id: Store.Partition,
+        workflow: Workflow,
+        force_overwrite=False,
+        bulk_insert=False,
+    ):
+        """
+        Internal function to extract the content items from each of the raw items
+        in a chunk and insert them, usually called from process_raw_content().
+        Returns the number of raw items read, content items inserted and content
+        items in the error state
+        """
+        raw_items_read = 0
+        content_items_inserted = 0
+        content_items_errors = 0
+        chunk_content_items = []
+        for raw_item in chunk:
+            raw_items_read += 1
+            assert raw_item.workspace_id == partition_id.workspace_id
+            # ask the workflow how to extract that content
+            # (may return multiple items)
+            content_items = workflow.extract_items(raw_item, partition_id.date_id)
+            if bulk_insert is True:
+                # defer the insert until the whole chunk is extracted
+                chunk_content_items.extend(content_items)
+                continue
+            # TODO: store a reference to the original object path?
+            for item in content_items:
+                # initialize a state model with appropriate states
+                state = workflow.get_state_model()
+                item_ready = self._insert_content_item(item, state, force_overwrite)
+                if not item_ready:
+                    content_items_errors += 1
+                content_items_inserted += 1
+
+        if bulk_insert is True and len(chunk_content_items) > 0:
+            num_ready = self._insert_content_items(
+                chunk_content_items, workflow, force_overwrite
+            )
+            content_items_inserted += len(chunk_content_items)
+            content_items_errors += len(chunk_content_items) - num_ready
+        return raw_items_read, content_items_inserted, content_items_errors
+
+    def _record_load_metrics(
+        self, partition_id: Store.Partition, workflow_id, num_items, num_errors
+    ):
+        """
+        Internal function to record metrics for system health about the
+        content items loaded from a partition
+        """
+        metric_attributes = {
+            "workspace_id": partition_id.workspace_id,
+            "source_id": partition_id.source_id,
+            "workflow_id": workflow_id,
+        }
+        if num_errors > 0:
+            self.content_items_load_errors_metric.add(
+                num_errors, attributes=metric_attributes
+            )
+        if num_items > 0:
+            self.content_items_loaded_metric.add(
+                num_items, attributes=metric_attributes
+            )
+
+    def _load_chunks_parallel(
+        self,
+        partition_id: Store.Partition,
+        workflow_id,
+        num_workers: int,
+        total_chunks=None,
+        force_overwrite=False,
+        bulk_insert=False,
+    ):
+        """
+        Internal function to load the chunks of a partition with a pool of
+        num_workers processes, usually called from process_raw_content().
+        Each worker process creates its own ContentProcessor, with its own
+        connections to the same content store database and raw store as this
+        processor (see _init_raw_import_worker()), then fetches, parses,
+        extracts and inserts whole chunks so only the chunk names and the counts
+        are passed between processes. The counts are aggregated here and metrics
+        are recorded by this process as each chunk completes.
+        Returns the number of chunks read, raw items read, content items inserted
+        and content items in the error state
+        """
+        chunks_read = 0
+        raw_items_read = 0
+        content_items_inserted = 0
+        content_items_errors = 0
+        logging.info(
+            f"Loading chunks from partition {partition_id} with {num_workers} workers"
+        )
+        # spawn instead of fork so the workers don't inherit the db connection
+        # pool, metrics exporter or raw store threads of this process
+        pool = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_raw_import_worker,
+            initargs=(
+                type(self.content_store),
+                self.content_store.engine.url.render_as_string(hide_password=False),
+                self.content_store.ro_engine.url.render_as_string(hide_password=False),
+                self.raw_store.get_config(),
+            ),
+        )
+        futures = []
+        try:
+            for chunk in self.raw_store.list_chunks_in_partition(partition_id):
+                futures.append(
+                    pool.submit(
+                        _load_raw_import_chunk,
+                        # Store.Partition can't be pickled, pass the fields
+                        tuple(partition_id),
+                        chunk.object_name,
+                        workflow_id,
+                        force_overwrite,
+                        bulk_insert,
+                    )
+                )
+            if total_chunks is None:
+                total_chunks = len(futures)
+            for future in as_completed(futures):
+                num_raw, num_inserted, num_errors = future.result()
+                chunks_read += 1
+                raw_items_read += num_raw
+                content_items_inserted += num_inserted
+                content_items_errors += num_errors
+                self._record_load_metrics(
+                    partition_id, workflow_id, num_inserted, num_errors
+                )
+                if total_chunks > 0:
+                    logging.info(
+                        f"Loaded chunk {chunks_read} of {total_chunks}"
+                        + f" ({100 * chunks_read / total_chunks:.0f}% complete)"
+                        + f" from {partition_id}"
+                    )
+        finally:
+            # if a chunk failed, don't start loading any of the remaining chunks
+            pool.shutdown(wait=True, cancel_futures=True)
+        return chunks_read, raw_items_read, content_items_inserted, content_items_errors
+
     def _insert_content_item(
         self, content_item: ContentItem, state: ContentItemState, force_overwrite=False
     ):
@@ -302,6 +482,41 @@ class ContentProcessor(object):
             self.content_store.transition_item_state(content_item, state.STATE_READY)
         return True
 
+    def _insert_content_items(
+        self,
+        content_items: list[ContentItem],
+        workflow: Workflow,
+        force_overwrite=False,
+    ):
+        """
+        Internal function for inserting a batch of content items with
+        states that are already marked as ready or failed, usually called
+        from process_raw_content() in bulk mode.
+        Returns the number of items inserted in the ready state
+        """
+        states = []
+        for content_item in content_items:
+            # initialize a state model with appropriate states
+            state = workflow.get_state_model()
+            # check if it should be marked as ready or failed
+            if content_item.content == "":
+                # either no content, or parsing failure
+                state.transitionTo(state.STATE_FAILED)
+            else:
+                # ready to be picked up for processing!
+                state.transitionTo(state.STATE_READY)
+            states.append(state)
+
+        inserted = self.content_store.initialize_items(
+            content_items, states, force_overwrite
+        )
+        # items that conflicted with existing items are not returned
+        num_ready = 0
+        for content_item in inserted:
+            if content_item.content != "":
+                num_ready += 1
+        return num_ready
+
     def batch_process_workflows(
         self, workspace_id, workflow_id=None, run=None, max_iterations=10000
     ):
@@ -363,6 +578,9 @@ class ContentProcessor(object):
         self.content_store.record_process_state(run)
         pool = ThreadPoolExecutor(max_workers=batch_size)
 
+        # items leased by the batch currently being dispatched
+        claimed = []
+
         # NOTE: although we loop over states in sequence, it is expected that an item
         # may be updated async, so may not be transitioned to the next state until following iteration
         try:
@@ -374,37 +592,36 @@ class ContentProcessor(object):
                 num_items_skipped_iteration = 0
                 state_errors += iteration_state_errors
                 iteration_state_errors = 0  # reset the state errors counter for the
-                # TODO: need to work with running multiple batches in parallel (currently two batch queries can reutrn the same items)
                 assert (
                     iteration_num < max_iterations
                 ), f"workflow processing for workspace {workspace_id} workflow {workflow_id} stopped for exceeding {max_iterations} iterations"
                 iteration_num += 1
                 for batch_state in state_sequence:
 
-                    # get the set of all the in-progress items for the workspace
-                    # that are in the indicated current batch state
+                    # claim a batch of the in-progress items for the workspace
+                    # that are in the indicated current batch state, so other
+                    # processes working on the workspace will not also dispatch them
                     logging.debug(
                         f"requesting batch of {batch_size} items in state '{batch_state}' for workflow {workflow_id}"
                     )
 
-                    batch = list(
-                        self.content_store.get_items_in_progress(
-                            workspace_id=workspace_id,
-                            batch_state=batch_state,  # only get items in this state
-                            chunk_size=batch_size,
-                        )
+                    claimed = self.content_store.claim_items_in_progress(
+                        workspace_id=workspace_id,
+                        batch_state=batch_state,  # only get items in this state
+                        chunk_size=batch_size,
+                        lease_duration=self.app_cfg.claim_lease_seconds,
+                        include_state=True,  # so we can check timeouts without more queries
                     )
                     logging.debug(
-                        f"batch found {len(batch)} items for state {batch_state}"
+                        f"batch found {len(claimed)} items for state {batch_state}"
                     )
 
-                    # remove items from batch if they are in transition, have timed out or too many attempts
+                    # only keep items in batch if they are not in transition, timed out or have too many attempts
                     # NOTE: this is here instead of in selection query as timeout values can very per state per workflow
-                    for item in batch:
-                        state = self.content_store.get_item_state(item.content_item_id)
+                    batch = []
+                    for item, state in claimed:
                         # if there are too many attempts, fail the item so we don't retry indefinitly
                         if workflow.check_state_updates_exceeded(state) is True:
-                            batch.remove(item)
                             num_items_skipped_iteration += 1
                             logging.warning(
                                 f"State updates exceeded {workflow.MAX_STATE_UPDATES} for item {item.content_item_id}, transitioning to failed"
@@ -412,12 +629,13 @@ class ContentProcessor(object):
                             self.content_store.transition_item_state(
                                 item, ContentItemState.STATE_FAILED
                             )
-                        if workflow.check_state_timeout(state) is True:
-                            batch.remove(item)
+                        elif workflow.check_state_timeout(state) is True:
                             num_items_skipped_iteration += 1
                             logging.debug(
                                 f"Skipping next state for {item.content_item_id}, transition in progress or timed out"
                             )
+                        else:
+                            batch.append(item)
 
                         # TODO: could also put items in faild state if the transition has been in progress for more than a few days
 
@@ -468,8 +686,11 @@ class ContentProcessor(object):
 
                             for content_item in batch:
                                 # batch up the items with workflow reference so we can process in parallel
-                                # tuple is ugly hack to pass in two args
-                                items_batch.append((content_item, workflow))
+                                # tuple is ugly hack to pass in multiple args
+                                # (passing state means the workflow doesn't need to look it up again)
+                                items_batch.append(
+                                    (content_item, workflow, batch_state)
+                                )
                             # pass the batch to pool to be executed
                             item_result = pool.map(
                                 self._dispatch_state,
@@ -515,6 +736,12 @@ class ContentProcessor(object):
                                     f"Workflow processing for workspace {workspace_id} workflow {workflow_id} "
                                     + f"stopped for transition error rate {(iteration_state_errors / num_items_iteratation)} > {max_state_error_rate}"
                                 )
+
+                    # all of the claimed items (including skipped ones) can be claimed
+                    # again (if they are still waiting for an async transition, the
+                    # state timeout will skip them)
+                    self.content_store.release_items([item for item, _ in claimed])
+                    claimed = []
                     # if we skipped all of the items (probably because they are waiting)
                     # (or there were no items)
                     # take a breath before starting next batch
@@ -564,17 +791,25 @@ class ContentProcessor(object):
             run.transitionTo(run.STATE_FAILED)
             self.content_store.record_process_state(run)
             raise e
+        finally:
+            # don't leave the items of a failed batch leased until they expire
+            if len(claimed) > 0:
+                self.content_store.release_items([item for item, _ in claimed])
 
     def _dispatch_state(self, content_item_workflow):
         # NOTE: if this is a blocking operation, we are stuck here until
         # the operation returns
         content_item = content_item_workflow[0]
         workflow = content_item_workflow[1]
+        # current state name, if known, otherwise the workflow will look it up
+        state_name = None
+        if len(content_item_workflow) > 2:
+            state_name = content_item_workflow[2]
         status = 1  # default to error
         try:
             # execute the action or call needed to transition
             # to the next state as defined by the workflow
-            status = workflow.next_state([content_item])
+            status = workflow.next_state([content_item], state_name)
             # record metrics for system health
             self.states_dispatched_metric.add(
                 1,
@@ -613,7 +848,12 @@ class ContentProcessor(object):
         return status
 
     def process_expired_items(
-        self, workspace_id, window_end=None, force_window_end=False
+        self,
+        workspace_id,
+        window_end=None,
+        force_window_end=False,
+        bulk_delete=False,
+        page_size=1000,
     ):
         """
         Query the content store for content items that are not
@@ -621,6 +861,8 @@ class ContentProcessor(object):
         or have had too many transitions, and put them in the
         failed state. The timedelta defining the TTL for data
         is specific to each workspace.
+        If `bulk_delete` is True, expired items are removed a page of
+        `page_size` at a time (see _delete_expired_page()) instead of one by one
         NOTE: it is possible that the item may not exist in all of
         the services delete is requested from
         """
@@ -668,12 +910,37 @@ class ContentProcessor(object):
             )
             max_errors = 1000
             error_count = 0
-            max_iteration_count = 100
             total_deleted_count = 0
-            iteration_count = 0
-            # get_items_before is limited to 10k chunk size for memory safety, so need to track an outer loop here
-            while iteration_count < max_iteration_count:
-                iteration_deleted_count = 0  # how man
+            if bulk_delete:
+                last_item_id = 0
+                while True:
+                    # read one page of expired items, and release the
+                    # read session before doing the deletes
+                    scan = self.content_store.get_items_before(
+                        workspace_id=workspace_id,
+                        earliest=earliest,
+                        chunk_size=page_size,
+                        start_after_id=last_item_id,
+                    )
+                    page = list(itertools.islice(scan, page_size))
+                    scan.close()
+                    if len(page) == 0:
+                        break
+                    last_item_id = page[-1].content_item_id
+                    num_deleted, num_errors = self._delete_expired_page(
+                        workspace_id, page
+                    )
+                    total_deleted_count += num_deleted
+                    error_count += num_errors
+                    assert (
+                        error_count < max_errors
+                    ), f"Encountered more than {max_errors} errors deleting expired content"
+                    logging.info(
+                        f"deleted {total_deleted_count} expired items from workspace {workspace_id} so far"
+                    )
+            else:
+                # get_items_before streams all of the expired items in pages,
+                # so a single pass covers them no matter how many there are
                 for item_to_delete in self.content_store.get_items_before(
                     workspace_id=workspace_id, earliest=earliest
                 ):
@@ -689,7 +956,7 @@ class ContentProcessor(object):
                         )
                         # delete the item from the content store
                         self.content_store.delete_item(item_to_delete)
-                        iteration_deleted_count += 1
+                        total_deleted_count += 1
                         # record metrics for system health
                         self.content_items_removed_metric.add(
                             1,
@@ -707,20 +974,10 @@ class ContentProcessor(object):
                         error_count < max_errors
                     ), f"Encountered more than {max_errors} errors deleting expired content"
 
-                if (
-                    iteration_deleted_count == 0
-                ):  # nothing was deleted in the last loop (or too many errors)
-                    break
-                else:
-                    # get another loop of expired items
-                    logging.info(
-                        f"deleted {iteration_deleted_count} expired items from workspace {workspace_id} in iteration {iteration_count}"
-                    )
-                    iteration_count += 1
-                    total_deleted_count += iteration_deleted_count
-            assert (
-                iteration_count < max_iteration_count
-            ), f"exceeded maximum number of iterations ({max_iteration_count}) for processing expired items"
+                    if total_deleted_count > 0 and total_deleted_count % 10000 == 0:
+                        logging.info(
+                            f"deleted {total_deleted_count} expired items from workspace {workspace_id} so far"
+                        )
             logging.info(
                 f"Completed deletion of {total_deleted_count} items from workspace {workspace_id} with {error_count} errors"
             )
@@ -736,6 +993,33 @@ class ContentProcessor(object):
             self.content_store.record_process_state(run)
             raise e
 
+    def _delete_expired_page(self, workspace_id, items):
+        """
+        Remove a page of expired items: the vectors are discarded with concurrent
+        requests, and then the items whose vectors were discarded are deleted from
+        the content store in bulk (which updates each affected cluster once).
+        Items that could not be discarded are left for the next expiry run.
+        Returns a tuple of the number of items deleted and the number of errors
+        """
+        discarded = self.vector_store.discard_vectors_for_content_items(items)
+        num_errors = len(items) - len(discarded)
+        num_deleted = 0
+        try:
+            num_deleted = self.content_store.delete_items(discarded)
+            # record metrics for system health
+            self.content_items_removed_metric.add(
+                num_deleted,
+                attributes={
+                    "workspace_id": workspace_id,
+                },
+            )
+        except Exception as e:
+            msg = f"Error deleting page of {len(discarded)} expired content items from workspace {workspace_id}: {e}"
+            logging.error(msg)
+            sentry_sdk.capture_message(msg)
+            num_errors += len(discarded)
+        return num_deleted, num_errors
+
     def process_clusters(self, workspace_id):
         """
         Query the content store for clusters with high priority
@@ -800,6 +1084,20 @@ class ContentProcessor(object):
             f"Cluster processing completed for {workspace_id}, checked {num_clusters_checked} clusters resulting {num_merges} merges"
         )
 
+    def reconcile_clusters(self, workspace_id):
+        """
+        Check that the cluster sizes, unique item counts and exemplars (which are
+        updated incrementally as items are clustered) are consistent with the
+        items in each cluster, and repair any that have drifted.
+        Intended to be run periodically
+        """
+        logging.info(f"Starting cluster reconciliation for workspace {workspace_id}")
+        num_repaired = self.content_store.reconcile_cluster_aggregates(workspace_id)
+        logging.info(
+            f"Cluster reconciliation completed for {workspace_id}, repaired {num_repaired} clusters"
+        )
+        return num_repaired
+
     def process_summary(self, workspace_id=None):
         """
         Query the content store to return a summary of states
@@ -821,18 +1119,60 @@ class ContentProcessor(object):
         return workflow
 
 
+# the ContentProcessor of a parallel raw import worker process
+_raw_import_processor = None
+
+
+def _init_raw_import_worker(
+    content_store_class, connect_string, ro_connect_string, raw_store_config
+):
+    """
+    Initializer for the worker processes of ContentProcessor._load_chunks_parallel(),
+    connecting to the content store db with the connect strings and creating the
+    raw store from its config (see Store.get_config())
+    """
+    global _raw_import_processor
+    content_store = content_store_class()
+    content_store.init_db_engine(connect_string, ro_connect_string)
+    raw_store = StoreFactory.get_store_from_config(raw_store_config)
+    _raw_import_processor = ContentProcessor(
+        content_store=content_store, raw_store=raw_store
+    )
+
+
+def _load_raw_import_chunk(
+    partition_fields, object_name, workflow_id, force_overwrite, bulk_insert
+):
+    """
+    Loads a single chunk in a parallel raw import worker process, returns the
+    counts from ContentProcessor._load_chunk_items()
+    """
+    processor = _raw_import_processor
+    partition_id = Store.Partition(*partition_fields)
+    workflow = processor.workspace_workflows.get_workflow(workflow_id)
+    return processor._load_chunk_items(
+        processor.raw_store.fetch_chunk_items(object_name),
+        partition_id,
+        workflow,
+        force_overwrite=force_overwrite,
+        bulk_insert=bulk_insert,
+    )
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         prog="TimpaniProcessor",
         description=" 'raw' - processes content from partitions in RawStore and extracts and transforms it into ContentStore\n"
         + "'workflows' - iteratively process the content for a specifc workspace according to the sequence in workspace's workflow\n"
-        + "'expired' - interatively remove content older than the live duration defined in a workspace workflow",
+        + "'expired' - interatively remove content older than the live duration defined in a workspace workflow\n"
+        + "'reconcile' - check and repair the item counts and exemplars of clusters in a workspace",
         epilog="more details at https://github.com/meedan/timpani#readme",
     )
     parser.add_argument(
         "command",
-        metavar="<command> [raw, workflows, expired, clusters, summary]",
-        help="the processing command to run: import 'raw' data, start 'workflows', remove 'expired' items, evaluate and update 'clusters'",
+        metavar="<command> [raw, workflows, expired, clusters, reconcile, summary]",
+        help="the processing command to run: import 'raw' data, start 'workflows', remove 'expired' items, evaluate and update 'clusters',"
+        + " 'reconcile' cluster counts",
     )
     parser.add_argument(
         "-w",
@@ -869,6 +1209,32 @@ if __name__ == "__main__":
         default=False,
         type=bool,
     )
+    parser.add_argument(
+        "-b",
+        "--bulk_insert",
+        help="when true, during raw import the content items from each chunk"
+        + " are inserted together in bulk",
+        required=False,
+        default=False,
+        type=bool,
+    )
+    parser.add_argument(
+        "--bulk_delete",
+        help="when true, expired items are deleted in bulk pages"
+        + " instead of one at a time",
+        required=False,
+        default=False,
+        type=bool,
+    )
+    parser.add_argument(
+        "-n",
+        "--num_workers",
+        help="number of worker processes loading chunks in parallel during raw import"
+        + " (default from RAW_IMPORT_WORKERS)",
+        required=False,
+        default=None,
+        type=int,
+    )
 
     args = parser.parse_args()
     logging.info("Starting Content Processing with args:{}".format(args))
@@ -894,6 +1260,8 @@ if __name__ == "__main__":
                 partition,
                 force_overwrite=args.force_overwrite,
                 trigger_workflow=args.trigger_workflow,
+                bulk_insert=args.bulk_insert,
+                num_workers=args.num_workers,
             )
         # report on the number of items ready
     elif args.command == "workflows":
@@ -903,6 +1271,9 @@ if __name__ == "__main__":
         processor.process_summary(workspace_id=args.workspace_id)
     elif args.command == "clusters":
         processor.process_clusters(workspace_id=args.workspace_id)
+    elif args.command == "reconcile":
+        assert args.workspace_id is not None
+        processor.reconcile_clusters(workspace_id=args.workspace_id)
     elif args.command == "expired":
         window_end = None
         if args.date_id is not None:
@@ -926,6 +1297,7 @@ if __name__ == "__main__":
             workspace_id=args.workspace_id,
             window_end=window_end,
             force_window_end=ignore_workspace_settings_and_force_delete,
+            bulk_delete=args.bulk_delete,
         )
     else:
         assert False, f"Processing command {args.command} is not yet supported"
@@ -26,8 +26,17 @@ class ProcessState(RunState, ContentStoreObject):
     source_name: Mapped[Optional[str]]
     query_id: Mapped[Optional[str]]
     date_id: Mapped[Optional[str]]
+    # counts of what was loaded by the run (i.e. raw import)
+    num_chunks: Mapped[Optional[int]]
+    num_raw_items: Mapped[Optional[int]]
+    num_content_items: Mapped[Optional[int]]
+    num_errors: Mapped[Optional[int]]
     # time_range_start
     # time_range_end
 
     def __init__(self, job_type):
         RunState.__init__(self, job_type)
+        self.num_chunks = None
+        self.num_raw_items = None
+        self.num_content_items = None
+        self.num_errors = None
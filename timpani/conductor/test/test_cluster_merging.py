@@ -223,14 +223,23 @@ class TestClusterMerge(unittest.TestCase):
             item = self.store.initialize_item(item)
         cluster_b = self.store.cluster_items(test_items_b[0], test_items_b[1])
 
-        self.store.merge_clusters(
+        merged = self.store.merge_clusters(
             cluster_b.content_cluster_id,
             cluster_a.content_cluster_id,
         )
+        assert merged.content_cluster_id == cluster_a.content_cluster_id
 
         # expecting that this results in B getting merged into A
         cluster_a = self.store.refresh_object(cluster_a)
         assert cluster_a.num_items == 4, f"cluster has {cluster_b.num_items} items"
+        assert cluster_a.num_items_added == 4
+        # all the items should now be in A, and exemplar should be one of them
+        item_ids = []
+        for item in test_items_a + test_items_b:
+            item = self.store.refresh_object(item)
+            assert item.content_cluster_id == cluster_a.content_cluster_id
+            item_ids.append(item.content_item_id)
+        assert cluster_a.exemplar_item_id in item_ids
         # expected cluster b deleted
         cluster_b = self.store.refresh_object(cluster_b)
         assert cluster_b is None
@@ -211,3 +211,24 @@ class TestConductorEndpoints(unittest.TestCase):
         payload = resp.text
         print(payload)
         assert resp.ok is True, f"response to {test_url} was {resp}"
+
+    def test_update_item_states(self):
+        """
+        Can accept a batch of item state updates and return a result per item
+        (these items don't exist, so expected to fail)
+        """
+        test_url = self.CONDUCTOR_BASE_URL + "/update_item_states"
+        print(f"testing connection to {test_url}")
+        resp = requests.post(
+            test_url,
+            json=[
+                {"content_item_id": "-1", "state": "vectorized"},
+                {"content_item_id": "-2", "state": "completed"},
+            ],
+        )
+        assert resp.ok is True, f"response to {test_url} was {resp}"
+        payload = resp.json()
+        print(payload)
+        assert len(payload) == 2
+        assert payload[0]["content_item_id"] == "-1"
+        assert payload[0]["ok"] is False
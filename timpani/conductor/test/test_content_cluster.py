@@ -538,3 +538,140 @@ class TestContentCluster(unittest.TestCase):
         assert cluster.num_items == 1, f"num_items is {cluster.num_items}"
         assert cluster.num_items_added == 3
         assert cluster.num_items_unique == 1
+
+    def test_unique_item_count_without_content(self):
+        """
+        Items with no content are not counted as unique when they start a cluster
+        """
+        items = []
+        for n in range(3):
+            item = ContentItem(
+                date_id=self.item1_test_data["date_id"],
+                run_id=self.item1_test_data["run_id"],
+                workspace_id=self.item1_test_data["workspace_id"],
+                source_id=self.item1_test_data["source_id"],
+                query_id=self.item1_test_data["query_id"],
+                raw_created_at=self.item1_test_data["raw_created_at"],
+                raw_content_id=f"429839388empty{n}",
+                raw_content=self.item1_test_data["raw_content"],
+                content_published_date=self.item1_test_data["content_published_date"],
+                content_published_url=self.item1_test_data["content_published_url"],
+            )
+            item.content = None
+            items.append(self.store.initialize_item(item))
+        assert items[0].content_hash is None
+
+        # a new cluster for the first item alone
+        cluster1 = self.store.cluster_items(first_item=items[0])
+        assert cluster1.num_items == 1
+        assert cluster1.num_items_unique == 0
+        # and a new cluster for a pair
+        cluster2 = self.store.cluster_items(first_item=items[1], second_item=items[2])
+        assert cluster2.num_items == 2
+        assert cluster2.num_items_unique == 0
+
+        # the counts match what the reconciliation computes
+        self.store.reconcile_cluster_aggregates("meedan_test")
+        for cluster in [cluster1, cluster2]:
+            cluster = self.store.refresh_object(cluster)
+            assert cluster.num_items_unique == 0
+
+        self.store.delete_items(items)
+
+    def test_reconcile_cluster_aggregates(self):
+        """
+        Corrupt the incrementally maintained cluster counts and check
+        that the reconciliation repairs them
+        """
+        item1r = ContentItem(
+            date_id=self.item1_test_data["date_id"],
+            run_id=self.item1_test_data["run_id"],
+            workspace_id=self.item1_test_data["workspace_id"],
+            source_id=self.item1_test_data["source_id"],
+            query_id=self.item1_test_data["query_id"],
+            raw_created_at=self.item1_test_data["raw_created_at"],
+            raw_content_id="429839388rrr",
+            raw_content=self.item1_test_data["raw_content"],
+            content_published_date=self.item1_test_data["content_published_date"],
+            content_published_url=self.item1_test_data["content_published_url"],
+        )
+        item2r = ContentItem(
+            date_id=self.item2_test_data["date_id"],
+            run_id=self.item2_test_data["run_id"],
+            workspace_id=self.item2_test_data["workspace_id"],
+            source_id=self.item2_test_data["source_id"],
+            query_id=self.item2_test_data["query_id"],
+            raw_created_at=self.item2_test_data["raw_created_at"],
+            raw_content_id="329839388rrr",
+            raw_content=self.item2_test_data["raw_content"],
+            content_published_date=self.item2_test_data["content_published_date"],
+            content_published_url=self.item2_test_data["content_published_url"],
+        )
+        item1r = self.store.initialize_item(item1r)
+        item2r = self.store.initialize_item(item2r)
+        assert item1r.content_hash == ContentItem.compute_content_hash(item1r.content)
+
+        cluster = self.store.cluster_items(first_item=item1r, second_item=item2r)
+        assert cluster.num_items == 2
+        assert cluster.num_items_unique == 2
+
+        # nothing should need repair
+        self.store.reconcile_cluster_aggregates("meedan_test")
+        cluster = self.store.refresh_object(cluster)
+        assert cluster.num_items == 2
+
+        # introduce some drift
+        cluster.num_items = 7
+        cluster.num_items_unique = 5
+        cluster = self.store.update_cluster(cluster)
+
+        num_repaired = self.store.reconcile_cluster_aggregates("meedan_test")
+        assert num_repaired >= 1
+        cluster = self.store.refresh_object(cluster)
+        assert cluster.num_items == 2, f"num_items is {cluster.num_items}"
+        assert cluster.num_items_unique == 2
+
+        self.store.delete_item(item1r)
+        self.store.delete_item(item2r)
+
+    def test_delete_items(self):
+        """
+        Bulk deletion of items updates their cluster once, including the exemplar
+        """
+        items = []
+        for n in range(4):
+            item = ContentItem(
+                date_id=self.item1_test_data["date_id"],
+                run_id=self.item1_test_data["run_id"],
+                workspace_id=self.item1_test_data["workspace_id"],
+                source_id=self.item1_test_data["source_id"],
+                query_id=self.item1_test_data["query_id"],
+                raw_created_at=self.item1_test_data["raw_created_at"],
+                raw_content_id=f"429839388bulk{n}",
+                raw_content=f"{self.item1_test_data['raw_content']} {n}",
+                content_published_date=self.item1_test_data["content_published_date"],
+                content_published_url=self.item1_test_data["content_published_url"],
+            )
+            items.append(self.store.initialize_item(item))
+        for item in items[1:]:
+            cluster = self.store.cluster_items(first_item=item, second_item=items[0])
+        assert cluster.num_items == 4
+        exemplar_id = cluster.exemplar_item_id
+
+        # delete the exemplar and one other item
+        to_delete = [item for item in items if item.content_item_id == exemplar_id]
+        to_delete += [item for item in items if item.content_item_id != exemplar_id][:1]
+        assert self.store.delete_items(to_delete) == 2
+        cluster = self.store.refresh_object(cluster)
+        assert cluster.num_items == 2, f"num_items is {cluster.num_items}"
+        assert cluster.num_items_unique == 2
+        assert cluster.exemplar_item_id not in [
+            item.content_item_id for item in to_delete
+        ]
+        for item in to_delete:
+            assert self.store.get_item(item.content_item_id) is None
+
+        # deleting the rest should remove the cluster
+        remaining = [item for item in items if item not in to_delete]
+        assert self.store.delete_items(remaining) == 2
+        assert self.store.refresh_object(cluster) is None
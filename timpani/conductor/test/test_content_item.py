@@ -283,3 +283,54 @@ class TestContentItem(unittest.TestCase):
         item1a = self.store.get_item(content_id)
         assert item1.content_item_id == item1a.content_item_id
         assert item1 == item1a
+
+    def test_scan_items(self):
+        """
+        Streaming scan pages through all of the matching items in id order
+        """
+        scan_ids = []
+        for n in range(7):
+            item = ContentItem(
+                date_id=self.test_data["date_id"],
+                run_id=self.test_data["run_id"],
+                workspace_id="meedan_scan_test",
+                source_id=self.test_data["source_id"],
+                query_id=self.test_data["query_id"],
+                raw_created_at=self.test_data["raw_created_at"],
+                raw_content_id=f"129839388scan{n}",
+                raw_content=self.test_data["raw_content"],
+            )
+            item = self.store.initialize_item(item)
+            scan_ids.append(item.content_item_id)
+
+        # page size smaller than number of items
+        items = list(
+            self.store.scan_items(
+                workspace_id="meedan_scan_test", page_size=3, use_ro_engine=False
+            )
+        )
+        assert [item.content_item_id for item in items] == scan_ids
+
+        # rows with just the requested columns
+        rows = list(
+            self.store.scan_items(
+                workspace_id="meedan_scan_test",
+                columns=[ContentItem.raw_content_id],
+                page_size=3,
+                use_ro_engine=False,
+            )
+        )
+        assert rows[0] == (scan_ids[0], "129839388scan0")
+
+        # resume part way, deleting as we go
+        for item in self.store.scan_items(
+            workspace_id="meedan_scan_test",
+            page_size=2,
+            start_after_id=scan_ids[2],
+            use_ro_engine=False,
+        ):
+            self.store.delete_item(item)
+        remaining = self.store.scan_items(
+            workspace_id="meedan_scan_test", use_ro_engine=False
+        )
+        assert [item.content_item_id for item in remaining] == scan_ids[:3]
@@ -225,6 +225,119 @@ class TestForContentItemState(unittest.TestCase):
         # TODO: store.get_items_ready_for_delete()?
         self.store.delete_item(item)
 
+    def test_claim_items_lease(self):
+        """
+        Items claimed by one process should not be returned to another
+        claim until they are released or the lease expires
+        """
+        items = []
+        for n in range(3):
+            item = ContentItem(
+                date_id=19000101,
+                run_id="run_1c43908277e34803ba7eea51b9054219",
+                workspace_id="meedan_claim_test",
+                source_id="test_source",
+                query_id="test_query_id",
+                raw_created_at=datetime.strptime(
+                    "2023-06-09 10:45:34.715998", "%Y-%m-%d %H:%M:%S.%f"
+                ),
+                raw_content_id=f"129839388claim{n}",
+                raw_content="Nếu có $ 1,200 tiếp theo share để Bảo vệ tiền thuế",
+            )
+            state = DefaultContentItemState()
+            item = self.store.initialize_item(item, state)
+            self.store.transition_item_state(item, DefaultContentItemState.STATE_READY)
+            items.append(item)
+
+        first = self.store.claim_items_in_progress(
+            "meedan_claim_test", DefaultContentItemState.STATE_READY, chunk_size=2
+        )
+        second = self.store.claim_items_in_progress(
+            "meedan_claim_test", DefaultContentItemState.STATE_READY, chunk_size=2
+        )
+        assert len(first) == 2, f"first claim {first}"
+        assert len(second) == 1, f"second claim {second}"
+        first_ids = set([item.content_item_id for item in first])
+        assert second[0].content_item_id not in first_ids
+
+        # everything is leased, so nothing more to claim
+        third = self.store.claim_items_in_progress(
+            "meedan_claim_test", DefaultContentItemState.STATE_READY
+        )
+        assert len(third) == 0, f"third claim {third}"
+
+        # released items can be claimed again, optionally with their states
+        self.store.release_items(first)
+        fourth = self.store.claim_items_in_progress(
+            "meedan_claim_test", DefaultContentItemState.STATE_READY, include_state=True
+        )
+        assert set([item.content_item_id for item, _ in fourth]) == first_ids
+        for item, state in fourth:
+            assert state.state_id == item.content_item_state_id
+            assert state.current_state == DefaultContentItemState.STATE_READY
+            assert state.lease_expiration is not None
+
+        for item in items:
+            self.store.delete_item(item)
+
+    def test_batch_transitions(self):
+        """
+        Check that a list of items can be transitioned together, and that
+        items that are not permitted to transition are reported and unchanged
+        """
+        items = []
+        for n in range(3):
+            item = ContentItem(
+                date_id=19000101,
+                run_id="run_1c43908277e34803ba7eea51b9054219",
+                workspace_id="meedan_test",
+                source_id="test_source",
+                query_id="test_query_id",
+                raw_created_at=datetime.strptime(
+                    "2023-06-09 10:45:34.715998", "%Y-%m-%d %H:%M:%S.%f"
+                ),
+                raw_content_id=f"129839388batch{n}",
+                raw_content="Nếu có $ 1,200 tiếp theo share để Bảo vệ tiền thuế",
+            )
+            item = self.store.initialize_item(item, DefaultContentItemState())
+            self.store.transition_item_state(item, DefaultContentItemState.STATE_READY)
+            items.append(item)
+        # the last item cannot be vectorized from failed state
+        self.store.transition_item_state(items[2], DefaultContentItemState.STATE_FAILED)
+
+        started = self.store.start_transitions(
+            items, DefaultContentItemState.STATE_VECTORIZED
+        )
+        assert started == [True, True, False], f"started {started}"
+        state = self.store.get_item_state(items[0].content_item_state_id)
+        assert state.transition_num == 1
+        assert state.transition_start > state.transition_end
+
+        results = self.store.transition_items_state(
+            items, DefaultContentItemState.STATE_VECTORIZED
+        )
+        assert results == [True, True, False], f"results {results}"
+        for item, expected in zip(
+            items,
+            [
+                DefaultContentItemState.STATE_VECTORIZED,
+                DefaultContentItemState.STATE_VECTORIZED,
+                DefaultContentItemState.STATE_FAILED,
+            ],
+        ):
+            state = self.store.get_item_state(item.content_item_state_id)
+            assert state.current_state == expected, f"state {state.current_state}"
+            assert state.transition_start < state.transition_end
+
+        # repeating the transition should not be permitted
+        results = self.store.transition_items_state(
+            items, DefaultContentItemState.STATE_VECTORIZED
+        )
+        assert results == [False, False, False], f"results {results}"
+
+        for item in items:
+            self.store.delete_item(item)
+
     def test_state_class_polymorphism(self):
         """
         Make sure that if we create a more specific class,
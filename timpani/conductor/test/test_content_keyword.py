@@ -73,3 +73,49 @@ class TestContentKeyword(unittest.TestCase):
         keyword2 = self.store.refresh_object(keyword2)
         assert keyword1 is None
         assert keyword2 is None
+
+    def test_attach_keywords_batch(self):
+        """
+        keywords for multiple items can be attached in one call, with
+        the state transition in the same transaction
+        """
+        items = []
+        for n in range(2):
+            item = self.store.initialize_item(
+                ContentItem(
+                    date_id=19000101,
+                    run_id="run_1c43908277e34803ba7eea51b9054219",
+                    workspace_id="meedan_test",
+                    source_id="test_source",
+                    query_id="test_keywords",
+                    raw_created_at=datetime.strptime(
+                        "2023-06-09 10:45:34.715998", "%Y-%m-%d %H:%M:%S.%f"
+                    ),
+                    raw_content_id=f"129839388batch{n}",
+                    raw_content="This text demonstrates #keywords and #hashtags",
+                    content_published_date=datetime.strptime("2023-06-12", "%Y-%m-%d"),
+                    content_published_url="http://somesite.com",
+                )
+            )
+            items.append(item)
+        # only the first item is in a state that can transition to completed
+        self.store.transition_item_state(items[0], "ready")
+
+        attached = self.store.attach_keywords(
+            items,
+            keyword_model_name="keyword_test",
+            keywords=[[("#keywords", 1.0), ("#hashtags", 0.5)], [("#other", 1.0)]],
+            state="completed",
+        )
+        assert attached == [True, False], f"attached {attached}"
+
+        keywords = list(self.store.get_keywords_for_item(items[0]))
+        assert len(keywords) == 2
+        for keyword in keywords:
+            assert keyword.content_published_date == items[0].content_published_date
+        assert len(list(self.store.get_keywords_for_item(items[1]))) == 0
+        state = self.store.get_item_state(items[0].content_item_state_id)
+        assert state.current_state == "completed"
+
+        for item in items:
+            self.store.delete_item(item)
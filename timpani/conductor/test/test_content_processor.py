@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch
 import json
+import shutil
+import tempfile
 import subprocess
 from datetime import datetime
 from timpani.app_cfg import TimpaniAppCfg
@@ -17,10 +19,12 @@ from timpani.processing_sequences.test_workflow import (
     TestContentItemState,
 )
 from timpani.raw_store.cloud_store import CloudStore
+from timpani.raw_store.debugging_file_store import DebuggingFileStore
 from timpani.content_sources.faker_test_content_source import FakerTestingContentSource
 from timpani.workspace_config.test_workspace_cfg import TestWorkspaceConfig
 from timpani.util.run_state import RunState
 from timpani.conductor.process import ContentProcessor
+from timpani.conductor.process_state import ProcessState
 from timpani.conductor.actions.delay import DelayingAction
 from timpani.conductor.actions.logging import LoggingAction
 
@@ -272,6 +276,117 @@ class TestContentProcessor(unittest.TestCase):
         test_item_2c = content_store.refresh_object(test_item_2c)
         assert test_item_2c.content == UPDATED
 
+    def test_bulk_reload_content_ignored(self):
+        """
+        Confirm that bulk inserting content with duplicate ids follows the same
+        overwrite rules as inserting one item at a time
+        """
+        CORRECTLY_PARSED = "representing correctly parsed content"
+        UPDATED = "this will represent content that was updated"
+
+        def make_item(item_id, raw_content, content=None):
+            return ContentItem(
+                run_id="testrun",
+                workspace_id=self.workspace_cfg.get_workspace_slug(),
+                source_id="junkipedia",
+                query_id="testquery",
+                date_id=20000101,
+                raw_content_id=item_id,
+                raw_created_at="2022-02-25T00:00:16.156Z",
+                raw_content=raw_content,
+                content=content,
+            )
+
+        content_store = ContentStore()
+        content_store.init_db_engine()
+        workflow = DefaultWorkflow(content_store=content_store)
+        processor = ContentProcessor(content_store=content_store)
+
+        # ---- first batch has one failed item, and a duplicate within the batch
+        batch = [
+            make_item("2222222221", CORRECTLY_PARSED),
+            make_item("2222222222", "didn't parse", content=""),
+            make_item("2222222221", UPDATED),
+        ]
+        num_ready = processor._insert_content_items(batch, workflow)
+        assert num_ready == 1, f"expected 1 ready item, not {num_ready}"
+
+        # ---- second batch overwrites the failed item, but not the good one
+        batch = [
+            make_item("2222222221", UPDATED),
+            make_item("2222222222", CORRECTLY_PARSED),
+        ]
+        num_ready = processor._insert_content_items(batch, workflow)
+        assert num_ready == 1, f"expected 1 ready item, not {num_ready}"
+        item_2b = content_store.refresh_object(batch[1])
+        assert item_2b.content == CORRECTLY_PARSED
+
+        # ---- force overwrite replaces the existing item
+        batch = [make_item("2222222221", UPDATED)]
+        num_ready = processor._insert_content_items(
+            batch, workflow, force_overwrite=True
+        )
+        assert num_ready == 1
+        item_1 = content_store.refresh_object(batch[0])
+        assert item_1.content == UPDATED
+
+    def test_parallel_raw_import(self):
+        """
+        Confirm that loading the chunks of a partition with a pool of worker
+        processes inserts the same items as loading them sequentially, and the
+        counts from the workers are recorded in the process state
+        """
+        test_size = 50
+        fake_source = FakerTestingContentSource(total_items=test_size, page_size=10)
+        run_state = RunState("test_parallel")
+
+        # the workers are given the same (non-default) raw store
+        raw_store = DebuggingFileStore(base_path=tempfile.mkdtemp())
+        processor = ContentProcessor(content_store=self.store, raw_store=raw_store)
+        self.addCleanup(shutil.rmtree, raw_store.base_path, ignore_errors=True)
+        partition = Store.Partition(
+            self.workspace_cfg.get_workspace_slug(),
+            fake_source.get_source_name(),
+            run_state.date_id,
+        )
+        self.store.erase_workspace(
+            workspace_id=partition.workspace_id, source_id=partition.source_id
+        )
+        raw_store.delete_partition(partition)
+
+        # write the fake data in several chunks
+        with raw_store.chunk_writer(partition, max_items=10) as chunk_writer:
+            for page_id in range(5):
+                chunk_writer.write_items(
+                    fake_source.get_fake_content(
+                        page_size=10,
+                        num_items=page_id * 10,
+                        workspace_id=partition.workspace_id,
+                        page_id=page_id,
+                        run_id=run_state.run_id,
+                    )
+                )
+
+        run = ProcessState("test_parallel_import")
+        processor.process_raw_content(
+            partition, run=run, bulk_insert=True, num_workers=3
+        )
+        assert run.current_state == run.STATE_COMPLETED
+        assert run.num_chunks == 5, f"expected 5 chunks, not {run.num_chunks}"
+        assert run.num_raw_items == test_size
+        assert run.num_content_items == test_size
+        assert run.num_errors == 0
+
+        in_progress = list(
+            self.store.get_items_in_progress(
+                workspace_id=partition.workspace_id,
+                batch_state=TestContentItemState.STATE_READY,
+            )
+        )
+        assert (
+            len(in_progress) == test_size
+        ), f"expected {test_size} ready items, not {len(in_progress)}"
+
     def test_dispatch_state(self):
         """
         Check the function called by dispatch threads works
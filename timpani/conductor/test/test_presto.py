@@ -78,7 +78,7 @@ class TestPrestoWrappers(unittest.TestCase):
 
     # TODO: how can we test error response callback? need to be able to trigger model error
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_presto_endpoint_submit_mock(self, mock_post):
         """
         Confirm submitting request to presto (for yake) validate structure with mock
@@ -103,7 +103,7 @@ class TestPrestoWrappers(unittest.TestCase):
             mock_post.call_args.kwargs["json"] == expected_request
         ), f"call args json was {mock_post.call_args.kwargs['json']}"
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_presto_size_error(self, mock_post):
         """
         Confirm submitting request to presto (for yake) validate structure with mock
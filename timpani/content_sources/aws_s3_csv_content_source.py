@@ -1,6 +1,9 @@
-import boto3
-import tempfile
+import io
 import csv
+import functools
+import boto3
+from botocore.exceptions import ClientError
+from gzip import GzipFile
 from urllib.parse import urlparse
 
 from timpani.workspace_config.workspace_config import WorkspaceConfig
@@ -9,6 +12,8 @@ from timpani.raw_store.store import Store
 
 # from timpani.raw_store.item import Item
 from timpani.util.run_state import RunState
+from timpani.util.s3_range_reader import S3RangeReader
+from timpani.util.s3_range_reader import is_precondition_failed
 
 import timpani.util.timpani_logger
 
@@ -25,9 +30,9 @@ class AWSS3CSVContentSource(ContentSource):
 
     # TODO: logging config
 
-    # can't find much info on optimal chunk size, 64k seems reasonable start
-    CSV_CHUNK_SIZE_BYTES = 1024 * 10
     CSV_CHUNK_SIZE_LINES = 1000
+    # first bytes of gzip compressed objects
+    GZIP_MAGIC = b"\x1f\x8b"
 
     def get_source_name(self):
         """
@@ -49,6 +54,14 @@ class AWSS3CSVContentSource(ContentSource):
             )
         """
         * TODO: Determine if there is new content since last acquistion
+        * Each query's csv object is streamed from S3 and stored as it is parsed,
+          without downloading it to local disk first
+        * The number of csv rows stored for each query (and for uncompressed
+          objects, the byte offset of the end of the rows) is checkpointed into the
+          run_state (and recorded to the raw store) as chunks are stored, so a
+          failed run retried with the same run_id skips completed queries and
+          the rows already stored. The ETag of the object is checkpointed too,
+          and if the object has been replaced since, it is read from the start
         """
         self.run_state = run_state
         # unpack some variables stored in the run state
@@ -99,44 +112,79 @@ class AWSS3CSVContentSource(ContentSource):
                     # skip this query
                     break
 
+            progress = run_state.get_progress(query_id)
+            if progress is None:
+                progress = {"num_rows": 0, "num_items": 0}
+            elif progress.get("completed"):
+                logging.info(f"Skipping completed csv query_id {query_id}")
+                workspace_total_items += progress["num_items"]
+                continue
+            else:
+                logging.info(
+                    f"Resuming csv query_id {query_id}"
+                    + f" after {progress['num_rows']} rows"
+                )
+
             # construct the query url appropriate for API and query
-            total_items = 0
             query_uri = query
             s3_url = urlparse(query_uri)
             bucket_name = s3_url.netloc
             key = s3_url.path
+            logging.info(
+                f"Streaming csv content for query_id {query_id} from {query_uri}"
+            )
 
-            # we are using tempfile so that it will be cleaned up from hosting container
-            # if there is a shutdown
-            with tempfile.NamedTemporaryFile() as temp_file:
-                logging.info(
-                    f"Downloading csv content for query_id {query_id} from {query_uri} to {temp_file.name}"
-                )
-                self.s3.meta.client.download_fileobj(
-                    Bucket=bucket_name,
-                    Key=key.lstrip("/"),
-                    Fileobj=temp_file,
-                    Callback=self._report_download_progress,
-                )
-                temp_file.flush()
-                # confirm how much data was downloaded
-                bytes_downloaded = temp_file.tell()
-                logging.info(
-                    f"Completed download of {bytes_downloaded} bytes to {temp_file.name}"
-                )
-
-                # loop the payload iterator as it yields data
-                for payload in self.process_csv_file(
-                    temp_file=temp_file,
-                    workspace_id=workspace_cfg.get_workspace_slug(),
-                    query_id=query_id,
-                ):
-                    # TODO: Need to translate encoding?
-                    # Seeing \u043f\u043e\u0434\u0434 in response instead of raw utf8 ucharachters
-
-                    # cache the data to the Raw Store
-                    store_location.append_chunk(partition_id, payload)
-                    total_items += len(payload)
+            # loop the payload iterator as it yields data, buffering
+            # the payloads into large chunks in the Raw Store
+            cursor = {
+                "num_rows": progress["num_rows"],
+                "num_items": progress["num_items"],
+                "byte_offset": progress.get("byte_offset"),
+                "etag": progress.get("etag"),
+            }
+            row_cursor = {}
+            with store_location.chunk_writer(partition_id) as chunk_writer:
+                try:
+                    for payload in self.process_s3_csv_object(
+                        bucket_name=bucket_name,
+                        key=key.lstrip("/"),
+                        workspace_id=workspace_cfg.get_workspace_slug(),
+                        query_id=query_id,
+                        skip_rows=cursor["num_rows"],
+                        byte_offset=cursor["byte_offset"],
+                        etag=cursor["etag"],
+                        row_cursor=row_cursor,
+                    ):
+                        # TODO: Need to translate encoding?
+                        # Seeing \u043f\u043e\u0434\u0434 in response instead of raw utf8 ucharachters
+
+                        # cache the data to the Raw Store
+                        cursor = {
+                            "num_rows": row_cursor["num_rows"],
+                            "num_items": cursor["num_items"] + len(payload),
+                            "byte_offset": row_cursor["byte_offset"],
+                            "etag": row_cursor["etag"],
+                        }
+                        # checkpoint once all of the rows so far have been stored
+                        chunk_writer.write_items(
+                            payload,
+                            on_stored=functools.partial(
+                                self.record_checkpoint,
+                                store_location,
+                                partition_id,
+                                query_id,
+                                **cursor,
+                            ),
+                        )
+                except Exception:
+                    # store the rows already written (which checkpoints them),
+                    # so the retry can skip them
+                    chunk_writer.flush()
+                    raise
+            self.record_checkpoint(
+                store_location, partition_id, query_id, completed=True, **cursor
+            )
+            total_items = cursor["num_items"]
 
             # TODO: track success/failure state per query id
             logging.info(
@@ -149,132 +197,154 @@ class AWSS3CSVContentSource(ContentSource):
         )
         # TODO: report sucess failure rate
 
-    def process_csv_file(self, temp_file, workspace_id: str, query_id: str):
+    def process_s3_csv_object(
+        self,
+        bucket_name: str,
+        key: str,
+        workspace_id: str,
+        query_id: str,
+        skip_rows: int = 0,
+        byte_offset: int = None,
+        etag: str = None,
+        row_cursor: dict = None,
+    ):
         """
-        Manage processing of single CSV file that has be cached locally (by downloading from S3)
+        Manage the processing of a single (possibly large) s3 object holding a CSV
+        file, which is streamed with parallel ranged requests (see S3RangeReader)
+        and parsed as it arrives, so items are yielded without waiting for (or
+        storing) the whole file. Quoted fields may contain newlines, and gzip
+        compressed objects are decompressed as they are read.
+
+        NOTE: Assumes header line
+        NOTE: Assumes utf-8
+
+        To resume, pass the number of rows already processed as skip_rows and,
+        if the object is uncompressed, the byte_offset of the end of those rows
+        so only the rest of the object is requested. Compressed objects can't be
+        read from part way through, so the rows are read again and skipped.
+        Also pass the etag of the object the rows were read from, and if the
+        object has been replaced since then all of its rows are processed.
+        If row_cursor is given, its "num_rows", "byte_offset" (None if the
+        object is compressed) and "etag" are set as each payload is yielded
         """
-        num_pages = 0
-        num_items = 0
-
-        logging.info(
-            f"Parsing {temp_file.tell()} bytes from {temp_file.name} as csv file"
-        )
-        # for some reason, need to explicitly open another connection in read mode
-        # ... or maybe just needed to seek back to the beginning?
-        with open(temp_file.name) as read_file:
-            reader = csv.reader(read_file)
-            chunk = []
-            i = 0
-            for line in reader:
+        start = byte_offset if byte_offset is not None else 0
+        try:
+            raw = S3RangeReader(
+                self.s3.meta.client, bucket_name, key, start=start, etag=etag
+            )
+        except ClientError as e:
+            if etag is None or not is_precondition_failed(e):
+                raise e
+            logging.warning(
+                f"S3 object {bucket_name}/{key} has been replaced since it was"
+                + f" checkpointed, reading all of its rows (not skipping {skip_rows})"
+            )
+            start = 0
+            skip_rows = 0
+            raw = S3RangeReader(self.s3.meta.client, bucket_name, key)
+        with raw:
+            stream = io.BufferedReader(raw)
+            position = {"byte_offset": start}
+            if start == 0 and stream.peek(2)[:2] == self.GZIP_MAGIC:
+                logging.info(f"Decompressing gzip csv object {bucket_name}/{key}")
+                stream = GzipFile(fileobj=stream, mode="rb")
+                position["byte_offset"] = None
+            reader = csv.reader(self._read_csv_lines(stream, position))
+            if start == 0:
                 # skip header
-                if i > 0:
-                    chunk.append(line)
-
-                    if i % self.CSV_CHUNK_SIZE_LINES == 0:
-                        payload = self.process_csv_chunk(
-                            chunk=chunk,
-                            workspace_id=workspace_id,
-                            query_id=query_id,
-                            page_id=num_pages,
-                        )
-
-                        num_pages += 1
-                        num_items += len(payload)
-                        logging.info(
-                            f"Processed query csv file chunk {num_pages} stored {num_items} items.."
-                        )
-                        # empty the chunk array
-                        chunk = []
-                        yield payload
-                i += 1
-
-            # this is ugly but need to ensure the last incomplete chunk is written
-
-            payload = self.process_csv_chunk(
-                chunk=chunk,
+                next(reader, None)
+                num_rows = 0
+            else:
+                # the rows before the offset are not read again
+                num_rows, skip_rows = skip_rows, 0
+            for payload in self.process_csv_rows(
+                rows=reader,
                 workspace_id=workspace_id,
                 query_id=query_id,
-                page_id=num_pages,
-            )
-            logging.debug(f".. flushing remaining {len(payload)} items from last chunk")
-
-            num_pages += 1
-            num_items += len(payload)
-            yield payload
-
-        logging.info(
-            f"Processed query csv file chunk {num_pages} stored {num_items} items.."
-        )
-
-    def _report_download_progress(self, bytes_transfered):
+                skip_rows=skip_rows,
+                num_rows=num_rows,
+                row_cursor=row_cursor,
+            ):
+                if row_cursor is not None:
+                    # the reader has read up to the end of the last row
+                    row_cursor["byte_offset"] = position["byte_offset"]
+                    row_cursor["etag"] = raw.etag
+                yield payload
+
+    def _read_csv_lines(self, stream, position: dict):
         """
-        Callback for S3 object download to periodically report on progress for large files
+        Yields the decoded lines of the binary stream, adding the size of each
+        line to position["byte_offset"] (unless it is None) as it is read
         """
-        logging.debug(f"transfered {bytes_transfered} bytes to tempfile ...")
+        for line_num, line in enumerate(stream):
+            if position["byte_offset"] is not None:
+                position["byte_offset"] += len(line)
+            # strip any byte order mark at the start of the file
+            yield line.decode("utf-8-sig" if line_num == 0 else "utf-8")
 
-    def process_s3_csv_object(self, s3_object, workspace_id: str, query_id: str):
+    def process_csv_rows(
+        self,
+        rows,
+        workspace_id: str,
+        query_id: str,
+        skip_rows: int = 0,
+        num_rows: int = 0,
+        row_cursor: dict = None,
+    ):
         """
-        Manage the processing of a processing a single (possible large) s3 object
-        mapping to a CSV file at an s3 URI (pagination, chunking, storage)
-        https://stackoverflow.com/questions/51085539/streaming-in-chunking-csvs-from-s3-to-python
-
-        Seems have to do this by paging through the file in bytes, which don't always map to lines
-        (Abandonded this infavor of downloading full file and parsing)
-
-        NOTE: Assumes header file
-        NOTE: Assumes uncompressed
-        NOTE: Assumes no embeded newlines!
+        Group the parsed csv rows into chunks of CSV_CHUNK_SIZE_LINES rows and
+        yield each as a payload of items (see process_csv_chunk()), skipping
+        the first skip_rows rows. num_rows is the number of rows that were read
+        before these. If row_cursor is given, its "num_rows" is set to the total
+        number of rows read as each payload is yielded
         """
-
-        # TODO: strip header?
-
-        body = s3_object["Body"]
-
-        # split on newlines)
-        newline = "\n".encode()
-        partial_chunk = b""
-
         num_pages = 0
         num_items = 0
-        while True:
-            chunk = partial_chunk + body.read(self.CSV_CHUNK_SIZE_BYTES)
-
-            # If nothing was read there is nothing to process
-            if chunk == b"":
-                break
-
-            last_newline = chunk.rindex(newline)
-            print(f"last_newline: {last_newline}")
-
-            # write to result buffer
-            result = chunk[0:last_newline].decode("utf-8")
-
-            if num_pages == 0:
-                # we need to strip the first header line
-                result = result.split("\r\n")[2:]
-                # TODO: hang onto the headers for column names and use for error debugging
-
-            # keep the partial line we have read here to prepend on the next loop
-            chunk_boundry = last_newline + 1
-            partial_chunk = chunk[chunk_boundry:]
-            print(f"partial chunk: {partial_chunk}")
-
-            # chunk it up by lines and convert to list of raw store items
+        chunk = []
+        for row in rows:
+            num_rows += 1
+            if skip_rows > 0:
+                skip_rows -= 1
+                continue
+            chunk.append(row)
+            if len(chunk) < self.CSV_CHUNK_SIZE_LINES:
+                continue
             payload = self.process_csv_chunk(
-                chunk=result,
+                chunk=chunk,
                 workspace_id=workspace_id,
                 query_id=query_id,
                 page_id=num_pages,
             )
-
             num_pages += 1
             num_items += len(payload)
             logging.info(
                 f"Processed query csv file chunk {num_pages} stored {num_items} items.."
             )
+            # empty the chunk array
+            chunk = []
+            if row_cursor is not None:
+                row_cursor["num_rows"] = num_rows
+            yield payload
 
+        # ensure the last incomplete chunk is written
+        if len(chunk) > 0:
+            payload = self.process_csv_chunk(
+                chunk=chunk,
+                workspace_id=workspace_id,
+                query_id=query_id,
+                page_id=num_pages,
+            )
+            logging.debug(f".. flushing remaining {len(payload)} items from last chunk")
+            num_pages += 1
+            num_items += len(payload)
+            if row_cursor is not None:
+                row_cursor["num_rows"] = num_rows
             yield payload
 
+        logging.info(
+            f"Processed query csv file chunk {num_pages} stored {num_items} items.."
+        )
+
     def process_csv_chunk(self, chunk, workspace_id, query_id, page_id):
         """
         Must be implemented by subclass.
@@ -1,3 +1,4 @@
+import threading
 import sentry_sdk
 from timpani.app_cfg import TimpaniAppCfg
 from timpani.workspace_config.workspace_config import WorkspaceConfig
@@ -13,6 +14,8 @@ class ContentSource(object):
         environment=app_cfg.deploy_env_label,
         traces_sample_rate=1.0,
     )
+    # serializes checkpoints, see record_checkpoint()
+    checkpoint_lock = threading.Lock()
 
     def get_source_name(self):
         """
@@ -29,3 +32,20 @@ class ContentSource(object):
         limit_downloads: bool = False,
     ):
         raise NotImplementedError
+
+    def record_checkpoint(
+        self,
+        store_location: Store,
+        partition_id: Store.Partition,
+        checkpoint_key: str,
+        **progress,
+    ):
+        """
+        Record progress of the acquisition into the run_state, and write the
+        run_state to the raw store so that a failed run can be resumed from the
+        checkpoint even if this process is killed. Checkpoints are recorded one
+        at a time, so an older copy of the run_state never replaces a newer one
+        """
+        with self.checkpoint_lock:
+            self.run_state.record_progress(checkpoint_key, **progress)
+            store_location.record_partition_run_state(self.run_state, partition_id)
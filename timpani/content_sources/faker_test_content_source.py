@@ -59,22 +59,24 @@ class FakerTestingContentSource(object):
         num_pages = 0
         num_items = 0
 
-        while num_items < self.total_items:
-            # the page size may return too many items
-            this_page_size = self.page_size
-            if num_items + self.page_size > self.total_items:
-                # only request enough to finish the batch
-                this_page_size = self.total_items - num_items
-            payload = self.get_fake_content(
-                this_page_size,
-                num_items,
-                workspace_cfg.get_workspace_slug(),
-                page_id=num_pages,
-                run_id=run_state.run_id,
-            )
-            store_location.append_chunk(partition_id, payload)
-            num_pages += 1
-            num_items += self.page_size
+        # buffer the pages into large chunks in the Raw Store
+        with store_location.chunk_writer(partition_id) as chunk_writer:
+            while num_items < self.total_items:
+                # the page size may return too many items
+                this_page_size = self.page_size
+                if num_items + self.page_size > self.total_items:
+                    # only request enough to finish the batch
+                    this_page_size = self.total_items - num_items
+                payload = self.get_fake_content(
+                    this_page_size,
+                    num_items,
+                    workspace_cfg.get_workspace_slug(),
+                    page_id=num_pages,
+                    run_id=run_state.run_id,
+                )
+                chunk_writer.write_items(payload)
+                num_pages += 1
+                num_items += self.page_size
 
         logging.info(
             "Completed creading fake content for workspace_id {0}".format(
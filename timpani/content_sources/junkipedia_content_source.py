@@ -1,8 +1,10 @@
 import json
-import requests
+import datetime
+import threading
 from urllib3.exceptions import ProtocolError
-import math
 import sentry_sdk
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 
 from timpani.workspace_config.workspace_config import WorkspaceConfig
 from timpani.content_sources.content_source import ContentSource
@@ -10,9 +12,11 @@ from timpani.util.ssm import AccessSSM
 from timpani.raw_store.store import Store
 from timpani.raw_store.item import Item
 from timpani.util.run_state import RunState
+from timpani.util.rate_limiter import RateLimiter
 
 import timpani.util.timpani_logger
 from timpani.util.metrics_exporter import TelemetryMeterExporter
+from timpani.util.http_session import get_http_session
 
 logging = timpani.util.timpani_logger.get_logger()
 
@@ -49,6 +53,27 @@ class JunkipediaContentSource(ContentSource):
     # daily requests will broken into sub queries to try to avoid hitting
     # junkipeidia limits
     NUM_SUB_TIME_BINS = 1  # do it all in one bin
+    # sub queries are split until they have at most this many items, and merged
+    # while they have less (see get_query_time_bins())
+    MAX_ITEMS_PER_BIN = 2000
+    # sub queries are not split shorter than this, even if they have more items
+    MIN_BIN_DURATION = datetime.timedelta(minutes=1)
+    # limit on the number of items junkipedia can page through for a query
+    MAX_API_PAGE_ITEMS = 10000
+
+    # shared by the requests made with the api key of the acquisition
+    rate_limiter = None
+
+    def __init__(self):
+        # number of items for each (query, bin_start, bin_end), see probe_query_count()
+        self.probe_counts = {}
+        # the lock of each key being probed, so it is only requested once
+        self.probe_locks = {}
+        self.probe_counts_lock = threading.Lock()
+        # the ChunkWriter of each worker thread, see get_thread_chunk_writer()
+        self.thread_state = threading.local()
+        self.chunk_writers = []
+        self.chunk_writers_lock = threading.Lock()
 
     def get_source_name(self):
         return "junkipedia"
@@ -80,9 +105,17 @@ class JunkipediaContentSource(ContentSource):
         * Page through API results
         * break open result chunks and write to object store with meta data
         * Count sucesses and failures
-        * TODO: restart failed query
+        * Progress is checkpointed into the run_state (and recorded to the raw store)
+          as chunks are stored, so a failed run retried with the same run_id
+          resumes each time bin from the page after the last one stored
         * TODO: track state https://meedan.atlassian.net/browse/CV2-3009
-        * TODO: ratelimit
+        * Requests with the same API key share a rate limit
+          (JUNKIPEDIA_REQUESTS_PER_SECOND)
+        * Queries and their time bins are acquired concurrently by a pool of
+          JUNKIPEDIA_MAX_WORKERS threads, each buffering the pages it downloads
+          into its own raw store chunks (see get_thread_chunk_writer()).
+          The outcome of each query is recorded in the run_state, and if any
+          query fails the error is raised after the others have completed
 
         NOTE: junkipedia doesn't seem to be tracking query state, so could get
         inconsistant results if list content changes while paging or if
@@ -137,102 +170,472 @@ class JunkipediaContentSource(ContentSource):
                     single_query_id
                 )
             )
+            queries = {
+                query_id: query
+                for query_id, query in queries.items()
+                if query_id == single_query_id
+            }
+
+        # all of the requests made with the api key share a rate limit
+        self.rate_limiter = RateLimiter.get_shared(
+            api_secret_key, rate=self.app_cfg.junkipedia_requests_per_second
+        )
+
+        # each query is split into time bins, and the queries and their bins
+        # are acquired on a pool of workers (one at a time by default)
+        max_workers = max(1, self.app_cfg.junkipedia_max_workers)
+        logging.info(
+            f"Acquiring {len(queries)} junkipedia queries with {max_workers} workers"
+        )
+        query_items = {query_id: 0 for query_id in queries}
+        query_errors = {}
+        self.thread_state = threading.local()
+        self.chunk_writers = []
+        self.chunk_writers_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            bin_futures = {}
+            query_futures = {
+                pool.submit(
+                    self.plan_query_time_bins,
+                    store_location=store_location,
+                    partition_id=partition_id,
+                    query_id=query_id,
+                    query=query,
+                    api_secret_key=api_secret_key,
+                    time_range_start=time_range_start,
+                    time_range_end=time_range_end,
+                ): query_id
+                for query_id, query in queries.items()
+            }
+            # start acquiring the bins of each query as soon as they are known
+            for future in as_completed(query_futures):
+                query_id = query_futures[future]
+                try:
+                    time_bins = future.result()
+                except Exception as e:
+                    logging.error(f"Unable to plan junkipedia query {query_id}: {e}")
+                    query_errors[query_id] = e
+                    continue
+                for bin_num, (bin_start, bin_end) in enumerate(time_bins):
+                    bin_future = pool.submit(
+                        self.acquire_query_bin,
+                        store_location=store_location,
+                        partition_id=partition_id,
+                        query_id=query_id,
+                        query=queries[query_id],
+                        bin_start=bin_start,
+                        bin_end=bin_end,
+                        api_secret_key=api_secret_key,
+                        limit_downloads=limit_downloads,
+                        checkpoint_key=f"{query_id}/{bin_num}",
+                    )
+                    bin_futures[bin_future] = query_id
+
+            for future in as_completed(bin_futures):
+                query_id = bin_futures[future]
+                try:
+                    query_items[query_id] += future.result()
+                except Exception as e:
+                    logging.error(f"Unable to acquire junkipedia query {query_id}: {e}")
+                    # keep the first error of the query
+                    query_errors.setdefault(query_id, e)
+
+        # store the pages still buffered by each worker, which also records
+        # the checkpoints of the bins they are from (even if another fails)
+        flush_errors = []
+        for chunk_writer in self.chunk_writers:
+            try:
+                chunk_writer.flush()
+            except Exception as e:
+                logging.error(f"Unable to store buffered junkipedia items: {e}")
+                flush_errors.append(e)
+        if len(flush_errors) > 0:
+            raise flush_errors[0]
+
+        for query_id in queries:
+            if query_id in query_errors:
+                run_state.record_query_result(
+                    query_id,
+                    run_state.STATE_FAILED,
+                    num_items=query_items[query_id],
+                    error=str(query_errors[query_id]),
+                )
+            else:
+                logging.info(
+                    f"Acquired {query_items[query_id]} junkipedia items"
+                    + f" for query_id {query_id}"
+                )
+                run_state.record_query_result(
+                    query_id, run_state.STATE_COMPLETED, num_items=query_items[query_id]
+                )
 
-        # TODO: pool of workers to process each query indepenently
-        for query_id, query in queries.items():
-            # if we are only doing a single query, check if it is the one we are looking for
-            if single_query_id is not None:
-                if query_id != single_query_id:
-                    # skip this query
-                    break
-
-            # default is do the time range in 1 bin
-            num_sub_bins = self.NUM_SUB_TIME_BINS
-            # run a test query to check how many items will need to process
-            test_query_url = self.construct_junkipedia_url(
-                query, time_range_start, time_range_end
+        if len(query_errors) > 0:
+            # the other queries were still acquired, but the run has failed
+            logging.error(
+                f"{len(query_errors)} of {len(queries)} junkipedia queries failed"
             )
-            with requests.get(
-                test_query_url,
-                headers={
-                    "Authorization": "Bearer {}".format(api_secret_key),
-                    "User-Agent": "Meedan Timpani/0.1 (Booker)",  # TODO: cfg should know version
-                },
+            raise next(iter(query_errors.values()))
+
+        logging.info(
+            "Completed junkipedia content aquistion for workspace_id {0}".format(
+                workspace_cfg.get_workspace_slug()
+            )
+        )
+        # TODO: report sucess failure rate
+
+    def plan_query_time_bins(
+        self,
+        store_location: Store,
+        partition_id: Store.Partition,
+        query_id: str,
+        query: str,
+        api_secret_key: str,
+        time_range_start,
+        time_range_end,
+    ):
+        """
+        Returns the time bins to acquire the query in (see get_query_time_bins()),
+        and checkpoints them so that a resumed run acquires the same bins (which
+        might not be the case if they were planned again after more content was
+        published). If the run_state already has a checkpoint for the query,
+        those bins are returned without probing the api
+        """
+        planned = self.run_state.get_progress(query_id)
+        if planned is not None:
+            logging.info(f"Resuming junkipedia query {query_id} from checkpoint")
+            return [
+                (
+                    datetime.datetime.strptime(bin_start, RunState.DATE_FORMAT),
+                    datetime.datetime.strptime(bin_end, RunState.DATE_FORMAT),
+                )
+                for bin_start, bin_end in planned["time_bins"]
+            ]
+        time_bins = self.get_query_time_bins(
+            query, api_secret_key, time_range_start, time_range_end
+        )
+        self.record_checkpoint(
+            store_location,
+            partition_id,
+            query_id,
+            time_bins=[
+                [
+                    bin_start.strftime(RunState.DATE_FORMAT),
+                    bin_end.strftime(RunState.DATE_FORMAT),
+                ]
+                for bin_start, bin_end in time_bins
+            ],
+        )
+        return time_bins
+
+    def get_query_time_bins(
+        self, query: str, api_secret_key: str, time_range_start, time_range_end
+    ):
+        """
+        Split the time range into sub intervals (time bins) that each have few
+        enough items to page through without hitting the junkipedia limit.
+        Starting from NUM_SUB_TIME_BINS equal bins, any bin whose probe query
+        returns more than MAX_ITEMS_PER_BIN items is bisected (recursively), then
+        adjacent bins are merged as long as their total stays within the limit,
+        so that quiet periods don't need extra requests.
+        Returns a list of (bin_start, bin_end) tuples covering the range
+        """
+        num_sub_bins = self.NUM_SUB_TIME_BINS
+        bin_duration = (time_range_end - time_range_start) / num_sub_bins
+        counted_bins = []
+        for i in range(num_sub_bins):
+            bin_start = time_range_start + i * bin_duration
+            # the last bin ends exactly at the end of the range (no rounding)
+            if i == num_sub_bins - 1:
+                bin_end = time_range_end
+            else:
+                bin_end = time_range_start + (i + 1) * bin_duration
+            counted_bins.extend(
+                self.bisect_time_bin(query, api_secret_key, bin_start, bin_end)
+            )
+        counted_bins = self.merge_time_bins(counted_bins)
+
+        total_items = sum(num_items for _, _, num_items in counted_bins)
+        logging.info(
+            f"query is expected to return {total_items} items,"
+            + f" will fetch in {len(counted_bins)} sub intervals"
+        )
+        return [(bin_start, bin_end) for bin_start, bin_end, _ in counted_bins]
+
+    def bisect_time_bin(
+        self, query: str, api_secret_key: str, bin_start, bin_end, num_items=None
+    ):
+        """
+        Recursively split the time bin in half until the query returns at most
+        MAX_ITEMS_PER_BIN items in each part (or the parts would be shorter than
+        MIN_BIN_DURATION). Only the first half of each split is probed, the
+        second half is assumed to have the rest of the items.
+        Returns a list of (bin_start, bin_end, num_items) tuples
+        """
+        if num_items is None:
+            num_items = self.probe_query_count(
+                query, api_secret_key, bin_start, bin_end
+            )
+        bin_duration = bin_end - bin_start
+        if (
+            num_items <= self.MAX_ITEMS_PER_BIN
+            or bin_duration < 2 * self.MIN_BIN_DURATION
+        ):
+            if num_items > self.MAX_API_PAGE_ITEMS:
+                logging.warning(
+                    f"Junkipedia query {query} has {num_items} items between"
+                    + f" {bin_start} and {bin_end}, only the first"
+                    + f" {self.MAX_API_PAGE_ITEMS} can be acquired"
+                )
+            return [(bin_start, bin_end, num_items)]
+
+        # split on a whole second, the resolution of the api time filters
+        bin_middle = bin_start + datetime.timedelta(
+            seconds=bin_duration.total_seconds() // 2
+        )
+        first_items = self.probe_query_count(
+            query, api_secret_key, bin_start, bin_middle
+        )
+        second_items = max(0, num_items - first_items)
+        return self.bisect_time_bin(
+            query, api_secret_key, bin_start, bin_middle, first_items
+        ) + self.bisect_time_bin(
+            query, api_secret_key, bin_middle, bin_end, second_items
+        )
+
+    def merge_time_bins(self, counted_bins):
+        """
+        Merge adjacent (bin_start, bin_end, num_items) bins while the merged bin
+        has at most MAX_ITEMS_PER_BIN items
+        """
+        merged_bins = []
+        for bin_start, bin_end, num_items in counted_bins:
+            if len(merged_bins) > 0:
+                previous_start, previous_end, previous_items = merged_bins[-1]
+                if (
+                    previous_end == bin_start
+                    and previous_items + num_items <= self.MAX_ITEMS_PER_BIN
+                ):
+                    merged_bins[-1] = (
+                        previous_start,
+                        bin_end,
+                        previous_items + num_items,
+                    )
+                    continue
+            merged_bins.append((bin_start, bin_end, num_items))
+        return merged_bins
+
+    def probe_query_count(
+        self, query: str, api_secret_key: str, bin_start, bin_end
+    ) -> int:
+        """
+        Returns the number of items the query has published within the time bin,
+        from the metadata of a single item page. Counts are cached by query and
+        bin, so they are only requested once by this content source
+        """
+        cache_key = (query, bin_start, bin_end)
+        with self.probe_counts_lock:
+            num_items = self.probe_counts.get(cache_key)
+            if num_items is not None:
+                return num_items
+            probe_lock = self.probe_locks.setdefault(cache_key, threading.Lock())
+        # other threads probing the same bin wait for this one's count
+        with probe_lock:
+            with self.probe_counts_lock:
+                num_items = self.probe_counts.get(cache_key)
+            if num_items is not None:
+                return num_items
+            probe_url = self.construct_junkipedia_url(
+                query, bin_start, bin_end, page_size=1
+            )
+            self.wait_for_rate_limit()
+            with get_http_session("junkipedia").get(
+                probe_url,
+                headers=self.get_request_headers(api_secret_key),
             ) as r:
                 # raise execption for https status codes 404, etc
                 if r.status_code >= 400:
                     logging.error(r.text)
                 r.raise_for_status()
-                test_obj = json.loads(r.text)
-                total_items = self.get_progress_info(test_obj)[
-                    0
-                ]  # total items is included in a meta field
-                if total_items > 2000:
-                    num_sub_bins = math.ceil(total_items / 1000.0)
-
-            # default is do the time range in 1 bin
-            # num_sub_bins = workspace_cfg.get_num_query_bins()
-            bin_duration = (time_range_end - time_range_start) / num_sub_bins
-            bin_start = time_range_start
-            bin_end = time_range_start + bin_duration
-
+                probe_obj = json.loads(r.text)
+                self.check_response_status(probe_obj)
+                # total items is included in a meta field
+                num_items = self.get_progress_info(probe_obj)[0]
+            with self.probe_counts_lock:
+                self.probe_counts[cache_key] = num_items
+        return num_items
+
+    def acquire_query_bin(
+        self,
+        store_location: Store,
+        partition_id: Store.Partition,
+        query_id: str,
+        query: str,
+        bin_start,
+        bin_end,
+        api_secret_key: str,
+        limit_downloads: bool = False,
+        checkpoint_key: str = None,
+    ):
+        """
+        Download the content for a query published within a single time bin, and
+        write it to the raw store with the ChunkWriter of the current thread
+        (see get_thread_chunk_writer()), so the last pages of the bin may still
+        be buffered when it returns. Returns the number of items acquired
+
+        If a checkpoint_key is given, the url of the next page to request is
+        checkpointed each time the pages before it have been stored (and the
+        bin is checkpointed as completed once all of its pages are stored), and
+        acquisition resumes from the checkpoint if the run_state has one.
+        NOTE: a page that was partly stored when the run failed is requested
+        again, so its items may be stored twice
+        """
+        progress = None
+        if checkpoint_key is not None:
+            progress = self.run_state.get_progress(checkpoint_key)
+        if progress is None:
+            # construct the query url appropriate for API and query
+            cursor = {
+                "next_url": self.construct_junkipedia_url(query, bin_start, bin_end),
+                "num_pages": 0,
+                "num_items": 0,
+            }
+        elif progress.get("completed"):
+            logging.info(f"Skipping completed junkipedia time bin {checkpoint_key}")
+            return progress["num_items"]
+        else:
             logging.info(
-                f"query is expected to return {total_items} items, will fetch in {num_sub_bins} sub intervals of duration {bin_duration}"
+                f"Resuming junkipedia time bin {checkpoint_key} after"
+                + f" {progress['num_pages']} pages"
             )
+            cursor = {
+                "next_url": progress["next_url"],
+                "num_pages": progress["num_pages"],
+                "num_items": progress["num_items"],
+            }
+        query_url = cursor["next_url"]
 
-            while bin_end <= time_range_end:
-                # construct the query url appropriate for API and query
-                query_url = self.construct_junkipedia_url(query, bin_start, bin_end)
+        logging.info(
+            "Downloading junkipedia content for query_id {0} from {1}".format(
+                query_id, query_url
+            )
+        )
+        self.request_count_metric.add(
+            1,
+            attributes={
+                "workspace_id": partition_id.workspace_id,
+                "source_id": partition_id.source_id,
+            },
+        )
 
-                logging.info(
-                    "Downloading junkipedia content for query_id {0} from {1}".format(
-                        query_id, query_url
-                    )
+        page_cursor = {}
+        # buffer the pages of results into large chunks in the Raw Store,
+        # shared with the other bins acquired by this thread
+        chunk_writer = self.get_thread_chunk_writer(store_location, partition_id)
+        try:
+            # loop the payload iterator as it yields data
+            for payload in self.process_junkipedia_query_url(
+                workspace_id=partition_id.workspace_id,
+                query_id=query_id,
+                query_url=query_url,
+                api_secret_key=api_secret_key,
+                limit_downloads=limit_downloads,
+                first_page_num=cursor["num_pages"],
+                page_cursor=page_cursor,
+            ):
+                # TODO: Need to translate encoding?
+                # Seeing \u043f\u043e\u0434\u0434 in response instead of raw utf8 ucharachters
+
+                # cache the data to the Raw Store
+                cursor = {
+                    "next_url": page_cursor["next_url"],
+                    "num_pages": cursor["num_pages"] + 1,
+                    "num_items": cursor["num_items"] + len(payload),
+                }
+                # checkpoint once all of the pages so far have been stored
+                chunk_writer.write_items(
+                    payload,
+                    on_stored=self._checkpoint_callback(
+                        store_location, partition_id, checkpoint_key, cursor
+                    ),
                 )
-                self.request_count_metric.add(
-                    1,
-                    attributes={
-                        "workspace_id": partition_id.workspace_id,
-                        "source_id": partition_id.source_id,
-                    },
+        except Exception:
+            # store the pages already written, so the retry can skip them
+            chunk_writer.flush()
+            raise
+        if checkpoint_key is not None:
+            chunk_writer.when_stored(
+                self._checkpoint_callback(
+                    store_location, partition_id, checkpoint_key, cursor, completed=True
                 )
+            )
+        return cursor["num_items"]
 
-                # loop the payload iterator as it yields data
-                for payload in self.process_junkipedia_query_url(
-                    workspace_id=workspace_cfg.get_workspace_slug(),
-                    query_id=query_id,
-                    query_url=query_url,
-                    api_secret_key=api_secret_key,
-                    limit_downloads=limit_downloads,
-                ):
-                    # TODO: Need to translate encoding?
-                    # Seeing \u043f\u043e\u0434\u0434 in response instead of raw utf8 ucharachters
+    def get_thread_chunk_writer(
+        self, store_location: Store, partition_id: Store.Partition
+    ):
+        """
+        Returns the ChunkWriter of the current worker thread, so that the pages
+        of the (possibly small) time bins acquired by the thread are stored in
+        large chunks. The writers are flushed when acquisition is complete
+        """
+        chunk_writer = getattr(self.thread_state, "chunk_writer", None)
+        if chunk_writer is None:
+            chunk_writer = store_location.chunk_writer(partition_id)
+            self.thread_state.chunk_writer = chunk_writer
+            with self.chunk_writers_lock:
+                self.chunk_writers.append(chunk_writer)
+        return chunk_writer
+
+    def _checkpoint_callback(
+        self,
+        store_location: Store,
+        partition_id: Store.Partition,
+        checkpoint_key: str,
+        cursor: dict,
+        completed: bool = False,
+    ):
+        """
+        Internal function returning a callback to record the cursor as the
+        checkpoint of the time bin, or None if it isn't checkpointed
+        """
+        if checkpoint_key is None:
+            return None
+        progress = dict(cursor, completed=True) if completed else cursor
 
-                    # cache the data to the Raw Store
-                    store_location.append_chunk(partition_id, payload)
+        def record():
+            self.record_checkpoint(
+                store_location, partition_id, checkpoint_key, **progress
+            )
 
-                # start the text time bin
-                bin_start = bin_end
-                bin_end += bin_duration
+        return record
 
-            # TODO: track success/failure state per query id
-            logging.info(
-                "Acquired junkipedia content for query_id {0}".format(query_id)
-            )
+    def get_request_headers(self, api_secret_key: str):
+        """
+        Headers for junkipedia requests, including the api secret
+        Authorization: Bearer Xyz123ApiKey
+        """
+        return {
+            "Authorization": "Bearer {}".format(api_secret_key),
+            "User-Agent": "Meedan Timpani/0.1 (Booker)",  # TODO: cfg should know version
+        }
 
-        logging.info(
-            "Completed junkipedia content aquistion for workspace_id {0}".format(
-                workspace_cfg.get_workspace_slug()
-            )
-        )
-        # TODO: report sucess failure rate
+    def wait_for_rate_limit(self):
+        """
+        Block until another request can be made with the api key of the
+        current acquisition (if any)
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
 
     def construct_junkipedia_url(
-        self, query: str, time_range_start=None, time_range_end=None
+        self, query: str, time_range_start=None, time_range_end=None, page_size=None
     ):
         """
         Construct the appropriate junkipedia url syntax
+        (page_size defaults to JUNKIPEDIA_API_PAGE_SIZE)
         """
+        if page_size is None:
+            page_size = self.JUNKIPEDIA_API_PAGE_SIZE
         query_timerange = ""
         # convert the datetime.date arguments into the format this API understands
         # ?published_at_from=1641038400&published_at_to=1641124800
@@ -253,7 +656,7 @@ class JunkipediaContentSource(ContentSource):
         query_url = (
             self.JUNKIPEDIA_API_BASE_URL
             + query
-            + "&per_page={}".format(self.JUNKIPEDIA_API_PAGE_SIZE)
+            + "&per_page={}".format(page_size)
             + query_timerange
         )
 
@@ -266,22 +669,24 @@ class JunkipediaContentSource(ContentSource):
         query_url: str,
         api_secret_key: str,
         limit_downloads: bool = False,
+        first_page_num: int = 0,
+        page_cursor: dict = None,
     ):
         """
         Manage the processing of a single API call url (pagination, chunking, storage)
-        goal is to be able to use this to re-run a failed download
+        goal is to be able to use this to re-run a failed download.
+        To resume a query, pass the url of the next page and the number of pages
+        already processed as first_page_num. If page_cursor is given, its
+        "next_url" is set to the url of the page after each payload as it is yielded
 
         https://docs.junkipedia.org/reference-material/api/query-string-parameters/pagination
         """
         # set request headers with API secret: Authorization: Bearer Xyz123ApiKey
-        headers = {
-            "Authorization": "Bearer {}".format(api_secret_key),
-            "User-Agent": "Meedan Timpani/0.1 (Booker)",  # TODO: cfg should know version
-        }
+        headers = self.get_request_headers(api_secret_key)
 
         # start with original url and then loop pagination using next urls if there are any
         next_query = query_url
-        num_pages = 0
+        num_pages = first_page_num
         num_items = 0
         max_retries = 3
 
@@ -299,7 +704,10 @@ class JunkipediaContentSource(ContentSource):
             retries = 0
             while retries < max_retries:
                 try:
-                    with requests.get(next_query, headers=headers, timeout=60) as r:
+                    self.wait_for_rate_limit()
+                    with get_http_session("junkipedia").get(
+                        next_query, headers=headers, timeout=60
+                    ) as r:
                         # raise execption for https status codes 404, etc
                         r.raise_for_status()
 
@@ -327,6 +735,8 @@ class JunkipediaContentSource(ContentSource):
                         )
                         # exit retry block
                         retries = max_retries + 1
+                        if page_cursor is not None:
+                            page_cursor["next_url"] = next_query
                         yield payload
                 except ProtocolError as e:
                     # TODO: we could add other specific exceptions here
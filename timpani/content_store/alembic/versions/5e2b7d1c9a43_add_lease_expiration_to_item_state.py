@@ -0,0 +1,35 @@
+"""add lease_expiration to item state
+
+Revision ID: 5e2b7d1c9a43
+Revises: c819aba00a7f
+Create Date: 2024-04-22 10:41:07.318204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e2b7d1c9a43"
+down_revision: Union[str, None] = "c819aba00a7f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add a column to the content item state for recording when the claim
+    on the item by a workflow processing worker will expire.
+    Existing rows are left NULL, meaning unclaimed
+    """
+    op.add_column(
+        "content_item_state",
+        sa.Column("lease_expiration", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("content_item_state", "lease_expiration")
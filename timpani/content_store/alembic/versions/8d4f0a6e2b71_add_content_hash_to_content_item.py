@@ -0,0 +1,54 @@
+"""add content_hash to content item
+
+Revision ID: 8d4f0a6e2b71
+Revises: 5e2b7d1c9a43
+Create Date: 2024-04-29 15:12:48.904317
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d4f0a6e2b71"
+down_revision: Union[str, None] = "5e2b7d1c9a43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add a hash of the content to content items so that the unique item counts
+    of clusters can be maintained incrementally, and indexes for the cluster
+    bookeeping lookups
+    (this could be slow if data already in tables)
+    """
+    op.add_column(
+        "content_item",
+        sa.Column("content_hash", sa.String(length=32), nullable=True),
+    )
+    # compute hashes for any pre-existing rows (matches ContentItem.compute_content_hash())
+    op.execute(
+        "update content_item set content_hash=md5(content) where content is not NULL"
+    )
+    op.create_index(
+        index_name="ix_content_item_cluster_hash",
+        table_name="content_item",
+        columns=["content_cluster_id", "content_hash"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        index_name="ix_content_item_cluster_created",
+        table_name="content_item",
+        columns=["content_cluster_id", "raw_created_at"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_content_item_cluster_created", table_name="content_item")
+    op.drop_index("ix_content_item_cluster_hash", table_name="content_item")
+    op.drop_column("content_item", "content_hash")
@@ -0,0 +1,43 @@
+"""add load counts to process state
+
+Revision ID: a3f9c2d81e56
+Revises: 8d4f0a6e2b71
+Create Date: 2024-05-06 11:20:35.612093
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f9c2d81e56"
+down_revision: Union[str, None] = "8d4f0a6e2b71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add columns to the process state for recording how many chunks, raw items
+    and content items (and errors) a run loaded, which are aggregated across
+    the worker processes of parallel raw imports.
+    Existing rows are left NULL
+    """
+    op.add_column("process_state", sa.Column("num_chunks", sa.Integer(), nullable=True))
+    op.add_column(
+        "process_state", sa.Column("num_raw_items", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "process_state", sa.Column("num_content_items", sa.Integer(), nullable=True)
+    )
+    op.add_column("process_state", sa.Column("num_errors", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("process_state", "num_errors")
+    op.drop_column("process_state", "num_content_items")
+    op.drop_column("process_state", "num_raw_items")
+    op.drop_column("process_state", "num_chunks")
@@ -1,7 +1,9 @@
 import datetime
+import hashlib
 
 from typing import Optional
 from sqlalchemy import String
+from sqlalchemy import Index
 from sqlalchemy import UnicodeText
 from sqlalchemy import DateTime
 from sqlalchemy.sql import func
@@ -9,6 +11,7 @@ from sqlalchemy import ForeignKey
 
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
+from sqlalchemy.orm import validates
 
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 
@@ -81,11 +84,22 @@ class ContentItem(ContentStoreObject):
     )
     content_published_url: Mapped[Optional[str]]
     content: Mapped[Optional[str]] = mapped_column(UnicodeText())
+    # md5 of content, updated whenever content is set, so that (textually)
+    # identical items in a cluster can be found with an index lookup
+    content_hash: Mapped[Optional[str]] = mapped_column(String(32))
 
     content_cluster_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("content_cluster.content_cluster_id")
     )
 
+    # support the incremental cluster bookeeping lookups in ContentStore
+    __table_args__ = (
+        Index("ix_content_item_cluster_hash", "content_cluster_id", "content_hash"),
+        Index(
+            "ix_content_item_cluster_created", "content_cluster_id", "raw_created_at"
+        ),
+    )
+
     # probably an  ISO_639 code (we should have a taxonomy for this) and validate against it
     content_language_code: Mapped[Optional[str]] = mapped_column(String(5), index=True)
     content_locale_code: Mapped[Optional[str]] = mapped_column(String(5))
@@ -151,6 +165,24 @@ class ContentItem(ContentStoreObject):
             content_language_code  # TODO: validate to code schema?
         )
 
+    @validates("content")
+    def _validate_content(self, key, content):
+        """
+        Keep the content hash in sync when the content is modified
+        """
+        self.content_hash = self.compute_content_hash(content)
+        return content
+
+    @staticmethod
+    def compute_content_hash(content: str):
+        """
+        Return the hash used for comparing content text (matches postgres md5())
+        or None if there is no content
+        """
+        if content is None:
+            return None
+        return hashlib.md5(content.encode("utf-8")).hexdigest()
+
     @staticmethod
     def schema():
         return ContentItemSchema()
@@ -164,6 +196,8 @@ class ContentItemSchema(SQLAlchemyAutoSchema):
 
         model = ContentItem
         load_instance = True
+        # derived from content, so not part of the serialized item
+        exclude = ("content_hash",)
         # include_fk = True  # this should be the solution, but then gives error about nulls
 
         # this doesn't seem to work
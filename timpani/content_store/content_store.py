@@ -1,8 +1,13 @@
 from typing import List
+import datetime
 from datetime import date
 from sqlalchemy import create_engine
 from sqlalchemy import text
 from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy import insert
+from sqlalchemy import delete
+from sqlalchemy import case
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from sqlalchemy import desc
@@ -81,6 +86,10 @@ class ContentStore(ContentStoreInterface):
     for workflow_cls in WorkflowManager.REGISTRED_WORKFLOWS:
         state_model = workflow_cls.get_state_model()
         known_content_item_states.append(state_model)
+    # lookup by name, for validating transitions without loading state objects
+    known_state_models_by_name = {ContentItemState.__name__: ContentItemState()}
+    for state_model in known_content_item_states:
+        known_state_models_by_name[state_model.state_model_name] = state_model
 
     def init_db_engine(self, connect_string=None, ro_connect_string=None, debug=False):
         """
@@ -181,13 +190,124 @@ class ContentStore(ContentStoreInterface):
             session.expunge(item)
             return item
 
+    def initialize_items(
+        self,
+        items: List[ContentItem],
+        states: List[ContentItemState],
+        force_overwrite=False,
+    ) -> List[ContentItem]:
+        """
+        Batch version of initialize_item() for bulk ingest of a chunk of items.
+        Each item is paired with the state at the same index in states, which
+        is expected to already be in its initial (i.e. ready or failed) state so
+        no further transition is needed after insert.
+
+        Duplicates on (workspace_id, raw_content_id, source_field) are checked
+        with a single query for the whole batch and follow the same rules as
+        initialize_item(): existing records in the FAILED state (or with no state,
+        or force_overwrite) are deleted and replaced, others cause the new item to be
+        skipped. Duplicates within the batch are handled the same way.
+
+        The replaced items are removed with set-wise deletes (see delete_items()),
+        then the states and items are each written in a single multi-row INSERT
+        (the ORM batches the flush), all committed in one transaction.
+        Returns the list of detached items that were inserted.
+        """
+        assert len(items) == len(
+            states
+        ), f"number of items {len(items)} does not match number of states {len(states)}"
+        if len(items) == 0:
+            return []
+
+        def item_key(item):
+            return (item.workspace_id, item.raw_content_id, item.source_field)
+
+        # de-duplicate within the batch, keeping the first unless it would be overwritten
+        pending = {}
+        for item, state in zip(items, states):
+            key = item_key(item)
+            if key in pending:
+                previous_state = pending[key][1]
+                if not (
+                    previous_state.current_state == ContentItemState.STATE_FAILED
+                    or force_overwrite is True
+                ):
+                    logging.warning(
+                        f"Ignoring init of raw_content_id {item.raw_content_id} "
+                        + "because it conflicts with another item in the same batch"
+                    )
+                    continue
+            pending[key] = (item, state)
+
+        with Session(self.engine, expire_on_commit=False) as session:
+            # check for existing items with a single query over the batch
+            # NOTE: source_field may be NULL, so it is matched in python instead of sql
+            workspace_ids = {key[0] for key in pending}
+            raw_content_ids = {key[1] for key in pending}
+            query = (
+                select(
+                    ContentItem,
+                    ContentItemState.current_state,
+                )
+                .outerjoin(
+                    ContentItemState,
+                    ContentItem.content_item_state_id == ContentItemState.state_id,
+                )
+                .where(ContentItem.workspace_id.in_(workspace_ids))
+                .where(ContentItem.raw_content_id.in_(raw_content_ids))
+            )
+            to_delete = []
+            for row in session.execute(query):
+                existing_item = row.ContentItem
+                key = item_key(existing_item)
+                if key not in pending:
+                    continue
+                if (
+                    row.current_state is None
+                    or row.current_state == ContentItemState.STATE_FAILED
+                    or force_overwrite is True
+                ):
+                    # need to delete the previous object, along with states and cluster membership
+                    session.expunge(existing_item)
+                    to_delete.append(existing_item.content_item_id)
+                else:
+                    # skip inserting this record
+                    logging.warning(
+                        f"Ignoring init of raw_content_id {existing_item.raw_content_id} "
+                        + f"because it conflicts with existing item {existing_item.content_item_id}"
+                    )
+                    del pending[key]
+
+            if len(pending) == 0:
+                return []
+
+            # replaced items are deleted in the same transaction as the insert
+            self._delete_items_in_session(session, to_delete)
+
+            new_items = [pair[0] for pair in pending.values()]
+            new_states = [pair[1] for pair in pending.values()]
+            # flushing all of the states together lets the ORM batch them into
+            # one multi-row INSERT .. RETURNING so we get the ids back
+            session.add_all(new_states)
+            session.flush()
+            for item, state in zip(new_items, new_states):
+                assert state.state_id is not None
+                item.content_item_state_id = state.state_id
+            session.add_all(new_items)
+            session.commit()
+            for item in new_items:
+                session.expunge(item)
+            for state in new_states:
+                session.expunge(state)
+            return new_items
+
     def transition_item_state(self, item: ContentItem, state: str) -> ContentItemState:
         """
         Check that this is validate state, etc, and make the update
         to the new state, returning the updated state object.
         NOTE: should be called when state has been achieved
+        NOTE: transition_items_state() does the same for a list of items
         """
-        # TODO: this needs to support batch
         with Session(self.engine, expire_on_commit=False) as session:
             # get the state corresponding to the item
             # this is a polymorphic class
@@ -207,8 +327,8 @@ class ContentStore(ContentStoreInterface):
         Also increments the transition_num counter, even if transition fails
         so that the item will go into failed state after too many attempts
         NOTE: should be called before state transition is attempted to record timing
+        NOTE: start_transitions() does the same for a list of items
         """
-        # TODO: this needs to support batch
         with Session(self.engine, expire_on_commit=False) as session:
             # get the state corresponding to the item
             item_state = session.get(ContentItemState, item.content_item_state_id)
@@ -222,6 +342,151 @@ class ContentStore(ContentStoreInterface):
             session.expunge(item_state)
             return item_state
 
+    def _get_transition_sources(self, session: Session, items: List[ContentItem]):
+        """
+        Internal function to query the current state and state model
+        for each of the items' states in a single query.
+        Returns a dict mapping state_id to (state_model_name, current_state)
+        """
+        state_ids = [item.content_item_state_id for item in items]
+        query = select(
+            ContentItemState.state_id,
+            ContentItemState.state_model_name,
+            ContentItemState.current_state,
+        ).where(ContentItemState.state_id.in_(state_ids))
+        sources = {}
+        for row in session.execute(query):
+            sources[row.state_id] = (row.state_model_name, row.current_state)
+        return sources
+
+    def _is_known_transition_allowed(
+        self, state_model_name: str, current_state: str, state: str
+    ):
+        """
+        Check if the transition is allowed using the cached instance of the
+        state model, instead of loading a state object from the database
+        """
+        state_model = self.known_state_models_by_name.get(state_model_name)
+        if state_model is None:
+            logging.warning(f"Unknown state model {state_model_name}")
+            return False
+        if state not in state_model.valid_states:
+            return False
+        return state_model.isTransitionAllowed(current_state, state)
+
+    def transition_items_state(self, items: List[ContentItem], state: str):
+        """
+        Batch version of transition_item_state(). Transitions are validated
+        against the state models, and all of the allowed transitions are
+        written with a single update.
+        Returns a list of booleans indicating, for each item (in order),
+        if it was transitioned. Items that are not permitted to transition
+        are logged and left in their current state.
+        NOTE: should be called when state has been achieved
+        """
+        if len(items) == 0:
+            return []
+        with Session(self.engine) as session:
+            transitioned = self._transition_items_state(session, items, state)
+            session.commit()
+        return [item.content_item_state_id in transitioned for item in items]
+
+    def _transition_items_state(
+        self, session: Session, items: List[ContentItem], state: str
+    ):
+        """
+        Internal function that does the work of transition_items_state(),
+        but does not commit so it can be part of a larger transaction.
+        Returns the set of state ids that were transitioned
+        """
+        now = datetime.datetime.utcnow()
+        sources = self._get_transition_sources(session, items)
+        # group the allowed transitions by current state, so the update
+        # can confirm the state has not been changed by someone else
+        allowed_by_source = {}
+        for item in items:
+            source = sources.get(item.content_item_state_id)
+            if source is None:
+                logging.warning(
+                    f"No state found for content item {item.content_item_id}"
+                )
+            elif self._is_known_transition_allowed(source[0], source[1], state):
+                allowed_by_source.setdefault(source[1], []).append(
+                    item.content_item_state_id
+                )
+            else:
+                logging.warning(
+                    f"requested transition for content item {item.content_item_id} from state "
+                    + f"{source[1]} to state {state} is not allowed by state model {source[0]}"
+                )
+
+        values = {"current_state": state, "transition_end": now}
+        if state in [ContentItemState.STATE_FAILED, ContentItemState.STATE_COMPLETED]:
+            values["completed_timestamp"] = now
+        transitioned = set()
+        # normally all of the items will be coming from the same state
+        for source_state, state_ids in allowed_by_source.items():
+            updated = session.execute(
+                update(ContentItemState)
+                .where(ContentItemState.state_id.in_(state_ids))
+                .where(ContentItemState.current_state == source_state)
+                .values(**values)
+                .returning(ContentItemState.state_id),
+                execution_options={"synchronize_session": False},
+            )
+            transitioned.update(updated.scalars().all())
+        logging.debug(
+            f"Transitioned {len(transitioned)} of {len(items)} content item states to {state}"
+        )
+        return transitioned
+
+    def start_transitions(self, items: List[ContentItem], state: str):
+        """
+        Batch version of start_transition_to_state(). Increments the
+        transition_num counter for all of the items (even if the transition is
+        not permitted) and updates the transition start time for items that
+        are permitted to transition to state, in a single update.
+        Returns a list of booleans indicating, for each item (in order),
+        if the transition was permitted and started
+        NOTE: should be called before state transition is attempted to record timing
+        """
+        if len(items) == 0:
+            return []
+        now = datetime.datetime.utcnow()
+        with Session(self.engine) as session:
+            sources = self._get_transition_sources(session, items)
+            allowed_ids = []
+            for item in items:
+                source = sources.get(item.content_item_state_id)
+                if source is None:
+                    logging.warning(
+                        f"No state found for content item {item.content_item_id}"
+                    )
+                elif self._is_known_transition_allowed(source[0], source[1], state):
+                    allowed_ids.append(item.content_item_state_id)
+                else:
+                    logging.warning(
+                        f"requested transition for content item {item.content_item_id} from state "
+                        + f"{source[1]} to state {state} is not allowed by state model {source[0]}"
+                    )
+            # increment the transition num to track the attempt (even if it fails)
+            # and mark that a transition is in progress
+            values = {"transition_num": ContentItemState.transition_num + 1}
+            if len(allowed_ids) > 0:
+                values["transition_start"] = case(
+                    (ContentItemState.state_id.in_(allowed_ids), now),
+                    else_=ContentItemState.transition_start,
+                )
+            session.execute(
+                update(ContentItemState)
+                .where(ContentItemState.state_id.in_(list(sources.keys())))
+                .values(**values),
+                execution_options={"synchronize_session": False},
+            )
+            session.commit()
+        allowed_ids = set(allowed_ids)
+        return [item.content_item_state_id in allowed_ids for item in items]
+
     def validate_transition(self, item: ContentItem, state: str):
         """
         Check if transition to state would be allowable given
@@ -288,22 +553,66 @@ class ContentStore(ContentStoreInterface):
         cluster: ContentCluster,
     ):
         """
-        Update the unique item count with number of non (textutally) identical items
+        Recompute the unique item count with number of non (textutally) identical items
+        by scanning all of the items in the cluster. Normally the count is maintained
+        incrementally by _cluster_has_content_hash() checks as items are added and removed
         NOTE: this uses a session because it is only called internally
         TODO: should this happen on the content or raw_content?
         """
         session.flush()
-        result = (
-            session.query(ContentItem)
+        result = session.scalar(
+            select(func.count(func.distinct(ContentItem.content_hash)))
             .where(ContentItem.content_cluster_id == cluster.content_cluster_id)
             .where(ContentItem.workspace_id == cluster.workspace_id)
-            .distinct(ContentItem.content)
-            .count()
         )
         cluster.num_items_unique = result
         session.flush()
         return cluster
 
+    def _cluster_has_content_hash(
+        self,
+        session: Session,
+        cluster: ContentCluster,
+        item: ContentItem,
+    ):
+        """
+        Return True if some item in the cluster (other than item) has the same
+        content hash as item, used for the incremental unique item counts.
+        Items with no content are never counted as unique, so also return True
+        NOTE: this uses a session because it is only called internally
+        """
+        if item.content_hash is None:
+            return True
+        session.flush()
+        query = (
+            select(ContentItem.content_item_id)
+            .where(ContentItem.content_cluster_id == cluster.content_cluster_id)
+            .where(ContentItem.content_hash == item.content_hash)
+            .where(ContentItem.content_item_id != item.content_item_id)
+            .limit(1)
+        )
+        return session.scalar(query) is not None
+
+    def _update_exemplar_candidate(
+        self,
+        session: Session,
+        cluster: ContentCluster,
+        item: ContentItem,
+    ):
+        """
+        Make item the exemplar of the cluster it has been added to if it is older than
+        the current exemplar, so that the exemplar can be maintained without re-querying
+        all of the items in the cluster (see _select_exemplar_item())
+        NOTE: this uses a session because it is only called internally
+        """
+        if cluster.exemplar_item_id is None:
+            self._select_exemplar_item(session, cluster)
+            return
+        exemplar = session.get(ContentItem, cluster.exemplar_item_id)
+        if exemplar is None or item.raw_created_at < exemplar.raw_created_at:
+            cluster.exemplar_item_id = item.content_item_id
+            session.flush()
+
     def _select_exemplar_item(
         self,
         session: Session,
@@ -398,8 +707,9 @@ class ContentStore(ContentStoreInterface):
                     # if it is the exemplar, remove it and pick a new one
                     if cluster1.exemplar_item_id == item1.content_item_id:
                         self._select_exemplar_item(session, cluster1)
-                    # recompute the number of unique items for cluster1
-                    self._update_unique_item_count(session, cluster1)
+                    # if no other item had the same text, one less unique item in cluster1
+                    if not self._cluster_has_content_hash(session, cluster1, item1):
+                        cluster1.num_items_unique -= 1
 
             if second_item is not None:
                 # check items are compatible for clustering
@@ -420,9 +730,13 @@ class ContentStore(ContentStoreInterface):
                     # do bookeeping for adding item2 to cluster2
                     cluster2.num_items += 1
                     cluster2.num_items_added += 1
-                    cluster2.num_items_unique += 1  # because only one
+                    # items with no content are never counted as unique
+                    if item2.content_hash is not None:
+                        cluster2.num_items_unique += 1  # because only one
                     # print(f"A num items incremted item2 is {item2.content_item_id}")
                     item2.content_cluster_id = cluster2.content_cluster_id
+                    cluster2.workspace_id = item2.workspace_id
+                    cluster2.exemplar_item_id = item2.content_item_id
                     # TODO: we should be able to compute stress since we already know similarity for the pair?
                     cluster2.stress_score = 0.0
                     cluster2.priority_score = 0.1
@@ -445,6 +759,10 @@ class ContentStore(ContentStoreInterface):
 
             # print(f"B num items incremted")
             cluster2.workspace_id = item1.workspace_id
+            # check for identical text before item1 is in the cluster
+            is_duplicate = cluster2.num_items > 1 and self._cluster_has_content_hash(
+                session, cluster2, item1
+            )
             item1.content_cluster_id = cluster2.content_cluster_id
 
             if cluster2.num_items == 1:
@@ -454,12 +772,15 @@ class ContentStore(ContentStoreInterface):
                 cluster2.stress_score = 0.0
                 # low priority for re evalutation
                 cluster2.priority_score = 0.0
-                cluster2.num_items_unique = 1
+                # items with no content are never counted as unique
+                cluster2.num_items_unique = 1 if item1.content_hash is not None else 0
             else:
-                self._select_exemplar_item(session, cluster2)
+                # only need to check if the new item is a better exemplar
+                self._update_exemplar_candidate(session, cluster2, item1)
                 # we don't know what the stress is, so mark that it should be calculated by bumping up priority score
                 cluster2.priority_score += 0.1
-                self._update_unique_item_count(session, cluster2)
+                if not is_duplicate:
+                    cluster2.num_items_unique += 1
 
             session.commit()
             session.refresh(cluster2)
@@ -520,6 +841,22 @@ class ContentStore(ContentStoreInterface):
                     session.expunge(found_item)
             return found_item
 
+    def get_items(self, content_item_ids: List[int]) -> List[ContentItem]:
+        """
+        Return the ContentItems matching the list of ids in a single query.
+        Ids that don't match an item are omitted, order is not preserved
+        """
+        if len(content_item_ids) == 0:
+            return []
+        with Session(self.engine, expire_on_commit=False) as session:
+            query = select(ContentItem).where(
+                ContentItem.content_item_id.in_(content_item_ids)
+            )
+            items = list(session.scalars(query))
+            for item in items:
+                session.expunge(item)
+            return items
+
     def get_item_state(self, content_item_state_id: int) -> ContentItemState:
         """
         Return a ContentItemState with the appropriate id (if any)
@@ -589,20 +926,19 @@ class ContentStore(ContentStoreInterface):
             summary = [tuple(row) for row in results]
             return summary
 
-    def get_cluster_items(self, cluster: ContentCluster) -> List[ContentItem]:
+    def get_cluster_items(
+        self, cluster: ContentCluster, page_size=1000
+    ) -> List[ContentItem]:
         """
         Query database to return all of the items that name
         the cluster as their own. This returns a generator
         that yields ContentItems because it could be big
-        TODO: batch size
         """
-        with Session(self.engine, expire_on_commit=False) as session:
-            query = select(ContentItem).where(
-                ContentItem.content_cluster_id == cluster.content_cluster_id
-            )
-
-            for row in session.execute(query):
-                yield row.ContentItem
+        return self.scan_items(
+            filters=[ContentItem.content_cluster_id == cluster.content_cluster_id],
+            page_size=page_size,
+            use_ro_engine=False,
+        )
 
     def merge_clusters(
         self,
@@ -611,30 +947,177 @@ class ContentStore(ContentStoreInterface):
     ):
         """
         Merge together two clusters that have be determined to be overlapping
-        by inserting items from source cluster into target cluster. Source cluster
-        is expected to be deleted as a side effect, target clustered will be returned
+        by moving all of the items from source cluster into target cluster with a single
+        update. The target cluster's counts and exemplar are recomputed once, and the
+        source cluster is deleted in the same transaction. The updated target cluster will be returned
         """
+        assert (
+            source_cluster_id != target_cluster_id
+        ), f"cluster {source_cluster_id} cannot be merged with itself"
         with Session(self.engine, expire_on_commit=False) as session:
+            # lock both clusters so they are not modified by another process during the merge
+            source = session.get(
+                ContentCluster, source_cluster_id, with_for_update=True
+            )
+            target = session.get(
+                ContentCluster, target_cluster_id, with_for_update=True
+            )
             # check that they match the given workspace id
-            source = session.get(ContentCluster, source_cluster_id)
-            target = session.get(ContentCluster, target_cluster_id)
             assert (
                 source.workspace_id == target.workspace_id
             ), f"source workspace_id {source.workspace_id} does not match target workspace_id {target.workspace_id}"
 
-            # get the targer exemplar
-            target_exemplar = session.get(ContentItem, target.exemplar_item_id)
-            # iterate through all the items in source and move them to target
-            # one at a time is probably slow because many internal updates
-            query = select(ContentItem).where(
-                ContentItem.content_cluster_id == source.content_cluster_id
+            # move all the items in source to target
+            moved = session.execute(
+                update(ContentItem)
+                .where(ContentItem.content_cluster_id == source.content_cluster_id)
+                .values(content_cluster_id=target.content_cluster_id),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+
+            # do the bookeeping for the target cluster
+            target.num_items = session.scalar(
+                select(func.count(ContentItem.content_item_id)).where(
+                    ContentItem.content_cluster_id == target.content_cluster_id
+                )
+            )
+            target.num_items_added += moved
+            self._update_unique_item_count(session, target)
+            self._select_exemplar_item(session, target)
+            # we don't know what the stress is, so mark that it should be calculated by bumping up priority score
+            target.priority_score += 0.1
+
+            # source cluster is now empty
+            source.exemplar_item_id = None
+            session.flush()
+            session.delete(source)
+            session.commit()
+            logging.debug(
+                f"Merged {moved} items from cluster {source_cluster_id} into cluster {target_cluster_id}"
             )
-            for row in session.execute(query):
-                self.cluster_items(row.ContentItem, target_exemplar)
 
             # return the updated target cluster
             session.refresh(target)
-            return session.expunge(target)
+            session.expunge(target)
+            return target
+
+    def _recount_clusters(
+        self,
+        session: Session,
+        clusters: List[ContentCluster],
+        expect_changes=False,
+    ):
+        """
+        Recompute the aggregates (num_items, num_items_unique and exemplar) of the clusters
+        from the items actually in each cluster with a single grouped query, deleting any
+        clusters that no longer have items. Returns the number of clusters changed.
+        Changes are logged as warnings unless `expect_changes` (i.e. items were just removed)
+        NOTE: this uses a session because it is only called internally
+        """
+        log_change = logging.debug if expect_changes else logging.warning
+        session.flush()
+        cluster_ids = [cluster.content_cluster_id for cluster in clusters]
+        # compute the actual aggregates for all the clusters in one query
+        actual = {}
+        query = (
+            select(
+                ContentItem.content_cluster_id,
+                func.count(ContentItem.content_item_id).label("num_items"),
+                func.count(func.distinct(ContentItem.content_hash)).label(
+                    "num_items_unique"
+                ),
+            )
+            .where(ContentItem.content_cluster_id.in_(cluster_ids))
+            .group_by(ContentItem.content_cluster_id)
+        )
+        for row in session.execute(query):
+            actual[row.content_cluster_id] = (row.num_items, row.num_items_unique)
+        # and which cluster each exemplar actually belongs to
+        exemplar_ids = [
+            cluster.exemplar_item_id
+            for cluster in clusters
+            if cluster.exemplar_item_id is not None
+        ]
+        exemplar_clusters = {}
+        if len(exemplar_ids) > 0:
+            query = select(
+                ContentItem.content_item_id, ContentItem.content_cluster_id
+            ).where(ContentItem.content_item_id.in_(exemplar_ids))
+            for row in session.execute(query):
+                exemplar_clusters[row.content_item_id] = row.content_cluster_id
+
+        num_changed = 0
+        for cluster in clusters:
+            num_items, num_items_unique = actual.get(cluster.content_cluster_id, (0, 0))
+            if num_items == 0:
+                log_change(
+                    f"Deleting cluster {cluster.content_cluster_id} because it has no items"
+                )
+                cluster.exemplar_item_id = None
+                session.flush()
+                session.delete(cluster)
+                num_changed += 1
+                continue
+            changed = False
+            if (
+                cluster.num_items != num_items
+                or cluster.num_items_unique != num_items_unique
+            ):
+                log_change(
+                    f"Updating cluster {cluster.content_cluster_id} counts (num_items, num_items_unique)"
+                    + f" from {(cluster.num_items, cluster.num_items_unique)} to {(num_items, num_items_unique)}"
+                )
+                cluster.num_items = num_items
+                cluster.num_items_unique = num_items_unique
+                changed = True
+            if (
+                exemplar_clusters.get(cluster.exemplar_item_id)
+                != cluster.content_cluster_id
+            ):
+                log_change(
+                    f"Updating cluster {cluster.content_cluster_id} exemplar"
+                    + f" {cluster.exemplar_item_id} which is not in the cluster"
+                )
+                self._select_exemplar_item(session, cluster)
+                changed = True
+            if changed:
+                num_changed += 1
+        session.flush()
+        return num_changed
+
+    def reconcile_cluster_aggregates(self, workspace_id, chunk_size=1000):
+        """
+        Verify the incrementally maintained cluster aggregates (num_items, num_items_unique
+        and exemplar) for all of the clusters in the workspace against the items actually
+        in each cluster, and repair any drift. Empty clusters are deleted.
+        Processes clusters in chunks ordered by id, committing after each chunk.
+        Intended to be run periodically, returns the number of clusters repaired
+        """
+        num_checked = 0
+        num_repaired = 0
+        last_cluster_id = 0
+        while True:
+            with Session(self.engine, expire_on_commit=False) as session:
+                clusters = list(
+                    session.scalars(
+                        select(ContentCluster)
+                        .where(ContentCluster.workspace_id == workspace_id)
+                        .where(ContentCluster.content_cluster_id > last_cluster_id)
+                        .order_by(ContentCluster.content_cluster_id)
+                        .limit(chunk_size)
+                    )
+                )
+                if len(clusters) == 0:
+                    break
+                last_cluster_id = clusters[-1].content_cluster_id
+                num_checked += len(clusters)
+                num_repaired += self._recount_clusters(session, clusters)
+                session.commit()
+        logging.info(
+            f"Reconciled cluster aggregates for workspace {workspace_id},"
+            + f" repaired {num_repaired} of {num_checked} clusters"
+        )
+        return num_repaired
 
     def delete_item(self, item: ContentItem):
         """
@@ -662,7 +1145,9 @@ class ContentStore(ContentStoreInterface):
                     # TODO: may not be thread safe if something else updating cluster?
                     session.delete(cluster)
                 else:
-                    self._update_unique_item_count(session, cluster)
+                    # if no other item had the same text, one less unique item
+                    if not self._cluster_has_content_hash(session, cluster, item):
+                        cluster.num_items_unique -= 1
                     if cluster.exemplar_item_id == item.content_item_id:
                         cluster.exemplar_item_id = None
                         item.content_cluster_id = None
@@ -690,38 +1175,160 @@ class ContentStore(ContentStoreInterface):
 
             session.commit()
 
+    def delete_items(self, items: List[ContentItem]):
+        """
+        Remove a batch of items with their states and keywords from the database
+        using set-wise deletes, and update the clusters they belonged to once
+        for the whole batch (instead of per item as in delete_item()).
+        Returns the number of items deleted
+        """
+        item_ids = [item.content_item_id for item in items]
+        if len(item_ids) == 0:
+            return 0
+        with Session(self.engine, expire_on_commit=False) as session:
+            num_deleted = self._delete_items_in_session(session, item_ids)
+            session.commit()
+        return num_deleted
+
+    def _delete_items_in_session(self, session, item_ids: List[int]):
+        """
+        Internal function for delete_items() that deletes the items with the
+        given ids as part of the caller's session, without committing.
+        Returns the number of items deleted
+        """
+        if len(item_ids) == 0:
+            return 0
+        # lock the affected clusters so concurrent clustering waits for the recount
+        cluster_ids = select(ContentItem.content_cluster_id).where(
+            ContentItem.content_item_id.in_(item_ids)
+        )
+        clusters = list(
+            session.scalars(
+                select(ContentCluster)
+                .where(ContentCluster.content_cluster_id.in_(cluster_ids))
+                .order_by(ContentCluster.content_cluster_id)
+                .with_for_update()
+            )
+        )
+        state_ids = list(
+            session.scalars(
+                select(ContentItem.content_item_state_id)
+                .where(ContentItem.content_item_id.in_(item_ids))
+                .where(ContentItem.content_item_state_id.is_not(None))
+            )
+        )
+        # remove references to the items before deleting them
+        session.execute(
+            delete(ContentKeyword).where(ContentKeyword.content_item_id.in_(item_ids)),
+            execution_options={"synchronize_session": False},
+        )
+        session.execute(
+            update(ContentCluster)
+            .where(ContentCluster.exemplar_item_id.in_(item_ids))
+            .values(exemplar_item_id=None),
+            execution_options={"synchronize_session": False},
+        )
+        result = session.execute(
+            delete(ContentItem).where(ContentItem.content_item_id.in_(item_ids)),
+            execution_options={"synchronize_session": False},
+        )
+        num_deleted = result.rowcount
+        if len(state_ids) > 0:
+            session.execute(
+                delete(ContentItemState).where(
+                    ContentItemState.state_id.in_(state_ids)
+                ),
+                execution_options={"synchronize_session": False},
+            )
+        if len(clusters) > 0:
+            # the exemplar may have been cleared by the update above
+            for cluster in clusters:
+                session.refresh(cluster)
+            self._recount_clusters(session, clusters, expect_changes=True)
+        return num_deleted
+
     # TODO: check for items with too many or too old transitions and put them in failed state
 
-    def get_items_before(self, workspace_id, earliest: date, chunk_size=10000):
+    def get_items_before(
+        self, workspace_id, earliest: date, chunk_size=10000, start_after_id=0
+    ):
         """
         Yield a sequence of content items that have a creation date before `earliest`,
         usually to determine which content should be deleted.
-        Filteres on content published date (not ingest date) and workspace id
+        Filteres on content published date (not ingest date) and workspace id.
+        Pages through all matching items in id order, `chunk_size` at a time,
+        starting after the item id `start_after_id`.
         NOTE: assumes we don't need second sync accuracy, so uses RO cluster
         """
         # NOTE: we don't delete in this operation because we may also need
-        # to delete from other data stores
-        # check for items earlier than earliest
-        with Session(self.ro_engine, expire_on_commit=False) as session:
-            # get all of the items that are not in the inactive states
-            query = (
-                select(ContentItem)
-                .where(ContentItem.workspace_id == workspace_id)
-                .where(ContentItem.content_published_date < earliest)
-                .limit(chunk_size)
-                .order_by(func.random())
-            )
+        # to delete from other data stores. Keyset paging means deleting the
+        # already yielded items doesn't shift the pages
+        return self.scan_items(
+            workspace_id=workspace_id,
+            filters=[ContentItem.content_published_date < earliest],
+            page_size=chunk_size,
+            start_after_id=start_after_id,
+        )
+
+    def scan_items(
+        self,
+        workspace_id=None,
+        filters=None,
+        columns=None,
+        page_size=1000,
+        start_after_id=0,
+        use_ro_engine=True,
+    ):
+        """
+        Generator that streams all of the content items matching the (optional)
+        workspace_id and list of `filters` (SQLAlchemy where clauses on ContentItem).
+        Items are paged in content_item_id order using keyset pagination (id > last id
+        seen) rather than OFFSET, so each page is an index range scan. Each page
+        is read in its own short session with a server-side cursor (yield_per),
+        so memory use is bounded by `page_size` no matter how many items match.
+        - If `columns` is None, yields detached ContentItems
+        - Otherwise yields lightweight row tuples of (content_item_id, *columns)
+        Paging can be resumed with `start_after_id`.
+        NOTE: items modified or deleted by the caller while iterating do not
+        affect the paging, but items added with lower ids will not be seen
+        """
+        assert page_size > 0, f"page_size must be positive, not {page_size}"
+        engine = self.ro_engine if use_ro_engine else self.engine
+        last_id = start_after_id
+        while True:
+            if columns is None:
+                query = select(ContentItem)
+            else:
+                query = select(ContentItem.content_item_id, *columns)
+            query = query.where(ContentItem.content_item_id > last_id)
             if workspace_id is not None:
                 query = query.where(ContentItem.workspace_id == workspace_id)
-
-            for row in session.execute(query):
-                item = row.ContentItem
-                # detach from database before returning
-                session.expunge(item)
-                yield item
+            if filters is not None:
+                query = query.where(*filters)
+            query = (
+                query.order_by(ContentItem.content_item_id)
+                .limit(page_size)
+                .execution_options(yield_per=page_size)
+            )
+            num_rows = 0
+            with Session(engine, expire_on_commit=False) as session:
+                for row in session.execute(query):
+                    num_rows += 1
+                    if columns is None:
+                        item = row.ContentItem
+                        last_id = item.content_item_id
+                        # detach from database before returning
+                        session.expunge(item)
+                        yield item
+                    else:
+                        last_id = row.content_item_id
+                        yield tuple(row)
+            if num_rows < page_size:
+                # this was the last page
+                break
 
     def get_items_in_progress(
-        self, workspace_id=None, batch_state=None, chunk_size=10000
+        self, workspace_id=None, batch_state=None, chunk_size=10000, include_state=False
     ):
         """
         Yield a sequence of content items that have a state that is not
@@ -729,8 +1336,11 @@ class ContentStore(ContentStoreInterface):
         (undefined, completed, failed)
         optionally filters based on workspace id.
         By default, only fetches first 10k records to avoid OOM.
-        Ordering is randomized so we don't get stuck on failing state and
-        in theory multiple instances of the process could run at the same time and rarely collide
+        If include_state is True, yields (item, state) tuples with the
+        state loaded in the same query so callers don't need to look it up.
+        Ordering is not defined (randomizing required sorting the entire active set).
+        Processes dispatching state transitions should use claim_items_in_progress()
+        instead so that multiple processes don't collide
         TODO: optionaly order by content item publish date (needs index) to prioritize old content
         NOTE: workflows can add arbitrary additional states, this is just conerned
         with starting and ending states
@@ -739,7 +1349,7 @@ class ContentStore(ContentStoreInterface):
         with Session(self.engine, expire_on_commit=False) as session:
             # get all of the items that are not in the inactive states
 
-            query = select(ContentItem).join(
+            query = select(ContentItem, ContentItemState).join(
                 ContentItemState,
                 ContentItem.content_item_state_id == ContentItemState.state_id,
             )
@@ -756,8 +1366,8 @@ class ContentStore(ContentStoreInterface):
             else:
                 query = query.where(ContentItemState.current_state == batch_state)
 
-            # add the limiting and randomization
-            query = query.limit(chunk_size).order_by(func.random())
+            # add the limiting
+            query = query.limit(chunk_size)
 
             if workspace_id is not None:
                 query = query.where(ContentItem.workspace_id == workspace_id)
@@ -766,7 +1376,106 @@ class ContentStore(ContentStoreInterface):
                 item = row.ContentItem
                 # detach from database before returning
                 session.expunge(item)
-                yield item
+                if include_state is True:
+                    state = row.ContentItemState
+                    session.expunge(state)
+                    yield item, state
+                else:
+                    yield item
+
+    def claim_items_in_progress(
+        self,
+        workspace_id,
+        batch_state,
+        chunk_size=25,
+        lease_duration=60,
+        include_state=False,
+    ) -> List[ContentItem]:
+        """
+        Claim up to chunk_size content items in the workspace that are in batch_state
+        by setting a lease expiration on their states, and return the claimed items.
+        The selection and the lease update happen in a single statement. Items with a
+        lease that has not yet expired are not elligible, so multiple processes can
+        work through the same states without dispatching the same items.
+        On Postgres candidate rows are locked with FOR UPDATE SKIP LOCKED, so
+        concurrent claims neither block on nor return each other's rows.
+        Items are claimed oldest transition first, so the backlog drains in order.
+        Leases should be released with release_items() once items are dispatched,
+        otherwise they will be skipped until lease_duration seconds have passed.
+        If include_state is True, returns (item, state) tuples with the state
+        loaded in the same query
+        NOTE: does not use RO cluster because it writes
+        """
+        now = datetime.datetime.utcnow()
+        lease_expiration = now + datetime.timedelta(seconds=lease_duration)
+        with Session(self.engine, expire_on_commit=False) as session:
+            candidates = (
+                select(ContentItemState.state_id)
+                .join(
+                    ContentItem,
+                    ContentItem.content_item_state_id == ContentItemState.state_id,
+                )
+                .where(ContentItemState.current_state == batch_state)
+                .where(ContentItem.workspace_id == workspace_id)
+                .where(
+                    (ContentItemState.lease_expiration.is_(None))
+                    | (ContentItemState.lease_expiration < now)
+                )
+                # drain the items that have been waiting longest first
+                .order_by(ContentItemState.transition_end, ContentItemState.state_id)
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True, of=ContentItemState)
+            )
+            claimed_state_ids = (
+                session.execute(
+                    update(ContentItemState)
+                    .where(ContentItemState.state_id.in_(candidates))
+                    .values(lease_expiration=lease_expiration)
+                    .returning(ContentItemState.state_id),
+                    execution_options={"synchronize_session": False},
+                )
+                .scalars()
+                .all()
+            )
+            rows = []
+            if len(claimed_state_ids) > 0:
+                query = (
+                    select(ContentItem, ContentItemState)
+                    .join(
+                        ContentItemState,
+                        ContentItem.content_item_state_id == ContentItemState.state_id,
+                    )
+                    .where(ContentItemState.state_id.in_(claimed_state_ids))
+                )
+                rows = session.execute(query).all()
+            session.commit()
+            items = []
+            for row in rows:
+                # detach from database before returning
+                session.expunge(row.ContentItem)
+                session.expunge(row.ContentItemState)
+                if include_state is True:
+                    items.append((row.ContentItem, row.ContentItemState))
+                else:
+                    items.append(row.ContentItem)
+        return items
+
+    def release_items(self, items: List[ContentItem]):
+        """
+        Clear the lease on items claimed by claim_items_in_progress()
+        so that they can be picked up by the next claim
+        """
+        state_ids = [item.content_item_state_id for item in items]
+        if len(state_ids) == 0:
+            return
+        with Session(self.engine) as session:
+            session.execute(
+                update(ContentItemState)
+                .where(ContentItemState.state_id.in_(state_ids))
+                .values(lease_expiration=None),
+                execution_options={"synchronize_session": False},
+            )
+            session.commit()
 
     def attach_keyword(
         self, item: ContentItem, keyword_model_name: str, keyword_text: str, score=1.0
@@ -789,6 +1498,59 @@ class ContentStore(ContentStoreInterface):
             session.expunge(keyword)
             return keyword
 
+    def attach_keywords(
+        self, item_or_items, keyword_model_name: str, keywords, state: str = None
+    ):
+        """
+        Create keyword objects for one or many content items with a single insert.
+        If item_or_items is a single ContentItem, keywords is a list of
+        (text, score) tuples. If it is a list of items, keywords must be a list
+        (in the same order) of lists of (text, score) tuples.
+        The published date of each item is copied to its keywords.
+        If state is not None, the items are transitioned to state in the same
+        transaction, and keywords are only added to items that were
+        permitted to transition.
+        Returns a list of booleans indicating, for each item, if its keywords were added
+        """
+        if isinstance(item_or_items, ContentItem):
+            items = [item_or_items]
+            keywords_per_item = [keywords]
+        else:
+            items = item_or_items
+            keywords_per_item = keywords
+        assert len(items) == len(
+            keywords_per_item
+        ), f"Number of items {len(items)} must match number of keyword lists {len(keywords_per_item)}"
+        if len(items) == 0:
+            return []
+        with Session(self.engine) as session:
+            if state is not None:
+                transitioned = self._transition_items_state(session, items, state)
+                attached = [
+                    item.content_item_state_id in transitioned for item in items
+                ]
+            else:
+                attached = [True] * len(items)
+            rows = []
+            for item, item_keywords, ok in zip(items, keywords_per_item, attached):
+                if not ok:
+                    continue
+                for keyword in item_keywords:
+                    rows.append(
+                        {
+                            "workspace_id": item.workspace_id,
+                            "keyword_model_name": keyword_model_name,
+                            "content_item_id": item.content_item_id,
+                            "keyword_text": keyword[0],
+                            "keyword_score": keyword[1],
+                            "content_published_date": item.content_published_date,
+                        }
+                    )
+            if len(rows) > 0:
+                session.execute(insert(ContentKeyword), rows)
+            session.commit()
+        return attached
+
     def get_keywords_for_item(self, item: ContentItem, keyword_model_name: str = None):
         """
         Return a list of keyword items associated with the content item, optionally filtering
@@ -847,40 +1609,28 @@ class ContentStore(ContentStoreInterface):
         """
         Yields data describing the content items (including some joind data)
         as a dict to be converted into a row in table or data frame
-        TODO: need chunk size so we don't run out of memory
         """
         # TODO: validate workspace_id access here?
         # TODO: there are probably much more efficient ways to return data
-        # TODO: how do we manage max limit if needing more records?
-        with Session(self.ro_engine, expire_on_commit=False) as session:
-            # get all of the items that are not in the inactive states
-            # TODO: state restrictions
-            offset = 0
-            while offset < max_limit:
-                query = (
-                    select(ContentItem)
-                    .where(ContentItem.workspace_id == workspace_id)
-                    .order_by(ContentItem.content_item_id)  # primary key
-                    .offset(offset)
-                    .limit(min(chunk_size, max_limit))
-                )
-                # filter for date range if included
-                if published_range_start is not None or published_range_end is not None:
-                    query = query.where(
-                        ContentItem.content_published_date > published_range_start
-                    ).where(ContentItem.content_published_date <= published_range_end)
-                num_records = 0
-                for row in session.execute(query):
-                    # detach from database before
-                    # and serilize into dict before returning
-                    row_dict = self.serialize_object(row.ContentItem)
-                    num_records += 1
-                    yield row_dict
-                if num_records == 0:
-                    # query return no more values
-                    break
-                # increment for next chunk
-                offset += chunk_size
+        # TODO: state restrictions
+        filters = []
+        # filter for date range if included
+        if published_range_start is not None or published_range_end is not None:
+            filters = [
+                ContentItem.content_published_date > published_range_start,
+                ContentItem.content_published_date <= published_range_end,
+            ]
+        num_records = 0
+        for item in self.scan_items(
+            workspace_id=workspace_id,
+            filters=filters,
+            page_size=min(chunk_size, max_limit),
+        ):
+            # serilize into dict before returning
+            yield self.serialize_object(item)
+            num_records += 1
+            if num_records >= max_limit:
+                break
 
     def record_process_state(self, state: ProcessState):
         with Session(self.engine, expire_on_commit=False) as session:
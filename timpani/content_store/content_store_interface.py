@@ -19,12 +19,26 @@ class ContentStoreInterface(object):
     def initialize_item(self, item: ContentItem, state=None, force_overwrite=False):
         raise NotImplementedError
 
+    def initialize_items(
+        self,
+        items: List[ContentItem],
+        states: List[ContentItemState],
+        force_overwrite=False,
+    ) -> List[ContentItem]:
+        raise NotImplementedError
+
     def transition_item_state(self, item: ContentItem, state: str) -> ContentItemState:
         raise NotImplementedError
 
     def start_transition_to_state(self, item: ContentItem, state: str):
         raise NotImplementedError
 
+    def transition_items_state(self, items: List[ContentItem], state: str):
+        raise NotImplementedError
+
+    def start_transitions(self, items: List[ContentItem], state: str):
+        raise NotImplementedError
+
     def validate_transition(self, item: ContentItem, state: str):
         raise NotImplementedError
 
@@ -53,24 +67,56 @@ class ContentStoreInterface(object):
     def get_item(self, content_item_id: int) -> ContentItem:
         raise NotImplementedError
 
+    def get_items(self, content_item_ids: List[int]) -> List[ContentItem]:
+        raise NotImplementedError
+
     def get_item_state(self, content_item_state_id: int) -> ContentItemState:
         raise NotImplementedError
 
     def get_item_state_summary(self, workspace_id=None):
         raise NotImplementedError
 
-    def get_cluster_items(self, cluster: ContentCluster) -> List[ContentItem]:
+    def get_cluster_items(
+        self, cluster: ContentCluster, page_size=1000
+    ) -> List[ContentItem]:
+        raise NotImplementedError
+
+    def scan_items(
+        self,
+        workspace_id=None,
+        filters=None,
+        columns=None,
+        page_size=1000,
+        start_after_id=0,
+        use_ro_engine=True,
+    ):
         raise NotImplementedError
 
     def delete_item(self, item: ContentItem):
         raise NotImplementedError
 
+    def delete_items(self, items: List[ContentItem]):
+        raise NotImplementedError
+
     def get_items_older_than(self):
         raise NotImplementedError
 
     def get_items_in_progress(self, workspace_id=None):
         raise NotImplementedError
 
+    def claim_items_in_progress(
+        self,
+        workspace_id,
+        batch_state,
+        chunk_size=25,
+        lease_duration=60,
+        include_state=False,
+    ) -> List[ContentItem]:
+        raise NotImplementedError
+
+    def release_items(self, items: List[ContentItem]):
+        raise NotImplementedError
+
     def serialize_object(self, obj: ContentStoreObject):
         raise NotImplementedError
 
@@ -37,6 +37,10 @@ class ContentItemState(StateModel, ContentStoreObject):
     * `completed_timestamp` will be set when the process is
     completed (in error or completed state, no more transitions needed)
 
+    * `lease_expiration` timestamp will be set when a worker process claims
+    the item for dispatch (see ContentStore.claim_items_in_progress()) so
+    that other workers will skip it until the lease expires or is released
+
     If transition_start > transition_end, assume a new transition is in progress
 
     Note: a workflow may add transitions and states by extending and adapting this
@@ -155,6 +159,7 @@ class ContentItemState(StateModel, ContentStoreObject):
     transition_start: Mapped[Optional[datetime.datetime]]
     transition_end: Mapped[Optional[datetime.datetime]]
     completed_timestamp: Mapped[Optional[datetime.datetime]]
+    lease_expiration: Mapped[Optional[datetime.datetime]]
 
     # ensure we can instantiate the correct subclass when recreating from orm
     __mapper_args__ = {
@@ -169,6 +174,7 @@ class ContentItemState(StateModel, ContentStoreObject):
         self.transition_num = 0
         self.transition_start = datetime.datetime.utcnow()
         self.transition_end = datetime.datetime.utcnow()
+        self.lease_expiration = None
         self.reload_states()
 
     @orm.reconstructor
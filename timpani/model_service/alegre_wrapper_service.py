@@ -1,11 +1,12 @@
-import requests
 import json
 from dataclasses import dataclass
 from timpani.app_cfg import TimpaniAppCfg
+from timpani.util.callback_coalescer import CallbackCoalescer
 
 import timpani.util.timpani_logger
 
 from timpani.util.metrics_exporter import TelemetryMeterExporter
+from timpani.util.http_session import get_http_session
 
 logging = timpani.util.timpani_logger.get_logger()
 
@@ -21,6 +22,12 @@ class AlegreWrapperService(object):
     telemetry = TelemetryMeterExporter(service_name="timpani-conductor")
     MODEL_KEY = None  # NOTE: cannot be none, must be overidden by sub class
     CALLBACK_URL = app_cfg.timpani_conductor_api_endpoint + "/update_item_state"
+    BATCH_CALLBACK_URL = app_cfg.timpani_conductor_api_endpoint + "/update_item_states"
+    # if coalescing, state callbacks are queued and sent in batches
+    # (shared across instances, since they all call the same endpoint)
+    callback_coalescer = None
+    if app_cfg.coalesce_callbacks:
+        callback_coalescer = CallbackCoalescer(BATCH_CALLBACK_URL)
 
     service_response_metric = telemetry.get_gauge(
         "service.request.duration",
@@ -32,7 +39,12 @@ class AlegreWrapperService(object):
         """
         Helper function to make sure we do the state update callbacks in the same way
         """
-        callback_response = requests.post(
+        if self.callback_coalescer is not None:
+            self.callback_coalescer.add(
+                {"content_item_id": content_item_id, "state": target_state}
+            )
+            return
+        callback_response = get_http_session("conductor").post(
             self.CALLBACK_URL,
             data=json.dumps(
                 {"content_item_id": content_item_id, "state": target_state}
@@ -51,7 +63,7 @@ class AlegreWrapperService(object):
         Confirm that we are able to connect to Alegre service
         """
         healthcheck_url = self.app_cfg.alegre_api_endpoint + "/healthcheck"
-        response = requests.get(healthcheck_url)
+        response = get_http_session("alegre").get(healthcheck_url)
         assert (
             response.ok
         ), f"Unable to process response from Alegre service at {healthcheck_url}"
@@ -75,7 +87,7 @@ class AlegreWrapperService(object):
         logging.debug(
             f"requesting vectorization from Alegre {post_url} for content_item_id {content_item_id}"
         )
-        response = requests.post(
+        response = get_http_session("alegre").post(
             post_url,
             json=query_blob,
             headers={
@@ -1,4 +1,3 @@
-import requests
 import json
 import uuid
 import datetime
@@ -7,6 +6,7 @@ from collections import namedtuple
 
 from timpani.app_cfg import TimpaniAppCfg
 from timpani.content_store.content_item import ContentItem
+from timpani.util.http_session import get_http_session
 
 # from timpani.conductor.conductor import ProcessConductor
 
@@ -47,6 +47,9 @@ class ClassycatWrapper(object):
     REQUEST_HEADERS = {
         "Content-Type": "application/json",
     }
+    # classify blocks while the batch is categorized, so wait longer than the
+    # default http read timeout for the response
+    CLASSIFY_TIMEOUT_SECONDS = 600
 
     def __init__(self, default_schema_name=None, batch_wait_limit_seconds=None) -> None:
         if batch_wait_limit_seconds is not None:
@@ -90,7 +93,7 @@ class ClassycatWrapper(object):
         """
         healthcheck_url = self.CLASSYCAT_BASE_URL
         schema = {}
-        response = requests.post(
+        response = get_http_session("classycat").post(
             url=healthcheck_url, json=schema, headers=self.REQUEST_HEADERS
         )
         assert (
@@ -104,7 +107,7 @@ class ClassycatWrapper(object):
         """
         url = self.CLASSYCAT_BASE_URL
 
-        response = requests.post(
+        response = get_http_session("classycat").post(
             url, json={"event_type": "get_schema_id", "schema_name": schema_name}
         )
         if response.status_code == 404:
@@ -126,7 +129,9 @@ class ClassycatWrapper(object):
         # NOTE: assuming schema is validated on classycat side?
         url = self.CLASSYCAT_BASE_URL
 
-        response = requests.post(url, json=schema_dict, headers=self.REQUEST_HEADERS)
+        response = get_http_session("classycat").post(
+            url, json=schema_dict, headers=self.REQUEST_HEADERS
+        )
         # TODO: catch error when schema already exists
         assert (
             response.ok
@@ -254,7 +259,7 @@ class ClassycatWrapper(object):
             f"Requesting classycat categorization batch {batch_id} with schema {schema_id} for {len(content_items)} content_items "
         )
         url = self.CLASSYCAT_BASE_URL
-        response = requests.post(
+        response = get_http_session("classycat").post(
             url,
             json={
                 "items": submit_items,
@@ -262,6 +267,7 @@ class ClassycatWrapper(object):
                 "event_type": "classify",
             },
             headers=self.REQUEST_HEADERS,
+            timeout=self.CLASSIFY_TIMEOUT_SECONDS,
         )
         assert response.ok, f"Classycat classify call to {url} returned {response.text}"
 
@@ -301,7 +307,7 @@ class ClassycatWrapper(object):
         """
         Helper function to make sure we do the keyword update callbacks in the same way
         """
-        callback_response = requests.post(
+        callback_response = get_http_session("conductor").post(
             self.CALLBACK_URL + f"/{workspace_id}/{content_item_id}",
             data=json.dumps(
                 {
@@ -1,8 +1,8 @@
-import requests
 import json
 from dataclasses import dataclass, field
 from timpani.app_cfg import TimpaniAppCfg
 from timpani.content_store.content_item import ContentItem
+from timpani.util.http_session import get_http_session
 
 import timpani.util.timpani_logger
 
@@ -28,7 +28,7 @@ class PrestoWrapperService(object):
         Confirm that we are able to connect to Presto service
         """
         healthcheck_url = self.PRESTO_ENDPOINT + "/healthcheck"
-        response = requests.get(healthcheck_url)
+        response = get_http_session("presto").get(healthcheck_url)
         assert (
             response.ok
         ), f"Unable to process response from Alegre service at {healthcheck_url}"
@@ -69,7 +69,9 @@ class PrestoWrapperService(object):
         ), f"Could not submit request because payload size {payload_size} was greater than {self.MAX_SIZE_BYTES}"
 
         request_url = self.PRESTO_ENDPOINT + f"/process_item/{self.MODEL_KEY}__Model"
-        response = requests.post(url=request_url, json=request_body.get_dict())
+        response = get_http_session("presto").post(
+            url=request_url, json=request_body.get_dict()
+        )
         assert response.ok, f"Error submitting request to Presto model:{response.text}"
         logging.debug(f"presto response:{response}  {response.text}")
 
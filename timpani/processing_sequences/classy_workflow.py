@@ -1,5 +1,6 @@
 import json
 from datetime import datetime
+from timpani.util.serializer import parse_datetime
 
 from timpani.processing_sequences.workflow import Workflow
 from timpani.content_store.content_item import ContentItem
@@ -166,7 +167,7 @@ class ClassyWorkflow(Workflow):
                     )
                 )
 
-            published_at = datetime.strptime(
+            published_at = parse_datetime(
                 raw_item.content["attributes"]["published_at"],
                 # format "2023-05-03T06:15:02.000Z"
                 "%Y-%m-%dT%H:%M:%S.%fZ",
@@ -316,7 +317,7 @@ class ClassyWorkflow(Workflow):
 
             case _:  # nothing matched
                 logging.error(
-                    f"Item {item.content_item_id} state {state.current_state} does not match states for workflow {self.get_name}"
+                    f"Item {item.content_item_id} state {state_name} does not match states for workflow {self.get_name}"
                 )
                 return Workflow.ERROR
 
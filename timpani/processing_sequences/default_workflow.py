@@ -1,5 +1,5 @@
 import json
-from datetime import datetime
+from timpani.util.serializer import parse_datetime
 from timpani.processing_sequences.workflow import Workflow
 from timpani.content_store.content_item import ContentItem
 from timpani.content_store.item_state_model import ContentItemState
@@ -141,7 +141,7 @@ class DefaultWorkflow(Workflow):
                 all_text = raw_item.content["attributes"]["search_data_fields"][
                     "all_text"
                 ]
-                published_at = datetime.strptime(
+                published_at = parse_datetime(
                     raw_item.content["attributes"]["published_at"],
                     #  "2023-05-03T06:15:02.000Z"
                     "%Y-%m-%dT%H:%M:%S.%fZ",
@@ -238,7 +238,7 @@ class DefaultWorkflow(Workflow):
                 )
             case _:  # nothing matched
                 logging.error(
-                    f"Item {item.content_item_id} state {state.current_state} does not match states for workflow {self.get_name}"
+                    f"Item {item.content_item_id} state {state_name} does not match states for workflow {self.get_name}"
                 )
                 return Workflow.ERROR
         return Workflow.SUCCESS
@@ -1,5 +1,5 @@
 import json
-from datetime import datetime
+from timpani.util.serializer import parse_datetime
 
 from timpani.processing_sequences.workflow import Workflow
 from timpani.content_store.content_item import ContentItem
@@ -159,7 +159,7 @@ class MeedanWorkflow(Workflow):
                     )
                 )
 
-            published_at = datetime.strptime(
+            published_at = parse_datetime(
                 raw_item.content["attributes"]["published_at"],
                 # format "2023-05-03T06:15:02.000Z"
                 "%Y-%m-%dT%H:%M:%S.%fZ",
@@ -299,7 +299,7 @@ class MeedanWorkflow(Workflow):
 
             case _:  # nothing matched
                 logging.error(
-                    f"Item {item.content_item_id} state {state.current_state} does not match states for workflow {self.get_name}"
+                    f"Item {item.content_item_id} state {state_name} does not match states for workflow {self.get_name}"
                 )
         # TODO: how do we know it has failed?  because we keep revisiting states, or some kind of timeout from initial creation
         return Workflow.SUCCESS
@@ -70,7 +70,7 @@ class NoopWorkflow(Workflow):
                 )
             case _:  # nothing matched
                 logging.error(
-                    f"Item {item.content_item_id} state {state.current_state} does not match states for workflow {self.get_name}"
+                    f"Item {item.content_item_id} state {state_name} does not match states for workflow {self.get_name}"
                 )
         return Workflow.SUCCESS
 
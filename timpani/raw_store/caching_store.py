@@ -0,0 +1,304 @@
+import os
+import time
+import uuid
+import fcntl
+import hashlib
+import threading
+from collections import OrderedDict
+from timpani.app_cfg import TimpaniAppCfg
+from timpani.raw_store.store import Store
+from timpani.util.run_state import RunState
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class CachingStore(Store):
+    """
+    Wraps another Store, keeping a copy of each chunk it fetches on local disk
+    so that reprocessing the same partitions (i.e. force_overwrite reimports,
+    backfills and benchmark reruns) reads the chunks from disk instead of S3.
+
+    Chunks are cached in their stored (compressed) form in files named by a hash
+    of the object name. Chunk object names are unique and chunks are never
+    rewritten, so cached chunks are used without checking the store. If
+    `revalidate` is True, the name also includes the version of the chunk (the
+    ETag in S3, a HEAD request per chunk) so a rewritten chunk is fetched again.
+    When the cached chunks total more than `max_bytes` the least recently used
+    are evicted. The cache files persist between runs, and recency is tracked
+    with the file modification times.
+    Writes, listings, manifests and run states go directly to the wrapped store.
+
+    Several processes (i.e. raw import workers) can share a cache directory: a
+    chunk missing from this store's index is looked for in the directory before
+    it is downloaded, and a chunk evicted by another process is downloaded again.
+    Eviction uses the index of this store, which is rebuilt from a scan of the
+    directory (holding an exclusive lock on LOCK_NAME) at most every
+    RESCAN_SECONDS to account for the chunks cached by other processes. Only temp
+    files older than STALE_TEMP_SECONDS (abandoned downloads) are cleaned up.
+    """
+
+    cfg = TimpaniAppCfg()
+    CACHE_DIR = cfg.raw_store_cache_dir
+    MAX_BYTES = cfg.raw_store_cache_max_bytes
+    TEMP_SUFFIX = ".tmp"
+    LOCK_NAME = ".lock"
+    REVALIDATE = cfg.raw_store_cache_revalidate
+    # temp files of downloads that are in progress in other processes are newer
+    STALE_TEMP_SECONDS = 60 * 60
+    # minimum time between scans of the cache directory when evicting
+    RESCAN_SECONDS = 60
+
+    def __init__(self, store: Store, cache_dir=None, max_bytes=None, revalidate=None):
+        if cache_dir is not None:
+            self.CACHE_DIR = cache_dir
+        if max_bytes is not None:
+            self.MAX_BYTES = max_bytes
+        if revalidate is not None:
+            self.REVALIDATE = revalidate
+        assert self.CACHE_DIR is not None, "CachingStore needs a cache directory"
+        self.store = store
+        # chunks may be fetched concurrently by prefetching threads
+        self.cache_lock = threading.Lock()
+        self.entries = OrderedDict()  # cache file name -> size, least recent first
+        self.cache_bytes = 0
+        self.last_scan = None
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.CACHE_DIR, exist_ok=True)
+        self._load_entries()
+        logging.info(
+            f"CachingStore caching {len(self.entries)} chunks"
+            + f" ({self.cache_bytes} bytes) in {self.CACHE_DIR}"
+        )
+
+    def get_config(self):
+        return {
+            "store_type": "CachingStore",
+            "store": self.store.get_config(),
+            "cache_dir": self.CACHE_DIR,
+            "max_bytes": self.MAX_BYTES,
+            "revalidate": self.REVALIDATE,
+        }
+
+    def __getattr__(self, name):
+        # anything specific to the wrapped store (i.e. login_and_validate)
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    def _load_entries(self):
+        """
+        Internal function to index the chunks already in the cache directory
+        """
+        with self.cache_lock:
+            self._evict(rescan=True)
+
+    def _scan_entries(self):
+        """
+        Internal function to rebuild the entries from the files in the cache
+        directory (which may have been changed by other processes), removing
+        stale temp files. Must be called holding the cache_lock and the file lock
+        """
+        files = []
+        stale_time = time.time() - self.STALE_TEMP_SECONDS
+        for entry in os.scandir(self.CACHE_DIR):
+            if not entry.is_file() or entry.name == self.LOCK_NAME:
+                continue
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(self.TEMP_SUFFIX):
+                    if stat.st_mtime < stale_time:
+                        # left over from an interrupted download
+                        os.remove(entry.path)
+                    continue
+            except FileNotFoundError:
+                # removed by another process
+                continue
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+        self.entries = OrderedDict()
+        self.cache_bytes = 0
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.cache_bytes += size
+        self.last_scan = time.monotonic()
+
+    def _add_entry(self, name: str, size: int):
+        """
+        Internal function to record a chunk in the cache as the most recently
+        used. Must be called holding the cache_lock
+        """
+        if name in self.entries:
+            self.cache_bytes -= self.entries.pop(name)
+        self.entries[name] = size
+        self.cache_bytes += size
+
+    def _evict(self, rescan=False):
+        """
+        Internal function to delete the least recently used chunks until the
+        cache is within max_bytes. If rescan is True, or the directory hasn't been
+        scanned for RESCAN_SECONDS, the entries are first rebuilt to include the
+        chunks of all the processes sharing the cache directory.
+        Must be called holding the cache_lock
+        """
+        if (
+            self.last_scan is not None
+            and time.monotonic() - self.last_scan < self.RESCAN_SECONDS
+        ):
+            if not rescan and self.cache_bytes <= self.MAX_BYTES:
+                return
+        else:
+            rescan = True
+        lock_path = os.path.join(self.CACHE_DIR, self.LOCK_NAME)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if rescan:
+                    self._scan_entries()
+                while self.cache_bytes > self.MAX_BYTES and len(self.entries) > 0:
+                    name, size = self.entries.popitem(last=False)
+                    self.cache_bytes -= size
+                    try:
+                        os.remove(os.path.join(self.CACHE_DIR, name))
+                    except FileNotFoundError:
+                        pass
+                    logging.debug(f"CachingStore evicted {name} ({size} bytes)")
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_cache_name(self, object_name: str):
+        """
+        Returns the name of the cache file for the chunk (for the current version
+        of the chunk if revalidating)
+        """
+        key = object_name
+        if self.REVALIDATE:
+            key += "\n" + str(self.store.get_chunk_version(object_name))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def open_cached_chunk(self, object_name: str):
+        """
+        Returns an open binary file of the stored chunk object_name, from the cache
+        or after downloading it into the cache. Files are opened holding the lock so
+        that they can't be evicted first (an open file remains readable after removal)
+        """
+        name = self.get_cache_name(object_name)
+        path = os.path.join(self.CACHE_DIR, name)
+        with self.cache_lock:
+            # may have been cached by another process sharing the cache directory
+            try:
+                cached_file = open(path, "rb")
+                os.utime(path)
+                self.hits += 1
+                self._add_entry(name, os.fstat(cached_file.fileno()).st_size)
+                return cached_file
+            except FileNotFoundError:
+                if name in self.entries:
+                    # evicted by another process sharing the cache directory
+                    self.cache_bytes -= self.entries.pop(name)
+
+        # download outside of the lock so chunks can be fetched concurrently,
+        # writing to a temp file so a partial download is never used
+        raw_bytes = self.store.fetch_chunk_bytes(object_name)
+        temp_path = f"{path}_{os.getpid()}_{uuid.uuid4().hex}{self.TEMP_SUFFIX}"
+        with open(temp_path, "wb") as temp_file:
+            temp_file.write(raw_bytes)
+        # opened before it is renamed into the cache, so the file remains
+        # readable even if another process evicts it straight away
+        cached_file = open(temp_path, "rb")
+        os.replace(temp_path, path)
+        with self.cache_lock:
+            self.misses += 1
+            self._add_entry(name, len(raw_bytes))
+            self._evict()
+        logging.debug(f"CachingStore cached {object_name} as {name}")
+        return cached_file
+
+    def clear_cache(self):
+        """
+        Delete all the cached chunks
+        """
+        with self.cache_lock:
+            max_bytes = self.MAX_BYTES
+            self.MAX_BYTES = 0
+            self._evict(rescan=True)
+            self.MAX_BYTES = max_bytes
+
+    # --- reads of chunk content are served from the cache
+
+    def fetch_chunk_bytes(self, object_name: str):
+        with self.open_cached_chunk(object_name) as cached_file:
+            return cached_file.read()
+
+    def fetch_chunk_items(self, object_name: str):
+        with self.open_cached_chunk(object_name) as cached_file:
+            yield from self.store.read_chunk_items(object_name, cached_file)
+
+    def fetch_chunk_lines(self, object_name: str):
+        for item in self.fetch_chunk_items(object_name):
+            yield item.toJSON()
+
+    def fetch_chunk(self, object_name: str):
+        return "".join(line + "\n" for line in self.fetch_chunk_lines(object_name))
+
+    def fetch_chunks_in_partition(self, partition_id: Store.Partition):
+        for chunk in self.list_chunks_in_partition(partition_id):
+            yield self.fetch_chunk(chunk.object_name)
+
+    def read_chunk_lines(self, fileobj):
+        return self.store.read_chunk_lines(fileobj)
+
+    def read_chunk_items(self, object_name: str, fileobj):
+        return self.store.read_chunk_items(object_name, fileobj)
+
+    # --- everything else goes to the wrapped store
+
+    def get_chunk_version(self, object_name: str):
+        return self.store.get_chunk_version(object_name)
+
+    def new_chunk_buffer(self):
+        return self.store.new_chunk_buffer()
+
+    def append_chunk_buffer(
+        self, partition_id: Store.Partition, chunk_buffer, defer_manifest=False
+    ):
+        return self.store.append_chunk_buffer(
+            partition_id, chunk_buffer, defer_manifest=defer_manifest
+        )
+
+    def commit_manifest(self, partition_id: Store.Partition):
+        return self.store.commit_manifest(partition_id)
+
+    def get_num_uncommitted_chunks(self, partition_id: Store.Partition):
+        return self.store.get_num_uncommitted_chunks(partition_id)
+
+    def get_partition_path(self, partition_id: Store.Partition):
+        return self.store.get_partition_path(partition_id)
+
+    def list_chunks_in_partition(self, partition_id: Store.Partition):
+        return self.store.list_chunks_in_partition(partition_id)
+
+    def supports_compaction(self):
+        return self.store.supports_compaction()
+
+    def compact_partition(self, partition_id: Store.Partition, target_chunk_size=None):
+        return self.store.compact_partition(
+            partition_id, target_chunk_size=target_chunk_size
+        )
+
+    def get_partition_manifest(self, partition_id: Store.Partition):
+        return self.store.get_partition_manifest(partition_id)
+
+    def get_state_model(self):
+        return self.store.get_state_model()
+
+    def record_partition_run_state(
+        self, run_state: RunState, partition_id: Store.Partition
+    ):
+        return self.store.record_partition_run_state(run_state, partition_id)
+
+    def fetch_partition_run_state_json(
+        self, partition_id: Store.Partition, run_id: str
+    ):
+        return self.store.fetch_partition_run_state_json(partition_id, run_id)
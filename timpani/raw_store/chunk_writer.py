@@ -0,0 +1,194 @@
+import io
+from gzip import GzipFile
+from typing import List
+from timpani.app_cfg import TimpaniAppCfg
+from timpani.raw_store.item import Item
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class JsonlChunkBuffer(object):
+    """
+    In-memory buffer for the json lines of the items in a chunk (https://jsonlines.org/)
+    Lines are encoded as the items are added, and optionally gzip compressed
+    as they are written so that the uncompressed text is never held in memory.
+    """
+
+    def __init__(self, compress=False):
+        self.buffer = io.BytesIO()
+        self.stream = self.buffer
+        if compress:
+            self.stream = GzipFile(fileobj=self.buffer, mode="wb")
+        self.content_ids = []
+        self.num_bytes = 0  # size of the encoded (uncompressed) lines
+
+    def add(self, item: Item):
+        line = item.toJSON().encode("utf-8") + b"\n"
+        self.stream.write(line)
+        self.content_ids.append(item.content_id)
+        self.num_bytes += len(line)
+
+    def get_num_items(self):
+        return len(self.content_ids)
+
+    def getvalue(self):
+        """
+        Finish the chunk and return the bytes to be stored
+        """
+        if self.stream is not self.buffer:
+            # writes the gzip trailer, but leaves the buffer open
+            self.stream.close()
+        return self.buffer.getvalue()
+
+
+class ChunkWriter(object):
+    """
+    Buffers the Items written to a raw store partition and appends them to the
+    store as a single chunk each time `max_items` items or `max_bytes` bytes
+    (of encoded items) have been buffered, so that content sources can write items
+    as they are acquired without creating a small chunk for every API page or
+    CSV block. Items are encoded into the store's chunk buffer as they are written.
+    Use as a context manager so that the last partial chunk is written:
+    ```
+    with store.chunk_writer(partition_id) as writer:
+        for payload in pages:
+            writer.write_items(payload)
+    ```
+    Callbacks can be registered with when_stored() to be called once the items
+    written so far have been appended to the store (i.e. to checkpoint progress).
+
+    For stores that keep partition manifests, the chunks are appended with
+    defer_manifest and the manifest is updated once for every
+    MANIFEST_BATCH_CHUNKS chunks (and on flush()), instead of once per chunk.
+    Items only count as stored once their chunk is in the manifest.
+    """
+
+    cfg = TimpaniAppCfg()
+    MAX_ITEMS = cfg.raw_store_chunk_max_items
+    MAX_BYTES = cfg.raw_store_chunk_max_bytes
+    MANIFEST_BATCH_CHUNKS = 16
+
+    def __init__(self, store, partition_id, max_items=None, max_bytes=None):
+        if max_items is not None:
+            self.MAX_ITEMS = max_items
+        if max_bytes is not None:
+            self.MAX_BYTES = max_bytes
+        assert self.MAX_ITEMS > 0, f"max_items must be positive, not {self.MAX_ITEMS}"
+        assert self.MAX_BYTES > 0, f"max_bytes must be positive, not {self.MAX_BYTES}"
+        self.store = store
+        self.partition_id = partition_id
+        self.chunk_buffer = None
+        self.object_names = []  # of the chunks written so far
+        self.num_items = 0
+        # called when the items buffered before they were registered are stored
+        self.stored_callbacks = []
+        # chunks appended but not yet in the manifest, and the callbacks waiting for them
+        self.num_uncommitted = 0
+        self.uncommitted_callbacks = []
+
+    def write(self, item: Item):
+        """
+        Add the item to the current chunk, appending the chunk
+        to the store if it has reached the size limits
+        """
+        assert isinstance(item, Item)
+        if self.chunk_buffer is None:
+            self.chunk_buffer = self.store.new_chunk_buffer()
+        self.chunk_buffer.add(item)
+        self.num_items += 1
+        if (
+            self.chunk_buffer.get_num_items() >= self.MAX_ITEMS
+            or self.chunk_buffer.num_bytes >= self.MAX_BYTES
+        ):
+            self._append_chunk()
+            num_uncommitted = self.store.get_num_uncommitted_chunks(self.partition_id)
+            # (no uncommitted chunks if the store doesn't keep manifests,
+            # or if another writer has already committed them)
+            if num_uncommitted == 0 or num_uncommitted >= self.MANIFEST_BATCH_CHUNKS:
+                self._commit()
+
+    def write_items(self, payload: List[Item], on_stored=None):
+        """
+        Write the items, calling `on_stored` (if given) once they are all
+        appended to the store, see when_stored()
+        """
+        for item in payload:
+            self.write(item)
+        if on_stored is not None:
+            self.when_stored(on_stored)
+
+    def when_stored(self, callback):
+        """
+        Call `callback` (with no arguments) as soon as all of the items written
+        so far have been appended to the store, which is immediately if none
+        are buffered, otherwise when they are flushed
+        """
+        if self.get_num_buffered() > 0:
+            self.stored_callbacks.append(callback)
+        elif self.num_uncommitted > 0:
+            self.uncommitted_callbacks.append(callback)
+        else:
+            callback()
+
+    def get_num_buffered(self):
+        """
+        Number of items written that have not yet been appended to the store
+        """
+        if self.chunk_buffer is None:
+            return 0
+        return self.chunk_buffer.get_num_items()
+
+    def flush(self):
+        """
+        Append any buffered items to the store as a chunk, and commit all of
+        the chunks appended so far to the partition manifest.
+        Returns the object name of the chunk, or None if nothing was buffered
+        """
+        object_name = self._append_chunk()
+        self._commit()
+        return object_name
+
+    def _append_chunk(self):
+        """
+        Internal function to append the buffered items to the store as a chunk,
+        without adding it to the manifest.
+        Returns the object name of the chunk, or None if nothing was buffered
+        """
+        if self.chunk_buffer is None or self.chunk_buffer.get_num_items() == 0:
+            return None
+        chunk_buffer = self.chunk_buffer
+        self.chunk_buffer = None
+        object_name = self.store.append_chunk_buffer(
+            self.partition_id, chunk_buffer, defer_manifest=True
+        )
+        self.object_names.append(object_name)
+        self.num_uncommitted += 1
+        logging.debug(
+            f"ChunkWriter appended {chunk_buffer.get_num_items()} items to {object_name}"
+        )
+        self.uncommitted_callbacks.extend(self.stored_callbacks)
+        self.stored_callbacks = []
+        return object_name
+
+    def _commit(self):
+        """
+        Internal function to add the appended chunks to the manifest, and call
+        the callbacks that were waiting for them
+        """
+        if self.num_uncommitted > 0:
+            self.store.commit_manifest(self.partition_id)
+            self.num_uncommitted = 0
+        callbacks = self.uncommitted_callbacks
+        self.uncommitted_callbacks = []
+        for callback in callbacks:
+            callback()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # keep whatever was acquired, even if the source failed part way through
+        self.flush()
+        return False
@@ -1,13 +1,19 @@
+import io
 import boto3
+from boto3.s3.transfer import TransferConfig
 import uuid
+import random
+import threading
+import time
+from botocore.exceptions import ClientError
 
 from timpani.app_cfg import TimpaniAppCfg
-from gzip import compress, decompress
+from gzip import decompress, GzipFile
 
 from timpani.util.run_state import RunState
-from timpani.raw_store.item import Item
 from timpani.raw_store.store import Store
-from typing import List
+from timpani.raw_store.chunk_writer import JsonlChunkBuffer
+from timpani.raw_store.partition_manifest import PartitionManifest
 
 import timpani.util.timpani_logger
 from timpani.util.metrics_exporter import TelemetryMeterExporter
@@ -22,8 +28,20 @@ class CloudStore(Store):
     to talk to either remote aws S3 services or local minio.
 
     Storage partitioning is set up to support Hive/Athena and
-    objects will be gz compressed.
-    TODO: switch to parquet format
+    objects will be gz compressed jsonl, or Parquet if the store is
+    configured with the "parquet" chunk format. Parquet chunks are written
+    under a seperate base path (so they can have their own Athena table)
+    but both formats are read back when fetching a partition.
+
+    Each partition has a PartitionManifest object (under MANIFESTS_PATH) that
+    is rewritten after every append (or once for a batch of chunks appended with
+    defer_manifest, see ChunkWriter), and readers use it to find the chunks
+    instead of listing the bucket. Partitions written before manifests existed
+    are listed, and get a manifest the next time a chunk is appended to them.
+    Every change to a manifest re-reads it and replaces it with a conditional
+    put (If-Match on the ETag that was read, or If-None-Match for a new one),
+    retrying if another process changed it in between, so concurrent writers
+    to a partition don't lose each other's chunks.
     """
 
     cfg = TimpaniAppCfg()
@@ -32,10 +50,32 @@ class CloudStore(Store):
     STORE_LOCATION = cfg.s3_store_location
     BUCKET_NAME = f"timpani-raw-store-{cfg.deploy_env_label}"
     ITEMS_PATH = "content_items"  # base path for S3 to play nice with Athena
+    ITEMS_PARQUET_PATH = "content_items_parquet"
     STATES_PATH = "content_states"
+    MANIFESTS_PATH = "content_manifests"
+    CHUNK_FORMAT = cfg.raw_store_chunk_format
+    PARQUET_ROW_GROUP_SIZE = cfg.raw_store_parquet_row_group_size
+    JSONL_SUFFIX = ".jsonl.gz"
+    PARQUET_SUFFIX = ".parquet"
+    # chunks larger than this are uploaded in parts of this size
+    MULTIPART_THRESHOLD = 16 * 1024 * 1024
+    # times to re-read and retry a manifest change that lost a race
+    MAX_MANIFEST_RETRIES = 10
+    # base delay (seconds) before retrying a manifest change, doubled each retry
+    MANIFEST_RETRY_DELAY = 0.05
+    # default size of the chunks merged by compact_partition()
+    COMPACT_CHUNK_SIZE = 64 * 1024 * 1024
     s3_bucket = None
+    access_key = None
+    secret_key = None
 
-    def __init__(self, store_location=None, bucket_name=None):
+    def __init__(
+        self,
+        store_location=None,
+        bucket_name=None,
+        chunk_format=None,
+        row_group_size=None,
+    ):
         """
         For setting non-default values instad of fetching from cfg
         (usually for testing)
@@ -44,6 +84,22 @@ class CloudStore(Store):
             self.STORE_LOCATION = store_location
         if bucket_name is not None:
             self.BUCKET_NAME = bucket_name
+        if chunk_format is not None:
+            self.CHUNK_FORMAT = chunk_format
+        if row_group_size is not None:
+            self.PARQUET_ROW_GROUP_SIZE = row_group_size
+        assert self.CHUNK_FORMAT in [
+            "jsonl",
+            "parquet",
+        ], f"Unknown raw store chunk format {self.CHUNK_FORMAT}"
+        # avoids conflicting manifest writes between the threads of this store
+        self.manifest_lock = threading.RLock()
+        # chunks appended with defer_manifest, by partition id
+        self.uncommitted_chunks = {}
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.MULTIPART_THRESHOLD,
+            multipart_chunksize=self.MULTIPART_THRESHOLD,
+        )
         self.records_stored_metric = self.telemetry.get_counter(
             "items.stored", "number of individual items acquired into raw store"
         )
@@ -67,11 +123,25 @@ class CloudStore(Store):
                 aws_secret_access_key=secret_key,
             )
         self.s3_bucket = s3.Bucket(self.BUCKET_NAME)
+        # kept so an equivalent store can be created, see get_config()
+        self.access_key = access_key
+        self.secret_key = secret_key
 
         logging.info(
             f"CloudStore connecting to {self.STORE_LOCATION} : {self.s3_bucket}"
         )
 
+    def get_config(self):
+        return {
+            "store_type": "CloudStore",
+            "store_location": self.STORE_LOCATION,
+            "bucket_name": self.BUCKET_NAME,
+            "chunk_format": self.CHUNK_FORMAT,
+            "row_group_size": self.PARQUET_ROW_GROUP_SIZE,
+            "access_key": self.access_key,
+            "secret_key": self.secret_key,
+        }
+
     def get_partition_path(self, partition_id: Store.Partition, base_path=ITEMS_PATH):
         """
         Constructs the path string with the appropriate keys for data
@@ -92,33 +162,37 @@ class CloudStore(Store):
         )
         return partition
 
-    def append_chunk(self, partition_id: Store.Partition, payload: List[Item]):
-        super(CloudStore, self).validate(payload)
+    def new_chunk_buffer(self):
         """
-        We are writing out a json compatible format instead of pickling
-        because we'd like other things to be able to use the data in the
-        object store (like AWS Athena)
+        We are writing out a json compatible format (or parquet) instead of
+        pickling because we'd like other things to be able to use the data in
+        the object store (like AWS Athena)
         """
-        chunk_id = uuid.uuid4().hex
-        partition_path = self.get_partition_path(partition_id)
-        object_name = partition_path + "_" + chunk_id + ".jsonl.gz"
-        payload_str = ""
-        num_items = 0
-        for item in payload:
-            # convert each item to json objects but
-            # chunk is json lines https://jsonlines.org/
-            payload_str += item.toJSON() + "\n"
-            num_items += 1
-        compressed_obj = compress(bytes(payload_str, encoding="utf8"))
-        self.s3_bucket.put_object(
-            Key=object_name,
-            Body=compressed_obj,
-            ContentType="application/json",
-            ContentEncoding="gzip",
+        if self.CHUNK_FORMAT == "parquet":
+            # only import if needed so pyarrow is not required for jsonl
+            from timpani.raw_store.parquet_chunk import ParquetChunkBuffer
+
+            return ParquetChunkBuffer(self.PARQUET_ROW_GROUP_SIZE)
+        # chunk is gzipped json lines, compressed as the items are added
+        return JsonlChunkBuffer(compress=True)
+
+    def append_chunk_buffer(
+        self, partition_id: Store.Partition, chunk_buffer, defer_manifest=False
+    ):
+        object_name, size = self._put_chunk_buffer(partition_id, chunk_buffer)
+        chunk = (
+            object_name,
+            chunk_buffer.get_num_items(),
+            size,
+            chunk_buffer.content_ids,
         )
-        logging.debug("Wrote data to CloudStore object {}".format(object_name))
+        if defer_manifest:
+            with self.manifest_lock:
+                self.uncommitted_chunks.setdefault(partition_id, []).append(chunk)
+        else:
+            self._add_chunks_to_manifest(partition_id, [chunk])
         self.records_stored_metric.add(
-            num_items,
+            chunk_buffer.get_num_items(),
             attributes={
                 "workspace_id": partition_id.workspace_id,
                 "source_id": partition_id.source_id,
@@ -127,45 +201,436 @@ class CloudStore(Store):
 
         return object_name
 
-    def fetch_chunk(self, object_name: str):
-        raw_bytes = (
-            self.s3_bucket.Object(object_name)
-            .get(
-                ResponseContentType="application/json", ResponseContentEncoding="gzip"
-            )["Body"]
-            .read()
+    def _put_chunk_buffer(self, partition_id: Store.Partition, chunk_buffer):
+        """
+        Internal function to write the chunk buffer (from new_chunk_buffer())
+        as a new chunk object, without updating the manifest. Large chunks
+        are sent as a multipart upload.
+        Returns the object name and stored size in bytes
+        """
+        chunk_id = uuid.uuid4().hex
+        if self.CHUNK_FORMAT == "parquet":
+            partition_path = self.get_partition_path(
+                partition_id, self.ITEMS_PARQUET_PATH
+            )
+            object_name = partition_path + "_" + chunk_id + self.PARQUET_SUFFIX
+            extra_args = {"ContentType": "application/vnd.apache.parquet"}
+        else:
+            partition_path = self.get_partition_path(partition_id)
+            object_name = partition_path + "_" + chunk_id + self.JSONL_SUFFIX
+            extra_args = {"ContentType": "application/json", "ContentEncoding": "gzip"}
+        body = chunk_buffer.getvalue()
+        self.s3_bucket.upload_fileobj(
+            io.BytesIO(body),
+            object_name,
+            ExtraArgs=extra_args,
+            Config=self.transfer_config,
         )
+        logging.debug("Wrote data to CloudStore object {}".format(object_name))
+        return object_name, len(body)
+
+    def fetch_chunk(self, object_name: str):
+        if object_name.endswith(self.PARQUET_SUFFIX):
+            # return the same jsonl text as for a jsonl chunk
+            return "".join(line + "\n" for line in self.fetch_chunk_lines(object_name))
+        raw_bytes = self.fetch_chunk_bytes(object_name)
         raw_obj = decompress(raw_bytes).decode("utf-8")
         # TODO: update to return Item list of item objects instead of dict
         return raw_obj
 
+    def fetch_chunk_bytes(self, object_name: str):
+        return self._get_chunk_body(object_name).read()
+
+    def _get_chunk_body(self, object_name: str):
+        """
+        Internal function to start downloading a chunk object, returns the
+        streaming body. The response headers are only overridden for gzipped
+        jsonl chunks, parquet chunks are returned as stored
+        """
+        get_args = {}
+        if object_name.endswith(self.JSONL_SUFFIX):
+            get_args = {
+                "ResponseContentType": "application/json",
+                "ResponseContentEncoding": "gzip",
+            }
+        return self.s3_bucket.Object(object_name).get(**get_args)["Body"]
+
+    def get_chunk_version(self, object_name: str):
+        # loads the object metadata with a HEAD request
+        return self.s3_bucket.Object(object_name).e_tag
+
+    def read_chunk_lines(self, fileobj):
+        """
+        Chunks are gz compressed, so decompress incrementally while reading
+        """
+        return super(CloudStore, self).read_chunk_lines(
+            GzipFile(fileobj=fileobj, mode="rb")
+        )
+
+    def read_chunk_items(self, object_name: str, fileobj):
+        if object_name.endswith(self.PARQUET_SUFFIX):
+            from timpani.raw_store.parquet_chunk import parquet_to_items
+
+            return parquet_to_items(fileobj, batch_size=self.PARQUET_ROW_GROUP_SIZE)
+        return super(CloudStore, self).read_chunk_items(object_name, fileobj)
+
+    def fetch_chunk_items(self, object_name: str):
+        if object_name.endswith(self.PARQUET_SUFFIX):
+            # parquet metadata is at the end of the file, so it can't be streamed
+            return self.read_chunk_items(
+                object_name, io.BytesIO(self.fetch_chunk_bytes(object_name))
+            )
+        return super(CloudStore, self).fetch_chunk_items(object_name)
+
+    def fetch_chunk_lines(self, object_name: str):
+        """
+        Stream the object from S3, decompressing and decoding incrementally
+        so that only a buffer's worth of the chunk is in memory at a time
+        """
+        if object_name.endswith(self.PARQUET_SUFFIX):
+            for item in self.fetch_chunk_items(object_name):
+                yield item.toJSON()
+            return
+        body = self._get_chunk_body(object_name)
+        try:
+            yield from self.read_chunk_lines(body)
+        finally:
+            body.close()
+
+    def list_chunks_in_partition(self, partition_id: Store.Partition):
+        manifest = self.get_partition_manifest(partition_id)
+        if manifest is not None:
+            for chunk in manifest.chunks:
+                yield Store.ChunkInfo(chunk["object_name"], chunk["size"])
+        else:
+            yield from self._list_chunk_objects(partition_id)
+
+    def _list_chunk_objects(self, partition_id: Store.Partition):
+        """
+        Internal function to list the chunks of the partition from the bucket
+        """
+        # partitions may contain chunks in either format
+        for base_path in [self.ITEMS_PATH, self.ITEMS_PARQUET_PATH]:
+            bucket_prefix = self.get_partition_path(partition_id, base_path)
+            logging.debug(f"Fetching objects in bucket {bucket_prefix}")
+            for obj in self.s3_bucket.objects.filter(Prefix=bucket_prefix):
+                yield Store.ChunkInfo(obj.key, obj.size)
+
+                # NOTE: I confirmed this will return more than 1000 chunks without pagination
+
     def fetch_chunks_in_partition(self, partition_id: Store.Partition):
-        bucket_prefix = self.get_partition_path(partition_id)
-        logging.debug(f"Fetching objects in bucket {bucket_prefix}")
-        for obj in self.s3_bucket.objects.filter(Prefix=bucket_prefix):
-            yield self.fetch_chunk(obj.key)
+        for chunk in self.list_chunks_in_partition(partition_id):
+            yield self.fetch_chunk(chunk.object_name)
+
+    def get_manifest_name(self, partition_id: Store.Partition):
+        return (
+            self.get_partition_path(partition_id, self.MANIFESTS_PATH)
+            + "_manifest.json"
+        )
+
+    def get_partition_manifest(self, partition_id: Store.Partition):
+        manifest, _ = self._read_manifest(partition_id)
+        return manifest
 
-            # NOTE: I confirmed this will return more than 1000 chunks without pagination
+    def _read_manifest(self, partition_id: Store.Partition):
+        """
+        Internal function to fetch the manifest of the partition along with its
+        ETag (for a conditional replace), or (None, None) if it doesn't have one
+        """
+        try:
+            response = self.s3_bucket.Object(self.get_manifest_name(partition_id)).get()
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return None, None
+            raise e
+        manifest_json = response["Body"].read()
+        return PartitionManifest.from_json(manifest_json), response["ETag"]
+
+    def rebuild_partition_manifest(self, partition_id: Store.Partition):
+        """
+        Create (or replace) the manifest for the partition by listing and reading
+        all of its chunks. Used for partitions written before manifests existed
+        or to repair a manifest that is missing chunks
+        """
+        return self._update_manifest(
+            partition_id,
+            lambda manifest: self._build_manifest_from_listing(partition_id),
+        )
+
+    def _build_manifest_from_listing(self, partition_id: Store.Partition, skip=()):
+        """
+        Internal function to make a manifest from the chunks in the bucket
+        (except the object names in `skip`), reading them to count the items
+        """
+        manifest = PartitionManifest(
+            partition_id.workspace_id, partition_id.source_id, partition_id.date_id
+        )
+        for chunk in self._list_chunk_objects(partition_id):
+            if chunk.object_name in skip:
+                continue
+            content_ids = [
+                item.content_id for item in self.fetch_chunk_items(chunk.object_name)
+            ]
+            manifest.add_chunk(
+                chunk.object_name, len(content_ids), chunk.size, content_ids
+            )
+        return manifest
+
+    def commit_manifest(self, partition_id: Store.Partition):
+        """
+        Add all of the chunks appended to the partition with defer_manifest
+        (by any thread) to its manifest with a single update
+        """
+        with self.manifest_lock:
+            chunks = self.uncommitted_chunks.pop(partition_id, [])
+            if len(chunks) == 0:
+                return
+            try:
+                self._add_chunks_to_manifest(partition_id, chunks)
+            except Exception:
+                # keep them for the next commit
+                self.uncommitted_chunks[
+                    partition_id
+                ] = chunks + self.uncommitted_chunks.get(partition_id, [])
+                raise
+
+    def get_num_uncommitted_chunks(self, partition_id: Store.Partition):
+        with self.manifest_lock:
+            return len(self.uncommitted_chunks.get(partition_id, []))
+
+    def _add_chunks_to_manifest(self, partition_id: Store.Partition, chunks):
+        """
+        Internal function to record appended chunks in the partition manifest,
+        each given as a tuple of object name, number of items, size and content ids.
+        The manifest is replaced with a single put, so readers never see a partial one
+        """
+        object_names = set(chunk[0] for chunk in chunks)
+
+        def add_chunks(manifest):
+            if manifest is None:
+                # first chunks since manifests, so include any chunks already there
+                manifest = self._build_manifest_from_listing(
+                    partition_id, skip=object_names
+                )
+            # a concurrent writer may have listed the chunks into its new manifest
+            listed = set(manifest.get_object_names())
+            for chunk in chunks:
+                if chunk[0] not in listed:
+                    manifest.add_chunk(*chunk)
+            return manifest
+
+        self._update_manifest(partition_id, add_chunks)
+
+    def _update_manifest(self, partition_id: Store.Partition, update):
+        """
+        Internal function to read-modify-write the manifest of the partition.
+        `update` is called with the current manifest (or None if there isn't one)
+        and returns the manifest to store, which is only written if the stored
+        manifest hasn't changed since it was read. Otherwise it is read again and
+        `update` is retried, up to MAX_MANIFEST_RETRIES times.
+        Returns the stored manifest
+        """
+        with self.manifest_lock:
+            for attempt in range(self.MAX_MANIFEST_RETRIES):
+                manifest, etag = self._read_manifest(partition_id)
+                manifest = update(manifest)
+                try:
+                    self._write_manifest(partition_id, manifest, etag)
+                    return manifest
+                except ClientError as e:
+                    if not self._is_write_conflict(e):
+                        raise e
+                    logging.info(
+                        f"Manifest for {partition_id} changed while updating it,"
+                        + f" retrying (attempt {attempt + 1})"
+                    )
+                    # back off so concurrent writers don't collide again
+                    time.sleep(
+                        random.uniform(0, self.MANIFEST_RETRY_DELAY * 2**attempt)
+                    )
+        raise RuntimeError(
+            f"Unable to update manifest for {partition_id} after"
+            + f" {self.MAX_MANIFEST_RETRIES} conflicting writes"
+        )
+
+    def _is_write_conflict(self, error: ClientError):
+        """
+        Internal function to check if a conditional put failed because the
+        object was changed (or created) by someone else
+        """
+        code = error.response["Error"]["Code"]
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return code in ["PreconditionFailed", "ConditionalRequestConflict"] or (
+            status in [409, 412]
+        )
+
+    def _write_manifest(self, partition_id: Store.Partition, manifest, etag=None):
+        """
+        Internal function to store the manifest, only if the stored one still
+        has the ETag `etag` (or if there isn't one when `etag` is None).
+        Raises a ClientError (see _is_write_conflict()) if it has changed
+        """
+        if etag is None:
+            condition = {"IfNoneMatch": "*"}
+        else:
+            condition = {"IfMatch": etag}
+        self.s3_bucket.put_object(
+            Key=self.get_manifest_name(partition_id),
+            Body=manifest.to_json(),
+            ContentType="application/json",
+            **condition,
+        )
+
+    def supports_compaction(self):
+        return True
+
+    def compact_partition(self, partition_id: Store.Partition, target_chunk_size=None):
+        """
+        Merge the small chunks of the partition (i.e. one per API page) into a
+        few large chunks of roughly `target_chunk_size` stored bytes (default
+        COMPACT_CHUNK_SIZE), written in the configured chunk format. Each merged
+        chunk is read back to verify that it has the same items as the chunks it
+        replaces, then the manifest is swapped
+        to the merged chunks with a single put and the small chunks are deleted.
+        Chunks already larger than the target are left alone, as are any chunks
+        appended while the partition is being compacted.
+        NOTE: should not be run while the partition is being imported.
+        Returns a tuple of the number of chunks before and after compaction
+        """
+        if target_chunk_size is None:
+            target_chunk_size = self.COMPACT_CHUNK_SIZE
+        with self.manifest_lock:
+            manifest = self.get_partition_manifest(partition_id)
+            if manifest is None:
+                manifest = self._build_manifest_from_listing(partition_id)
+            num_chunks_before = manifest.get_num_chunks()
+
+            # group consecutive small chunks until they reach the target size
+            groups = []
+            group = []
+            group_size = 0
+            for chunk in manifest.chunks:
+                if chunk["size"] >= target_chunk_size:
+                    if len(group) > 0:
+                        groups.append(group)
+                        group = []
+                        group_size = 0
+                    groups.append([chunk])
+                    continue
+                group.append(chunk)
+                group_size += chunk["size"]
+                if group_size >= target_chunk_size:
+                    groups.append(group)
+                    group = []
+                    group_size = 0
+            if len(group) > 0:
+                groups.append(group)
+
+            compacted = PartitionManifest(
+                partition_id.workspace_id, partition_id.source_id, partition_id.date_id
+            )
+            replaced = []
+            for group in groups:
+                if len(group) == 1:
+                    # nothing to merge it with
+                    compacted.chunks.append(group[0])
+                    continue
+                chunk_buffer = self.new_chunk_buffer()
+                for chunk in group:
+                    for item in self.fetch_chunk_items(chunk["object_name"]):
+                        chunk_buffer.add(item)
+                expected_ids = list(chunk_buffer.content_ids)
+                assert chunk_buffer.get_num_items() == sum(
+                    chunk["num_items"] for chunk in group
+                ), f"Item counts in manifest do not match chunks when compacting {partition_id}"
+                object_name, size = self._put_chunk_buffer(partition_id, chunk_buffer)
+                # confirm that the merged chunk can be read back with all the items
+                merged_ids = [
+                    item.content_id for item in self.fetch_chunk_items(object_name)
+                ]
+                if merged_ids != expected_ids:
+                    self.s3_bucket.Object(object_name).delete()
+                    assert (
+                        False
+                    ), f"Merged chunk {object_name} does not match the chunks it replaces in {partition_id}"
+                compacted.add_chunk(object_name, len(expected_ids), size, expected_ids)
+                replaced.extend(chunk["object_name"] for chunk in group)
+
+            if len(replaced) > 0:
+                # swap to the compacted chunks, then remove the old ones
+                compacted = self._update_manifest(
+                    partition_id,
+                    lambda current: self._swap_compacted_chunks(
+                        partition_id, manifest, compacted, current
+                    ),
+                )
+                for object_name in replaced:
+                    self.s3_bucket.Object(object_name).delete()
+        logging.info(
+            f"Compacted partition {partition_id} from {num_chunks_before} to {compacted.get_num_chunks()} chunks"
+        )
+        return num_chunks_before, compacted.get_num_chunks()
+
+    def _swap_compacted_chunks(
+        self, partition_id: Store.Partition, original, compacted, current
+    ):
+        """
+        Internal function to make the manifest to store after compacting the
+        `original` manifest into `compacted`, keeping any chunks that have been
+        appended to the `current` manifest since the original was read
+        """
+        if current is None:
+            # the original was listed from a partition without a manifest
+            current = original
+        original_names = set(original.get_object_names())
+        current_names = set(current.get_object_names())
+        assert original_names.issubset(
+            current_names
+        ), f"Chunks were removed from {partition_id} while compacting it"
+        manifest = PartitionManifest(
+            partition_id.workspace_id, partition_id.source_id, partition_id.date_id
+        )
+        manifest.chunks = list(compacted.chunks) + [
+            chunk
+            for chunk in current.chunks
+            if chunk["object_name"] not in original_names
+        ]
+        return manifest
 
     def delete_partition(self, partition_id: Store.Partition):
         """
         Permenently delete all the content stored in a partition.
         Should only be used by test scripts
         """
-        bucket_prefix = self.get_partition_path(partition_id)
-        for obj in self.s3_bucket.objects.filter(Prefix=bucket_prefix):
-            obj.delete()
+        with self.manifest_lock:
+            # also list, in case there are chunks missing from the manifest
+            object_names = set(
+                chunk.object_name for chunk in self._list_chunk_objects(partition_id)
+            )
+            manifest = self.get_partition_manifest(partition_id)
+            if manifest is not None:
+                object_names.update(manifest.get_object_names())
+            for object_name in object_names:
+                self.s3_bucket.Object(object_name).delete()
+            self.s3_bucket.Object(self.get_manifest_name(partition_id)).delete()
+
+    def get_run_state_name(self, partition_id: Store.Partition, run_id: str):
+        return (
+            self.get_partition_path(partition_id, self.STATES_PATH)
+            + "_"
+            + run_id
+            + "_state.jsonl"
+        )
 
     def record_partition_run_state(
         self, run_state: RunState, partition_id: Store.Partition
     ):
         """
         Record a state status into the raw store that can be used to start or resume jobs
-        Path structure must be identical to partition path structure
+        Path structure must be identical to partition path structure.
+        Each run has a single state object, which is replaced each time it is recorded
         """
-        chunk_id = uuid.uuid4().hex
-        partition_path = self.get_partition_path(partition_id, self.STATES_PATH)
-        object_name = partition_path + "_" + chunk_id + "_state.jsonl"
+        object_name = self.get_run_state_name(partition_id, run_state.run_id)
         payload_str = run_state.to_json()
         self.s3_bucket.put_object(
             Key=object_name,
@@ -173,3 +638,16 @@ class CloudStore(Store):
             ContentType="application/json",
         )
         logging.debug("Wrote state to CloudStore object {}".format(object_name))
+
+    def fetch_partition_run_state_json(
+        self, partition_id: Store.Partition, run_id: str
+    ):
+        object_name = self.get_run_state_name(partition_id, run_id)
+        try:
+            return (
+                self.s3_bucket.Object(object_name).get()["Body"].read().decode("utf-8")
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise e
@@ -0,0 +1,103 @@
+import sys
+import argparse
+from timpani.app_cfg import TimpaniAppCfg
+from timpani.raw_store.store import Store
+from timpani.raw_store.store_factory import StoreFactory
+from timpani.workspace_config.workspace_cfg_manager import WorkspaceConfigManager
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class RawStoreCompactor(object):
+    """
+    Merges the many small chunks that acquisition writes into a raw store
+    partition (i.e. one per page of API results) into a few large chunks,
+    so that reading the partition needs far fewer requests.
+    execute with :
+    ```
+    python3 -m timpani.raw_store.compact --workspace_id=meedan --date_id=20240228
+    ```
+    """
+
+    def __init__(self, raw_store: Store = None):
+        self.app_cfg = TimpaniAppCfg()
+        if raw_store is None:
+            raw_store = StoreFactory.get_store(self.app_cfg)
+        self.raw_store = raw_store
+
+    def compact_workspace_partitions(
+        self, workspace_id, date_id, source_ids=None, target_chunk_size=None
+    ):
+        """
+        Compact the partitions for each of the source_ids (default all of the
+        workspace's content sources) on date_id. Returns a dict of partition
+        to the (before, after) chunk counts.
+        Raises NotImplementedError if the raw store doesn't support compaction
+        """
+        if source_ids is None:
+            cfg = WorkspaceConfigManager().get_config_for_workspace(workspace_id)
+            source_ids = cfg.get_content_source_types()
+        results = {}
+        for source_id in source_ids:
+            partition = Store.Partition(workspace_id, source_id, date_id)
+            results[partition] = self.raw_store.compact_partition(
+                partition, target_chunk_size=target_chunk_size
+            )
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="TimpaniRawStoreCompaction",
+        description="Merges the small chunks in raw store partitions into larger chunks."
+        + " Should not be run while the partitions are being acquired or imported",
+        epilog="https://github.com/meedan/timpani#readme",
+    )
+    parser.add_argument(
+        "-w",
+        "--workspace_id",
+        help="workspace_id slug component of the partitions to compact",
+        required=True,
+    )
+    parser.add_argument(
+        "-d",
+        "--date_id",
+        help="UTC date id <YYYMMDD> of the partitions to compact",
+        required=True,
+    )
+    parser.add_argument(
+        "-s",
+        "--source_id",
+        help="content source id of the partition to compact (default all of the workspace's sources)",
+        required=False,
+    )
+    parser.add_argument(
+        "-b",
+        "--target_bytes",
+        help="approximate size in bytes (as stored) of the compacted chunks",
+        required=False,
+        type=int,
+    )
+    args = parser.parse_args()
+    logging.info("Starting raw store compaction with args:{}".format(args))
+
+    compactor = RawStoreCompactor()
+    if not compactor.raw_store.supports_compaction():
+        logging.error(
+            f"Compaction not supported by the {compactor.app_cfg.s3_store_location}"
+            + " raw store, only stores with partition manifests can be compacted"
+        )
+        sys.exit(1)
+    source_ids = None
+    if args.source_id is not None:
+        source_ids = [args.source_id]
+    results = compactor.compact_workspace_partitions(
+        workspace_id=args.workspace_id,
+        date_id=args.date_id,
+        source_ids=source_ids,
+        target_chunk_size=args.target_bytes,
+    )
+    for partition, (num_before, num_after) in results.items():
+        logging.info(f"{partition}: compacted {num_before} chunks into {num_after}")
@@ -1,8 +1,13 @@
+import os
+import mmap
+import uuid
 import tempfile
+from gzip import GzipFile
 from pathlib import Path
-from typing import List
-from timpani.raw_store.item import Item
+from timpani.app_cfg import TimpaniAppCfg
 from timpani.raw_store.store import Store
+from timpani.raw_store.chunk_writer import JsonlChunkBuffer
+from timpani.util.run_state import RunState
 
 import timpani.util.timpani_logger
 
@@ -12,36 +17,195 @@ logging = timpani.util.timpani_logger.get_logger()
 class DebuggingFileStore(Store):
     """
     Implements Raw Store operations in the local filesystem
-    to facilitate tests and debugging. Not intended for production use
+    to facilitate tests, debugging and benchmarking without any services.
+    Not intended for production use.
+
+    Files are laid out with the same object names as the CloudStore uses
+    for keys in the S3 bucket (under a directory named like the bucket),
+    and chunks are gz compressed jsonl unless the store is created with
+    `compress=False`. Chunks are read with memory mapped files, and
+    uncompressed chunks are split into lines directly from the mapped memory.
     """
 
-    def __init__(self):
-        self.base_path = tempfile.gettempdir()
+    cfg = TimpaniAppCfg()
+
+    ITEMS_PATH = "content_items"
+    STATES_PATH = "content_states"
+    JSONL_SUFFIX = ".jsonl"
+    GZIP_SUFFIX = ".gz"
+
+    def __init__(self, base_path=None, compress=True):
+        if base_path is None:
+            base_path = os.path.join(
+                tempfile.gettempdir(), f"timpani-raw-store-{self.cfg.deploy_env_label}"
+            )
+        self.base_path = base_path
+        self.compress = compress
         logging.info(f"DebuggingFileStore will save data to {self.base_path}")
 
-    def get_partition_path(self, partition_id: Store.Partition):
+    def get_config(self):
+        return {
+            "store_type": "DebuggingFileStore",
+            "base_path": self.base_path,
+            "compress": self.compress,
+        }
+
+    def get_partition_path(self, partition_id: Store.Partition, base_path=ITEMS_PATH):
+        """
+        Constructs the path string (relative to the base path) with the
+        same structure as the CloudStore keys
+        """
         partition = (
-            self.base_path
+            base_path
+            + "/date_id="
+            + partition_id.date_id
             + "/"
             + partition_id.workspace_id
-            + "/"
+            + "_"
             + partition_id.source_id
-            + "/"
-            + partition_id.date_id
         )
         return partition
 
-    def append_chunk(self, partition_id: Store.Partition, payload: List[Item]):
-        super(DebuggingFileStore, self).validate(payload)
+    def get_file_path(self, object_name: str):
+        """
+        Returns the path of the file for the object_name
+        """
+        return os.path.join(self.base_path, object_name)
+
+    def _write_file(self, object_name: str, body: bytes):
+        """
+        Internal function to write the object. Writes to a temporary file and
+        then renames it so readers never see a partially written object
+        """
+        file_path = self.get_file_path(object_name)
+        Path(os.path.dirname(file_path)).mkdir(parents=True, exist_ok=True)
+        temp_path = file_path + "_" + uuid.uuid4().hex + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(body)
+        os.replace(temp_path, file_path)
+        return file_path
 
-        path = self.get_partition_path(partition_id)
-        Path(path).mkdir(parents=True, exist_ok=True)
-        file_path = path + "/rawstore.jsonl"
+    def new_chunk_buffer(self):
+        return JsonlChunkBuffer(compress=self.compress)
 
-        # open the file in append mode and close when done
-        with open(file_path, "a", encoding="utf-8") as f:
-            for item in payload:
-                f.write(item.toJSON() + "\n")
+    def append_chunk_buffer(
+        self, partition_id: Store.Partition, chunk_buffer, defer_manifest=False
+    ):
+        chunk_id = uuid.uuid4().hex
+        object_name = (
+            self.get_partition_path(partition_id) + "_" + chunk_id + self.JSONL_SUFFIX
+        )
+        if self.compress:
+            object_name += self.GZIP_SUFFIX
+        file_path = self._write_file(object_name, chunk_buffer.getvalue())
         logging.debug("Wrote DebuggingFileStore data to {}".format(file_path))
-        # return the path so tests can do things with it
-        return file_path
+        return object_name
+
+    def list_chunks_in_partition(self, partition_id: Store.Partition):
+        """
+        Yields the chunks in the order they were written
+        """
+        partition_path = self.get_partition_path(partition_id)
+        dir_path = self.get_file_path(os.path.dirname(partition_path))
+        if not os.path.isdir(dir_path):
+            return
+        prefix = os.path.basename(partition_path) + "_"
+        chunks = []
+        for entry in os.scandir(dir_path):
+            if entry.name.startswith(prefix) and (
+                entry.name.endswith(self.JSONL_SUFFIX)
+                or entry.name.endswith(self.JSONL_SUFFIX + self.GZIP_SUFFIX)
+            ):
+                stat = entry.stat()
+                object_name = os.path.dirname(partition_path) + "/" + entry.name
+                chunks.append((stat.st_mtime_ns, object_name, stat.st_size))
+        for _, object_name, size in sorted(chunks):
+            yield Store.ChunkInfo(object_name, size)
+
+    def get_chunk_version(self, object_name: str):
+        stat = os.stat(self.get_file_path(object_name))
+        return f"{stat.st_mtime_ns}_{stat.st_size}"
+
+    def fetch_chunk_bytes(self, object_name: str):
+        with open(self.get_file_path(object_name), "rb") as f:
+            return f.read()
+
+    def fetch_chunk(self, object_name: str):
+        return "".join(line + "\n" for line in self.fetch_chunk_lines(object_name))
+
+    def fetch_chunks_in_partition(self, partition_id: Store.Partition):
+        for chunk in self.list_chunks_in_partition(partition_id):
+            yield self.fetch_chunk(chunk.object_name)
+
+    def fetch_chunk_lines(self, object_name: str):
+        """
+        Yields the lines of the chunk from a memory mapped file, so the
+        chunk is paged in by the OS instead of being copied into memory
+        """
+        with open(self.get_file_path(object_name), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files can't be mapped
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if object_name.endswith(self.GZIP_SUFFIX):
+                    yield from self.read_chunk_lines(
+                        GzipFile(fileobj=mapped, mode="rb")
+                    )
+                else:
+                    yield from self.iter_mmap_lines(mapped)
+
+    def iter_mmap_lines(self, mapped: mmap.mmap):
+        """
+        Yields the decoded lines of an uncompressed memory mapped chunk,
+        only copying each line out of the mapped memory as it is decoded
+        """
+        start = 0
+        end = mapped.find(b"\n", start)
+        while end >= 0:
+            yield mapped[start:end].decode("utf-8")
+            start = end + 1
+            end = mapped.find(b"\n", start)
+        if start < len(mapped):
+            yield mapped[start:].decode("utf-8")
+
+    def read_chunk_items(self, object_name: str, fileobj):
+        if object_name.endswith(self.GZIP_SUFFIX):
+            fileobj = GzipFile(fileobj=fileobj, mode="rb")
+        return super(DebuggingFileStore, self).read_chunk_items(object_name, fileobj)
+
+    def delete_partition(self, partition_id: Store.Partition):
+        """
+        Permenently delete all the content stored in a partition.
+        Should only be used by test scripts
+        """
+        for chunk in list(self.list_chunks_in_partition(partition_id)):
+            os.remove(self.get_file_path(chunk.object_name))
+
+    def get_run_state_name(self, partition_id: Store.Partition, run_id: str):
+        return (
+            self.get_partition_path(partition_id, self.STATES_PATH)
+            + "_"
+            + run_id
+            + "_state.jsonl"
+        )
+
+    def record_partition_run_state(
+        self, run_state: RunState, partition_id: Store.Partition
+    ):
+        """
+        Record a state status into the raw store that can be used to start or resume jobs
+        Path structure must be identical to partition path structure.
+        Each run has a single state file, which is replaced each time it is recorded
+        """
+        object_name = self.get_run_state_name(partition_id, run_state.run_id)
+        file_path = self._write_file(object_name, run_state.to_json().encode("utf-8"))
+        logging.debug("Wrote state to DebuggingFileStore {}".format(file_path))
+
+    def fetch_partition_run_state_json(
+        self, partition_id: Store.Partition, run_id: str
+    ):
+        file_path = self.get_file_path(self.get_run_state_name(partition_id, run_id))
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return f.read().decode("utf-8")
@@ -1,29 +1,35 @@
 import datetime
 import json
 import uuid
+from timpani.util.serializer import get_serializer
+from timpani.util.serializer import parse_datetime
+from timpani.util.serializer import format_datetime
+
+# json codec for reading and writing items, see TIMPANI_JSON_SERIALIZER
+serializer = get_serializer()
 
 
 class Item(object):
     """
     An individual record that will be written into the Raw Store
     with associated metadata. This effectively defines a
-    schema of availible fields
+    schema of availible fields.
+    Uses __slots__ because millions of items are parsed during import
     """
 
     DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
 
     # These fields should only be modified at object instantiation
-    run_id = None
-    workspace_id = None
-    source_id = None
-    query_id = None
-    page_id = None
-    created_at = None  # should be a date
-    content_id = (
-        uuid.uuid4().hex
-    )  # unique id for the content, hopefully from source, but UUID is default
-    content = None  # this will be a dict we can convert to json?
-    # TODO: run_id
+    __slots__ = (
+        "run_id",
+        "workspace_id",
+        "source_id",
+        "query_id",
+        "page_id",
+        "created_at",  # should be a date
+        "content_id",  # unique id, hopefully from source, but UUID is default
+        "content",  # this will be a dict we can convert to json?
+    )
 
     def __init__(
         self,
@@ -45,9 +51,10 @@ class Item(object):
         self.query_id = query_id
         self.page_id = page_id
         self.created_at = datetime.datetime.utcnow()
-        if content_id is not None:
+        if content_id is None:
             # use uuid if missing
-            self.content_id = content_id
+            content_id = uuid.uuid4().hex
+        self.content_id = content_id
         self.content = content
 
     def toJSON(self):
@@ -59,11 +66,11 @@ class Item(object):
             "source_id": self.source_id,
             "query_id": self.query_id,
             "page_id": self.page_id,
-            "created_at": self.created_at.strftime(self.DATE_FORMAT),
+            "created_at": format_datetime(self.created_at, self.DATE_FORMAT),
             "content_id": self.content_id,
             "content": self.content,
         }
-        return json.dumps(obj)
+        return serializer.dumps(obj)
 
     @classmethod
     def fromJSON(cls, json_string: str):
@@ -71,7 +78,7 @@ class Item(object):
         Constructor to return object from json
         """
         try:
-            obj = json.loads(json_string)
+            obj = serializer.loads(json_string)
             item = cls(
                 run_id=obj["run_id"],
                 workspace_id=obj["workspace_id"],
@@ -84,5 +91,5 @@ class Item(object):
         except json.decoder.JSONDecodeError as e:
             print(f"Error '{e}' while reloading raw item from {json_string}")
             raise e
-        item.created_at = datetime.datetime.strptime(obj["created_at"], cls.DATE_FORMAT)
+        item.created_at = parse_datetime(obj["created_at"], cls.DATE_FORMAT)
         return item
@@ -1,9 +1,8 @@
 import io
 import uuid
 from minio import Minio
-from typing import List
+from minio.error import S3Error
 from timpani.app_cfg import TimpaniAppCfg
-from timpani.raw_store.item import Item
 from timpani.raw_store.store import Store
 from timpani.util.run_state import RunState
 
@@ -34,6 +33,15 @@ class MinioStore(Store):
     STATES_PATH = "content_states"  # where states will be stored
 
     minio_client = None
+    access_key = None
+    secret_key = None
+
+    def get_config(self):
+        return {
+            "store_type": "MinioStore",
+            "access_key": self.access_key,
+            "secret_key": self.secret_key,
+        }
 
     def login_and_validate(self, access_key: str, secret_key: str):
         """
@@ -53,6 +61,8 @@ class MinioStore(Store):
             secret_key=secret_key,
             secure=False,
         )
+        self.access_key = access_key
+        self.secret_key = secret_key
 
         logging.info(f"MinioStore connected to {minio_server}")
         found = self.minio_client.bucket_exists(self.MINIO_BUCKET_NAME)
@@ -74,8 +84,9 @@ class MinioStore(Store):
         )
         return partition
 
-    def append_chunk(self, partition_id: Store.Partition, payload: List[Item]):
-        super(MinioStore, self).validate(payload)
+    def append_chunk_buffer(
+        self, partition_id: Store.Partition, chunk_buffer, defer_manifest=False
+    ):
         """
         We are writing out a json compatible format instead of pickling
         because we'd like other things to be able to use the data in the
@@ -84,16 +95,9 @@ class MinioStore(Store):
         chunk_id = uuid.uuid4().hex
         partition_path = self.get_partition_path(partition_id)
         object_name = partition_path + "/" + chunk_id + ".jsonl"
-        payload_str = ""
-        num_items = 0
-        for item in payload:
-            # convert each item to json objects but
-            # chunk is json lines https://jsonlines.org/
-            payload_str += item.toJSON() + "\n"
-            num_items += 1
-        # need to encode to bytes
-        bytes_object = payload_str.encode()
+        bytes_object = chunk_buffer.getvalue()
         # TODO: compression?
+        # minio client switches to multipart upload for large objects
         self.minio_client.put_object(
             bucket_name=self.MINIO_BUCKET_NAME,
             object_name=object_name,
@@ -102,7 +106,7 @@ class MinioStore(Store):
         )
         logging.debug("Wrote MinioStore data to partition{}".format(partition_path))
         self.records_stored_metric.add(
-            num_items,
+            chunk_buffer.get_num_items(),
             attributes={
                 "workspace_id": partition_id.workspace_id,
                 "source_id": partition_id.source_id,
@@ -111,22 +115,58 @@ class MinioStore(Store):
         return object_name
 
     def fetch_chunk(self, object_name: str):
+        raw_obj = self.fetch_chunk_bytes(object_name).decode()
+        return raw_obj
+
+    def fetch_chunk_bytes(self, object_name: str):
         response = self.minio_client.get_object(
             bucket_name=self.MINIO_BUCKET_NAME, object_name=object_name
         )
-        raw_obj = response.data.decode()
-        return raw_obj
+        try:
+            return response.data
+        finally:
+            response.close()
+            response.release_conn()
+
+    def get_chunk_version(self, object_name: str):
+        return self.minio_client.stat_object(
+            bucket_name=self.MINIO_BUCKET_NAME, object_name=object_name
+        ).etag
+
+    def fetch_chunk_lines(self, object_name: str):
+        """
+        Stream the object from minio, decoding the lines as they are read
+        """
+        response = self.minio_client.get_object(
+            bucket_name=self.MINIO_BUCKET_NAME, object_name=object_name
+        )
+        try:
+            yield from self.read_chunk_lines(io.BufferedReader(response))
+        finally:
+            response.close()
+            response.release_conn()
+
+    def list_chunks_in_partition(self, partition_id: Store.Partition):
+        partition_path = self.get_partition_path(partition_id)
+        for obj in self.minio_client.list_objects(
+            self.MINIO_BUCKET_NAME, prefix=partition_path + "/", recursive=True
+        ):
+            yield Store.ChunkInfo(obj.object_name, obj.size)
+
+    def fetch_chunks_in_partition(self, partition_id: Store.Partition):
+        for chunk in self.list_chunks_in_partition(partition_id):
+            yield self.fetch_chunk(chunk.object_name)
 
     def record_partition_run_state(
         self, run_state: RunState, partition_id: Store.Partition
     ):
         """
         Record a state status into the raw store that can be used to start or resume jobs
-        Path structure must be idental to partition path structure
+        Path structure must be idental to partition path structure.
+        Each run has a single state object, which is replaced each time it is recorded
         """
-        chunk_id = uuid.uuid4().hex
         partition_path = self.get_partition_path(partition_id, self.STATES_PATH)
-        object_name = partition_path + "/" + chunk_id + ".jsonl"
+        object_name = partition_path + "/" + run_state.run_id + ".jsonl"
         payload_str = run_state.to_json() + "\n"
         # need to encode to bytes
         bytes_object = payload_str.encode()
@@ -137,3 +177,14 @@ class MinioStore(Store):
             data=io.BytesIO(bytes_object),
         )
         logging.debug("Wrote MinioStore state to partition{}".format(partition_path))
+
+    def fetch_partition_run_state_json(
+        self, partition_id: Store.Partition, run_id: str
+    ):
+        partition_path = self.get_partition_path(partition_id, self.STATES_PATH)
+        try:
+            return self.fetch_chunk(partition_path + "/" + run_id + ".jsonl")
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return None
+            raise e
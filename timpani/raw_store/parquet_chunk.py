@@ -0,0 +1,111 @@
+"""
+Conversion between lists of raw store Items and Parquet chunks.
+Kept in a seperate module so that pyarrow is only required (and imported)
+by stores that are configured to write or read Parquet.
+
+Each row is an Item. The workspace_id and source_id (partition) columns are
+dictionary encoded, so they cost almost nothing to store and Athena can skip
+row groups using their statistics. The content is stored as a json string,
+matching the jsonl chunks and the Athena table definition. The date_id
+is not stored in the file because it is the (hive) partition in the path.
+"""
+
+import io
+from typing import List
+
+import pyarrow
+import pyarrow.parquet
+
+from timpani.raw_store.item import Item
+from timpani.raw_store.item import serializer
+
+PARQUET_SCHEMA = pyarrow.schema(
+    [
+        ("run_id", pyarrow.string()),
+        ("workspace_id", pyarrow.string()),
+        ("source_id", pyarrow.string()),
+        ("query_id", pyarrow.string()),
+        ("page_id", pyarrow.string()),
+        ("created_at", pyarrow.timestamp("us")),
+        ("content_id", pyarrow.string()),
+        ("content", pyarrow.string()),
+    ]
+)
+
+
+class ParquetChunkBuffer(object):
+    """
+    In-memory buffer for the items in a Parquet chunk. Items are converted into
+    columns as they are added, and encoded as a Parquet file (with row groups of
+    at most `row_group_size` rows) when the chunk is finished
+    """
+
+    def __init__(self, row_group_size=10000):
+        self.row_group_size = row_group_size
+        self.columns = {name: [] for name in PARQUET_SCHEMA.names}
+        self.content_ids = self.columns["content_id"]
+        self.num_bytes = 0  # approximate size of the (uncompressed) content
+
+    def add(self, item: Item):
+        content = serializer.dumps(item.content)
+        self.columns["run_id"].append(item.run_id)
+        self.columns["workspace_id"].append(item.workspace_id)
+        self.columns["source_id"].append(item.source_id)
+        self.columns["query_id"].append(item.query_id)
+        self.columns["page_id"].append(
+            None if item.page_id is None else str(item.page_id)
+        )
+        self.columns["created_at"].append(item.created_at)
+        self.columns["content_id"].append(item.content_id)
+        self.columns["content"].append(content)
+        self.num_bytes += len(content)
+
+    def get_num_items(self):
+        return len(self.content_ids)
+
+    def getvalue(self):
+        """
+        Return the bytes of a Parquet file containing the items
+        """
+        table = pyarrow.Table.from_pydict(self.columns, schema=PARQUET_SCHEMA)
+        buffer = io.BytesIO()
+        pyarrow.parquet.write_table(
+            table,
+            buffer,
+            row_group_size=self.row_group_size,
+            use_dictionary=["workspace_id", "source_id", "run_id", "query_id"],
+            compression="snappy",
+        )
+        return buffer.getvalue()
+
+
+def items_to_parquet(payload: List[Item], row_group_size=10000):
+    """
+    Return the bytes of a Parquet file containing the items, with
+    row groups of at most `row_group_size` rows
+    """
+    chunk_buffer = ParquetChunkBuffer(row_group_size)
+    for item in payload:
+        chunk_buffer.add(item)
+    return chunk_buffer.getvalue()
+
+
+def parquet_to_items(fileobj, batch_size=10000):
+    """
+    Yields the Items stored in a Parquet file (a seekable binary
+    file-like object), reading `batch_size` rows at a time
+    """
+    parquet_file = pyarrow.parquet.ParquetFile(fileobj)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            item = Item(
+                run_id=row["run_id"],
+                workspace_id=row["workspace_id"],
+                source_id=row["source_id"],
+                query_id=row["query_id"],
+                page_id=row["page_id"],
+                content_id=row["content_id"],
+                content=serializer.loads(row["content"]),
+            )
+            item.created_at = row["created_at"]
+            yield item
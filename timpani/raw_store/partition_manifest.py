@@ -0,0 +1,83 @@
+import datetime
+import json
+from typing import List
+
+
+class PartitionManifest(object):
+    """
+    Index of the chunks stored in a raw store partition, so that readers can
+    find the chunks without listing the object store (which is slow and paginated
+    when a partition has thousands of small chunks) and can report progress.
+    Each chunk entry records the object name, the number of items, the stored
+    size in bytes, and the (string) range of content ids in the chunk.
+    The manifest is written as a single json object, so readers always see a
+    complete version, and is rewritten by the store when chunks are appended
+    (writers batch their chunks into one rewrite, see ChunkWriter).
+    """
+
+    DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+    def __init__(self, workspace_id: str, source_id: str, date_id: str):
+        self.workspace_id = workspace_id
+        self.source_id = source_id
+        self.date_id = date_id
+        self.updated_at = datetime.datetime.utcnow()
+        self.chunks = []
+
+    def add_chunk(
+        self, object_name: str, num_items: int, size: int, content_ids: List[str]
+    ):
+        """
+        Record a chunk that has been appended to the partition
+        """
+        content_ids = [str(content_id) for content_id in content_ids]
+        self.chunks.append(
+            {
+                "object_name": object_name,
+                "num_items": num_items,
+                "size": size,
+                "min_content_id": min(content_ids) if len(content_ids) > 0 else None,
+                "max_content_id": max(content_ids) if len(content_ids) > 0 else None,
+            }
+        )
+        self.updated_at = datetime.datetime.utcnow()
+
+    def get_object_names(self):
+        return [chunk["object_name"] for chunk in self.chunks]
+
+    def get_num_chunks(self):
+        return len(self.chunks)
+
+    def get_num_items(self):
+        return sum(chunk["num_items"] for chunk in self.chunks)
+
+    def get_size(self):
+        return sum(chunk["size"] for chunk in self.chunks)
+
+    def to_json(self):
+        obj = {
+            "workspace_id": self.workspace_id,
+            "source_id": self.source_id,
+            "date_id": self.date_id,
+            "updated_at": self.updated_at.strftime(self.DATE_FORMAT),
+            "num_items": self.get_num_items(),
+            "chunks": self.chunks,
+        }
+        return json.dumps(obj)
+
+    @classmethod
+    def from_json(cls, json_string: str):
+        """
+        Constructor to return manifest from json
+        """
+        obj = json.loads(json_string)
+        manifest = cls(
+            workspace_id=obj["workspace_id"],
+            source_id=obj["source_id"],
+            date_id=obj["date_id"],
+        )
+        manifest.updated_at = datetime.datetime.strptime(
+            obj["updated_at"], cls.DATE_FORMAT
+        )
+        manifest.chunks = obj["chunks"]
+        return manifest
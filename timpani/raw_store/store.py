@@ -1,6 +1,13 @@
+import io
 from timpani.raw_store.item import Item
+from timpani.raw_store.chunk_writer import ChunkWriter
+from timpani.raw_store.chunk_writer import JsonlChunkBuffer
 from typing import List
+from collections import deque
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from concurrent.futures import FIRST_COMPLETED
 from timpani.util.run_state import RunState
 
 
@@ -14,6 +21,8 @@ class Store(object):
 
     # data structure for storing the partition ids
     Partition = namedtuple("Partition", "workspace_id source_id date_id")
+    # object name and stored size (in bytes, may be None if unknown) of a chunk
+    ChunkInfo = namedtuple("ChunkInfo", "object_name size")
 
     def validate(self, payload: List[Item]):
         """
@@ -27,10 +36,56 @@ class Store(object):
     def append_chunk(self, partition_id: Partition, payload: List[Item]):
         """
         Append the data into the store in the indicated partition.
-        Payload is an array of dicts
+        Payload is an array of Items, written as a single chunk.
+        Sources writing many pages of items should use chunk_writer()
+        """
+        self.validate(payload)
+        chunk_buffer = self.new_chunk_buffer()
+        for item in payload:
+            chunk_buffer.add(item)
+        return self.append_chunk_buffer(partition_id, chunk_buffer)
+
+    def new_chunk_buffer(self):
+        """
+        Returns an empty buffer for encoding the items of a chunk in the
+        format the store writes (by default, uncompressed json lines)
+        """
+        return JsonlChunkBuffer()
+
+    def append_chunk_buffer(
+        self, partition_id: Partition, chunk_buffer, defer_manifest=False
+    ):
+        """
+        Append the items encoded in the chunk_buffer (from new_chunk_buffer())
+        into the partition as a chunk. Returns the object name of the chunk.
+        If defer_manifest is True, stores that keep partition manifests don't
+        add the chunk to the manifest until commit_manifest() is called, so that
+        a writer appending many chunks updates the manifest once for all of them
         """
         raise NotImplementedError
 
+    def commit_manifest(self, partition_id: Partition):
+        """
+        Add the chunks appended to the partition with defer_manifest to its
+        manifest. Does nothing for stores that don't keep partition manifests
+        """
+        pass
+
+    def get_num_uncommitted_chunks(self, partition_id: Partition) -> int:
+        """
+        Number of chunks appended to the partition with defer_manifest that
+        have not yet been committed to its manifest
+        """
+        return 0
+
+    def chunk_writer(self, partition_id: Partition, max_items=None, max_bytes=None):
+        """
+        Returns a ChunkWriter that buffers the items written to the partition
+        and appends them in chunks of up to max_items items or max_bytes bytes
+        (defaults from config). Use as a context manager so the last chunk is written
+        """
+        return ChunkWriter(self, partition_id, max_items=max_items, max_bytes=max_bytes)
+
     def fetch_chunk(self, object_name: str):
         """
         Return data correspoinding to object_name (includes partition path)
@@ -51,6 +106,178 @@ class Store(object):
         """
         raise NotImplementedError
 
+    def list_chunks_in_partition(self, partition_id: Partition):
+        """
+        Yields a ChunkInfo for each of the chunks stored in the partition
+        """
+        raise NotImplementedError
+
+    def get_chunk_version(self, object_name: str):
+        """
+        Returns a string that changes whenever the chunk object_name is rewritten
+        (i.e. an ETag), for caching. None if chunks are never modified once written
+        """
+        return None
+
+    def fetch_chunk_bytes(self, object_name: str):
+        """
+        Return the bytes of the chunk object_name as they are stored
+        (i.e. without decompressing)
+        """
+        raise NotImplementedError
+
+    def read_chunk_lines(self, fileobj):
+        """
+        Yields the (json) lines from a binary file-like object containing
+        a stored chunk, decoding incrementally as it is read.
+        Subclasses that compress chunks should wrap fileobj to decompress
+        """
+        with io.TextIOWrapper(fileobj, encoding="utf-8", newline="\n") as lines:
+            for line in lines:
+                yield line.rstrip("\n")
+
+    def fetch_chunk_lines(self, object_name: str):
+        """
+        Yields the (json) lines of the chunk object_name one at a time.
+        Subclasses should override this to decode the lines incrementally
+        as the object is read, so that the whole chunk is never in memory.
+        """
+        for line in self.fetch_chunk(object_name).splitlines():
+            yield line
+
+    def parse_chunk_items(self, lines):
+        """
+        Yields the parsed Items from an iterator of chunk lines
+        """
+        for line in lines:
+            if len(line) > 0:
+                yield Item.fromJSON(line)
+
+    def read_chunk_items(self, object_name: str, fileobj):
+        """
+        Yields the parsed Items from a binary file-like object containing the
+        stored chunk object_name (the name may determine the chunk format)
+        """
+        return self.parse_chunk_items(self.read_chunk_lines(fileobj))
+
+    def fetch_chunk_items(self, object_name: str):
+        """
+        Yields the parsed Items of the chunk object_name one at a time
+        """
+        return self.parse_chunk_items(self.fetch_chunk_lines(object_name))
+
+    def fetch_item_chunks_in_partition(
+        self,
+        partition_id: Partition,
+        prefetch_chunks=0,
+        prefetch_bytes=None,
+        preserve_order=True,
+    ):
+        """
+        Yields a series of Item iterators, each corresponding to a chunk
+        stored in the partition. Items are parsed as the chunk is streamed
+        from the store, so chunks should be consumed one at a time.
+        If prefetch_chunks > 0, see prefetch_item_chunks_in_partition()
+        """
+        if prefetch_chunks > 0:
+            yield from self.prefetch_item_chunks_in_partition(
+                partition_id,
+                max_in_flight=prefetch_chunks,
+                max_in_flight_bytes=prefetch_bytes,
+                preserve_order=preserve_order,
+            )
+            return
+        for chunk in self.list_chunks_in_partition(partition_id):
+            yield self.fetch_chunk_items(chunk.object_name)
+
+    def prefetch_item_chunks_in_partition(
+        self,
+        partition_id: Partition,
+        max_in_flight=4,
+        max_in_flight_bytes=None,
+        preserve_order=True,
+    ):
+        """
+        Yields a series of Item iterators, each corresponding to a chunk stored
+        in the partition, while a pool of threads downloads up to `max_in_flight`
+        of the following chunks so that fetch latency overlaps with the processing
+        of the current chunk. Prefetched chunks are held in memory in their stored
+        (compressed) form, limited to `max_in_flight_bytes` in total if set (a chunk
+        is always fetched if nothing else is in flight, even if it is larger).
+        If `preserve_order` is False, chunks are yielded as soon as they are downloaded
+        """
+        assert max_in_flight > 0, f"max_in_flight must be positive, not {max_in_flight}"
+        chunks = iter(self.list_chunks_in_partition(partition_id))
+        next_chunk = next(chunks, None)
+        in_flight = deque()  # of (future, chunk)
+        in_flight_bytes = 0
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            try:
+                while True:
+                    # top up the downloads within the count and size limits
+                    while next_chunk is not None and len(in_flight) < max_in_flight:
+                        size = next_chunk.size or 0
+                        if (
+                            max_in_flight_bytes is not None
+                            and len(in_flight) > 0
+                            and in_flight_bytes + size > max_in_flight_bytes
+                        ):
+                            break
+                        future = pool.submit(
+                            self.fetch_chunk_bytes, next_chunk.object_name
+                        )
+                        in_flight.append((future, next_chunk))
+                        in_flight_bytes += size
+                        next_chunk = next(chunks, None)
+                    if len(in_flight) == 0:
+                        break
+                    if preserve_order:
+                        future, chunk = in_flight.popleft()
+                    else:
+                        wait([f for f, _ in in_flight], return_when=FIRST_COMPLETED)
+                        future, chunk = next((f, c) for f, c in in_flight if f.done())
+                        in_flight.remove((future, chunk))
+                    raw_bytes = future.result()
+                    in_flight_bytes -= chunk.size or 0
+                    yield self.read_chunk_items(
+                        chunk.object_name, io.BytesIO(raw_bytes)
+                    )
+            finally:
+                # don't start any more downloads if the consumer stops early
+                for future, _ in in_flight:
+                    future.cancel()
+
+    def get_config(self) -> dict:
+        """
+        Returns the (picklable) settings needed to create an equivalent store,
+        i.e. in a worker process, see StoreFactory.get_store_from_config()
+        """
+        raise NotImplementedError
+
+    def supports_compaction(self) -> bool:
+        """
+        Returns True if the store can compact partitions, see compact_partition()
+        """
+        return False
+
+    def compact_partition(self, partition_id: Partition, target_chunk_size=None):
+        """
+        Merge the small chunks stored in the partition into fewer large chunks
+        of roughly `target_chunk_size` stored bytes (default depends on the store).
+        Only supported by stores that keep partition manifests
+        """
+        raise NotImplementedError(
+            f"Compaction is not supported by {type(self).__name__},"
+            + " which does not keep partition manifests"
+        )
+
+    def get_partition_manifest(self, partition_id: Partition):
+        """
+        Returns the PartitionManifest describing the chunks in the partition,
+        or None if the partition has no manifest (or the store doesn't keep them)
+        """
+        return None
+
     def get_state_model(self):
         """
         Returns the State model for describing this process
@@ -62,3 +289,21 @@ class Store(object):
         Record a state status into the raw store that can be used to start or resume jobs
         """
         raise NotImplementedError
+
+    def fetch_partition_run_state_json(self, partition_id: Partition, run_id: str):
+        """
+        Returns the json of the run state recorded for the run_id in the
+        partition, or None if the run has not recorded any state
+        """
+        raise NotImplementedError
+
+    def get_partition_run_state(self, partition_id: Partition, run_id: str):
+        """
+        Returns the RunState last recorded for the run_id in the partition,
+        (i.e. to resume a failed run from its checkpoints) or None if the run
+        has not recorded any state
+        """
+        state_json = self.fetch_partition_run_state_json(partition_id, run_id)
+        if state_json is None:
+            return None
+        return RunState.from_json(state_json)
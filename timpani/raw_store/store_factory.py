@@ -40,4 +40,54 @@ class StoreFactory(object):
                 store.login_and_validate(
                     TimpaniAppCfg.minio_user, TimpaniAppCfg.minio_password
                 )
+        if app_cfg.raw_store_cache_dir is not None:
+            # keep local copies of the chunks read from the store
+            from timpani.raw_store.caching_store import CachingStore
+
+            store = CachingStore(
+                store,
+                cache_dir=app_cfg.raw_store_cache_dir,
+                max_bytes=app_cfg.raw_store_cache_max_bytes,
+            )
+        return store
+
+    def get_store_from_config(config: dict) -> Store:
+        """
+        static function
+        create a store with the settings returned by Store.get_config() of
+        another store (i.e. to use the same store in a worker process)
+        """
+        store_type = config["store_type"]
+        if store_type == "DebuggingFileStore":
+            from timpani.raw_store.debugging_file_store import DebuggingFileStore
+
+            store = DebuggingFileStore(
+                base_path=config["base_path"], compress=config["compress"]
+            )
+        elif store_type == "MinioStore":
+            from timpani.raw_store.minio_store import MinioStore
+
+            store = MinioStore()
+            store.login_and_validate(config["access_key"], config["secret_key"])
+        elif store_type == "CloudStore":
+            from timpani.raw_store.cloud_store import CloudStore
+
+            store = CloudStore(
+                store_location=config["store_location"],
+                bucket_name=config["bucket_name"],
+                chunk_format=config["chunk_format"],
+                row_group_size=config["row_group_size"],
+            )
+            store.login_and_validate(config["access_key"], config["secret_key"])
+        elif store_type == "CachingStore":
+            from timpani.raw_store.caching_store import CachingStore
+
+            store = CachingStore(
+                StoreFactory.get_store_from_config(config["store"]),
+                cache_dir=config["cache_dir"],
+                max_bytes=config["max_bytes"],
+                revalidate=config["revalidate"],
+            )
+        else:
+            assert False, f"Unknown raw store type {store_type}"
         return store
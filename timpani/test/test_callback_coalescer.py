@@ -0,0 +1,67 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from timpani.util.callback_coalescer import CallbackCoalescer
+
+
+class BatchHandler(BaseHTTPRequestHandler):
+    """
+    Records each batch of updates posted to it and reports them all as ok
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    batches = []
+
+    def do_POST(self):
+        batch = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).batches.append(batch)
+        results = [
+            {
+                "content_item_id": update["content_item_id"],
+                "state": update["state"],
+                "ok": True,
+                "error": None,
+            }
+            for update in batch
+        ]
+        body = json.dumps(results).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCallbackCoalescer(unittest.TestCase):
+    def setUp(self):
+        BatchHandler.batches = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), BatchHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_batches_by_size(self):
+        coalescer = CallbackCoalescer(self.url, max_batch_size=2, max_delay=60)
+        for i in range(5):
+            coalescer.add({"content_item_id": i, "state": "ready"})
+        assert [len(batch) for batch in BatchHandler.batches] == [2, 2]
+        coalescer.shutdown()
+
+    def test_shutdown_flushes_pending(self):
+        coalescer = CallbackCoalescer(self.url, max_batch_size=50, max_delay=60)
+        coalescer.add({"content_item_id": 1, "state": "ready"})
+        coalescer.add({"content_item_id": 2, "state": "ready"})
+        # the timer won't fire for a minute, so only shutdown() can send them
+        coalescer.shutdown()
+        assert len(BatchHandler.batches) == 1
+        assert [u["content_item_id"] for u in BatchHandler.batches[0]] == [1, 2]
+        # updates added after shutdown are sent straight away
+        coalescer.add({"content_item_id": 3, "state": "ready"})
+        assert len(BatchHandler.batches) == 2
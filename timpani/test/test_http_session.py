@@ -0,0 +1,106 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from timpani.util.http_session import TimpaniHttpSession
+from timpani.util.http_session import get_http_session
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """
+    Responds with 503 to the first `failures` requests, then 200.
+    Records the client ports so tests can tell if connections are reused
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    failures = 0
+    requests_seen = 0
+    client_ports = set()
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_seen += 1
+        cls.client_ports.add(self.client_address[1])
+        status = 503 if cls.requests_seen <= cls.failures else 200
+        body = b"ok" if status == 200 else b"unavailable"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpSession(unittest.TestCase):
+    def setUp(self):
+        FlakyHandler.failures = 0
+        FlakyHandler.requests_seen = 0
+        FlakyHandler.client_ports = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_reused(self):
+        session = TimpaniHttpSession()
+        for i in range(5):
+            assert session.get(self.url).ok
+        assert FlakyHandler.requests_seen == 5
+        assert len(FlakyHandler.client_ports) == 1, "expected one kept-alive connection"
+
+    def test_retry_unavailable(self):
+        FlakyHandler.failures = 2
+        session = TimpaniHttpSession(max_retries=3, backoff_factor=0)
+        response = session.get(self.url)
+        assert response.ok
+        assert FlakyHandler.requests_seen == 3
+
+        # when out of retries the last response is returned, not raised
+        FlakyHandler.failures = 10
+        FlakyHandler.requests_seen = 0
+        session = TimpaniHttpSession(max_retries=1, backoff_factor=0)
+        response = session.get(self.url)
+        assert response.status_code == 503
+        assert FlakyHandler.requests_seen == 2
+
+    def test_no_retry_sent_requests(self):
+        FlakyHandler.failures = 2
+        session = TimpaniHttpSession(
+            max_retries=3, backoff_factor=0, retry_sent_requests=False
+        )
+        response = session.get(self.url)
+        assert response.status_code == 503
+        assert FlakyHandler.requests_seen == 1
+
+        # connection failures are still retried
+        retry = session.get_adapter(self.url).max_retries
+        assert retry.connect == 3
+        assert retry.read == 0
+        # the conductor triggers actions from GET requests
+        conductor_retry = (
+            get_http_session("conductor").get_adapter(self.url).max_retries
+        )
+        assert conductor_retry.read == 0
+
+    def test_default_timeout(self):
+        session = TimpaniHttpSession(timeout=(1, 2))
+        sent = {}
+        send = session.get_adapter(self.url).send
+
+        def record_send(request, **kwargs):
+            sent["timeout"] = kwargs["timeout"]
+            return send(request, **kwargs)
+
+        session.get_adapter(self.url).send = record_send
+        session.get(self.url)
+        assert sent["timeout"] == (1, 2)
+        session.get(self.url, timeout=5)
+        assert sent["timeout"] == 5
+
+    def test_shared_by_name(self):
+        assert get_http_session("test_service") is get_http_session("test_service")
+        assert get_http_session("test_service") is not get_http_session("other")
@@ -0,0 +1,40 @@
+import time
+import threading
+import unittest
+from timpani.util.rate_limiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_rate_is_limited(self):
+        limiter = RateLimiter(rate=100, burst=5)
+        start = time.monotonic()
+        # the burst is allowed immediately
+        for i in range(5):
+            assert limiter.acquire() == 0
+        assert time.monotonic() - start < 0.05
+        # then requests are spaced out to the rate
+        for i in range(10):
+            limiter.acquire()
+        assert time.monotonic() - start >= 0.09
+
+    def test_rate_is_shared_between_threads(self):
+        limiter = RateLimiter(rate=200)
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=lambda: [limiter.acquire() for i in range(5)])
+            for t in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 requests at 200 per second, less the first allowed immediately
+        assert time.monotonic() - start >= 19 / 200.0
+
+    def test_shared_by_key(self):
+        limiter = RateLimiter.get_shared("test_shared_key_1", rate=10)
+        assert RateLimiter.get_shared("test_shared_key_1", rate=5) is limiter
+        assert limiter.rate == 10
+        assert RateLimiter.get_shared("test_shared_key_2", rate=10) is not limiter
+        # the key itself is not kept
+        assert "test_shared_key_1" not in RateLimiter.shared_limiters
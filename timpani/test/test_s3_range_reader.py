@@ -0,0 +1,85 @@
+import io
+import threading
+import unittest
+from botocore.exceptions import ClientError
+from timpani.util.s3_range_reader import S3RangeReader
+from timpani.util.s3_range_reader import is_precondition_failed
+
+
+class FakeS3Client(object):
+    """
+    Stands in for a boto3 S3 client holding objects in memory,
+    supporting the ranged requests made by S3RangeReader
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.etags = {key: f'"etag_{key}"' for key in objects}
+        self.requested_ranges = []
+        self.lock = threading.Lock()
+
+    def check_etag(self, Key, IfMatch, operation_name):
+        if IfMatch is not None and IfMatch != self.etags[Key]:
+            raise ClientError(
+                {
+                    "Error": {"Code": "PreconditionFailed"},
+                    "ResponseMetadata": {"HTTPStatusCode": 412},
+                },
+                operation_name,
+            )
+
+    def head_object(self, Bucket, Key, IfMatch=None):
+        self.check_etag(Key, IfMatch, "HeadObject")
+        return {"ContentLength": len(self.objects[Key]), "ETag": self.etags[Key]}
+
+    def get_object(self, Bucket, Key, Range, IfMatch=None):
+        self.check_etag(Key, IfMatch, "GetObject")
+        start, end = Range[len("bytes=") :].split("-")
+        with self.lock:
+            self.requested_ranges.append((int(start), int(end)))
+        return {"Body": io.BytesIO(self.objects[Key][int(start) : int(end) + 1])}
+
+
+class TestS3RangeReader(unittest.TestCase):
+    data = bytes(range(256)) * 40
+
+    def test_read_in_parts(self):
+        client = FakeS3Client({"test.bin": self.data})
+        with S3RangeReader(
+            client, "bucket", "test.bin", part_size=1000, max_workers=3
+        ) as raw:
+            assert io.BufferedReader(raw, buffer_size=300).read() == self.data
+            assert raw.tell() == len(self.data)
+        assert len(client.requested_ranges) == 11
+        assert sorted(client.requested_ranges)[-1] == (10000, len(self.data) - 1)
+
+    def test_read_from_offset(self):
+        client = FakeS3Client({"test.bin": self.data})
+        with S3RangeReader(
+            client, "bucket", "test.bin", start=2500, part_size=1000
+        ) as raw:
+            assert raw.read(10) == self.data[2500:2510]
+            assert io.BufferedReader(raw).read() == self.data[2510:]
+        assert min(start for start, _ in client.requested_ranges) == 2500
+
+    def test_empty_object(self):
+        client = FakeS3Client({"empty.csv": b""})
+        with S3RangeReader(client, "bucket", "empty.csv") as raw:
+            assert raw.read() == b""
+        assert client.requested_ranges == []
+
+    def test_object_replaced_while_reading(self):
+        client = FakeS3Client({"test.bin": self.data})
+        with S3RangeReader(
+            client, "bucket", "test.bin", part_size=1000, max_workers=1
+        ) as raw:
+            raw.read(10)
+            client.etags["test.bin"] = '"etag_replaced"'
+            with self.assertRaises(ClientError) as context:
+                raw.read()
+            assert is_precondition_failed(context.exception)
+
+        # resuming with the etag read before fails
+        with self.assertRaises(ClientError) as context:
+            S3RangeReader(client, "bucket", "test.bin", etag='"etag_test.bin"')
+        assert is_precondition_failed(context.exception)
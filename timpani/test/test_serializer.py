@@ -0,0 +1,94 @@
+import json
+import math
+import datetime
+import unittest
+from timpani.raw_store.item import Item
+from timpani.util.serializer import JsonSerializer
+from timpani.util.serializer import get_serializer
+from timpani.util.serializer import parse_datetime
+from timpani.util.serializer import format_datetime
+
+
+class TestSerializer(unittest.TestCase):
+    test_content = {
+        "id": 118550062,
+        "text": 'café 日本 данные \t\n "quoted"',
+        "nested": {
+            "values": [1, 2.5, None, True],
+            "big": 2**70 + 1,
+            "small": -(2**63) - 1,
+        },
+    }
+
+    def test_serializers_round_trip(self):
+        for name in ["json", "auto"]:
+            serializer = get_serializer(name)
+            encoded = serializer.dumps(self.test_content)
+            assert json.loads(encoded) == self.test_content
+            assert serializer.loads(encoded) == self.test_content
+            # each can read the other's output
+            assert serializer.loads(JsonSerializer().dumps(self.test_content)) == (
+                self.test_content
+            )
+            with self.assertRaises(json.JSONDecodeError):
+                serializer.loads('{"truncated": ')
+            # non-standard constants written by json.dumps
+            decoded = serializer.loads(json.dumps({"nan": math.nan, "inf": math.inf}))
+            assert math.isnan(decoded["nan"])
+            assert decoded["inf"] == math.inf
+            # and are written the same way by every serializer
+            decoded = serializer.loads(serializer.dumps({"nan": math.nan}))
+            assert math.isnan(decoded["nan"])
+
+    def test_parse_datetime_matches_strptime(self):
+        cases = [
+            ("2023-05-01 12:03:04.123456", "%Y-%m-%d %H:%M:%S.%f"),
+            ("2023-05-01 12:03:04.000000", "%Y-%m-%d %H:%M:%S.%f"),
+            ("2023-05-03T06:15:02.000Z", "%Y-%m-%dT%H:%M:%S.%fZ"),
+            ("2023-05-03T06:15:02.5Z", "%Y-%m-%dT%H:%M:%S.%fZ"),
+            ("2023-5-3T6:15:02.000Z", "%Y-%m-%dT%H:%M:%S.%fZ"),
+            ("20230501", "%Y%m%d"),
+            # not supported by the fast parser, passed to strptime
+            ("01 May 2023", "%d %b %Y"),
+        ]
+        for date_string, date_format in cases:
+            assert parse_datetime(date_string, date_format) == (
+                datetime.datetime.strptime(date_string, date_format)
+            ), f"parsed {date_string} differently from strptime"
+
+        for date_string, date_format in [
+            ("2023-05-03T06:15:02.000", "%Y-%m-%dT%H:%M:%S.%fZ"),
+            ("2023-13-03 06:15:02.000", "%Y-%m-%d %H:%M:%S.%f"),
+            ("2023-05-03 06:15:02.0000001", "%Y-%m-%d %H:%M:%S.%f"),
+        ]:
+            with self.assertRaises(ValueError):
+                parse_datetime(date_string, date_format)
+
+    def test_format_datetime(self):
+        date_format = "%Y-%m-%d %H:%M:%S.%f"
+        for value in [
+            datetime.datetime(2023, 5, 1, 12, 3, 4, 123456),
+            datetime.datetime(2023, 5, 1),
+        ]:
+            assert format_datetime(value, date_format) == value.strftime(date_format)
+
+    def test_item_round_trip(self):
+        item = Item(
+            run_id="testrun",
+            workspace_id="testteam",
+            source_id="testsource",
+            query_id="testquery",
+            page_id=None,
+            content_id=None,
+            content=self.test_content,
+        )
+        # items get distinct uuids for missing content ids
+        other = Item("testrun", "testteam", "testsource", "testquery", None, None, {})
+        assert item.content_id != other.content_id
+        item_2 = Item.fromJSON(item.toJSON())
+        assert item_2.content_id == item.content_id
+        assert item_2.created_at == item.created_at
+        assert item_2.content == self.test_content
+        # items don't have a __dict__ to save memory
+        with self.assertRaises(AttributeError):
+            item.extra_field = "not allowed"
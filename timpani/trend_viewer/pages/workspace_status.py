@@ -8,6 +8,7 @@ from timpani.app_cfg import TimpaniAppCfg
 # importing from conductor may break dependencies
 from timpani.workspace_config.workspace_cfg_manager import WorkspaceConfigManager
 from timpani.processing_sequences.workflow_manager import WorkflowManager
+from timpani.util.http_session import get_http_session
 
 
 class StatusView(object):
@@ -53,7 +54,9 @@ class StatusView(object):
             conductor_status_url = (
                 f"{self.cfg.timpani_conductor_api_endpoint}/healthcheck"
             )
-            conductor_status_response = requests.get(conductor_status_url)
+            conductor_status_response = get_http_session("conductor").get(
+                conductor_status_url
+            )
             conductor_status = conductor_status_response.text
         except requests.exceptions.ConnectionError as e:
             conductor_status = e
@@ -103,7 +106,9 @@ class StatusView(object):
             conductor_running_process_url = (
                 f"{self.cfg.timpani_conductor_api_endpoint}/running_processes"
             )
-            running_process_response = requests.get(conductor_running_process_url)
+            running_process_response = get_http_session("conductor").get(
+                conductor_running_process_url
+            )
             st.write(running_process_response.text)
         except requests.exceptions.ConnectionError as e:
             st.text(f"Error contacting conductor:{e}")
@@ -60,7 +60,7 @@ class TestAuth(unittest.TestCase):
         authed = self.model.get_acessible_workspaces()
         assert "test" not in authed, f"authed workspaces: {authed}"
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_private_workspaces_reachable_good_auth(self, mock_response):
         """
         Should be able to see private workspace with apropriately secret
@@ -127,7 +127,7 @@ class TestAuth(unittest.TestCase):
             auth_session_secret="incorrect_secret",
         )
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_set_workspace_unathorize_good_secret_works(self, mock_response):
         """
         setting workspace to protected value with secret should work
@@ -1,6 +1,6 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
+from timpani.util.http_session import get_http_session
 
 
 class TikTokEmbed(object):
@@ -14,7 +14,7 @@ class TikTokEmbed(object):
         # Use TikTok's oEmbed API to fetch html for the video embed
         # https://developers.tiktok.com/doc/embed-videos/
         api = f"https://www.tiktok.com/oembed?url={url}"
-        response = requests.get(api)
+        response = get_http_session("oembed").get(api)
         html = f"fetching {url}"
         if response.ok:
             html = response.json()["html"]
@@ -1,6 +1,6 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
+from timpani.util.http_session import get_http_session
 
 
 class TweetEmbed(object):
@@ -14,7 +14,7 @@ class TweetEmbed(object):
         # Use Twitter's oEmbed API
         # https://dev.twitter.com/web/embedded-tweets
         api = f"https://publish.twitter.com/oembed?url={tweet_url}"
-        response = requests.get(api)
+        response = get_http_session("oembed").get(api)
         html = f"fetching {tweet_url}"
         if response.ok:
             html = response.json()["html"]
@@ -0,0 +1,111 @@
+import atexit
+import json
+import threading
+from timpani.util.http_session import get_http_session
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class CallbackCoalescer(object):
+    """
+    Collects item state update callbacks that would otherwise be sent one
+    request at a time, and sends them together to the conductor's
+    /update_item_states endpoint. A batch is sent when it reaches max_batch_size,
+    or max_delay seconds after the first update was added, whichever comes first.
+    Updates can be added from multiple threads.
+
+    NOTE: because the callback is sent later, errors are logged instead of
+    raised to the caller. Items that fail to update will be retried by the
+    workflow processing after their state timeout. Pending updates are flushed
+    when the interpreter exits, or call shutdown() to flush them sooner
+    """
+
+    def __init__(self, callback_url: str, max_batch_size=50, max_delay=1.0):
+        self.callback_url = callback_url
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.lock = threading.Lock()
+        self.timer = None
+        self.closed = False
+        # the timer thread is a daemon, so it won't send the last batch at exit
+        atexit.register(self.shutdown)
+
+    def add(self, update: dict):
+        """
+        Queue an update (dict with at least content_item_id and state)
+        to be sent with the next batch
+        """
+        batch = None
+        with self.lock:
+            self.pending.append(update)
+            if self.closed or len(self.pending) >= self.max_batch_size:
+                # after shutdown() there is nothing left to send it later
+                batch = self._take_pending()
+            elif self.timer is None:
+                # make sure the updates are sent even if no more arrive
+                self.timer = threading.Timer(self.max_delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if batch is not None:
+            self._send(batch)
+
+    def flush(self):
+        """
+        Send any updates that are pending
+        """
+        with self.lock:
+            batch = self._take_pending()
+        if len(batch) > 0:
+            self._send(batch)
+
+    def shutdown(self):
+        """
+        Send any pending updates, and send updates added after this immediately.
+        Registered to run at exit
+        """
+        with self.lock:
+            self.closed = True
+        self.flush()
+
+    def _take_pending(self):
+        """
+        Internal function to swap out the pending list, must be called with the lock
+        """
+        batch = self.pending
+        self.pending = []
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+
+    def _send(self, batch):
+        """
+        Internal function to post a batch of updates and log any that failed
+        """
+        try:
+            callback_response = get_http_session("conductor").post(
+                self.callback_url,
+                data=json.dumps(batch),
+                headers={
+                    "Content-Type": "application/json",
+                    "User-Agent": "Meedan Timpani/0.1 (Conductor)",  # TODO: cfg should know version
+                },
+            )
+            assert callback_response.ok, (
+                "Unable to process response from Timpani status update"
+                + f" at {self.callback_url} {callback_response.text}"
+            )
+            for result in json.loads(callback_response.text):
+                if result["ok"] is not True:
+                    logging.warning(
+                        "Batched callback for content_item_id"
+                        + f" {result['content_item_id']} failed: {result['error']}"
+                    )
+        except Exception as e:
+            logging.error(
+                f"Unable to send batch of {len(batch)} item state updates"
+                + f" to {self.callback_url}: {e}"
+            )
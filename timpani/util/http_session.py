@@ -0,0 +1,108 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from timpani.app_cfg import TimpaniAppCfg
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class TimpaniHttpSession(requests.Session):
+    """
+    A requests Session that keeps connections to each host open (keep-alive) in a
+    pool so that repeated calls to the same service don't pay for a new TCP and TLS
+    handshake, applies a default timeout to requests that don't set one, and retries
+    connection failures and temporarily unavailable (502, 503, 504) responses
+    with exponential backoff. Non-idempotent requests (i.e. POST) are only retried
+    if the connection failed before the request was sent. For services whose GET
+    requests have side effects, set retry_sent_requests=False so that only
+    connection failures (before anything was sent) are retried.
+    Use get_http_session() to get the shared session instead of creating one
+    """
+
+    RETRY_STATUS_CODES = [502, 503, 504]
+
+    def __init__(
+        self,
+        timeout=None,
+        max_retries: int = None,
+        backoff_factor: float = None,
+        pool_maxsize: int = None,
+        retry_sent_requests: bool = True,
+    ):
+        super().__init__()
+        app_cfg = TimpaniAppCfg()
+        if timeout is None:
+            timeout = (app_cfg.http_connect_timeout, app_cfg.http_read_timeout)
+        if max_retries is None:
+            max_retries = app_cfg.http_max_retries
+        if backoff_factor is None:
+            backoff_factor = app_cfg.http_backoff_factor
+        if pool_maxsize is None:
+            pool_maxsize = app_cfg.http_pool_maxsize
+        self.timeout = timeout
+        if retry_sent_requests:
+            retry = Retry(
+                total=max_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=self.RETRY_STATUS_CODES,
+                # return the last response instead of raising when out of retries,
+                # so callers can check the status as they would without retries
+                raise_on_status=False,
+            )
+        else:
+            # the server may have acted on a request that failed after it was sent
+            retry = Retry(
+                total=max_retries,
+                connect=max_retries,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=backoff_factor,
+                raise_on_status=False,
+            )
+        # one pool of up to pool_maxsize connections for each host
+        adapter = HTTPAdapter(
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+        )
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+# options for the sessions of services that need them, see get_http_session()
+SESSION_OPTIONS = {
+    # conductor endpoints start imports and workflows even when called with GET
+    # (i.e. /import_content?trigger_import=True), so they must not be sent twice
+    "conductor": {"retry_sent_requests": False},
+}
+
+# sessions shared by name within each process, see get_http_session()
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_session(name: str = "default") -> TimpaniHttpSession:
+    """
+    Return the session for making requests to a service (i.e. "alegre" or
+    "conductor"), which is shared by everything in the process using the same name
+    so that connections are reused. Sessions are not shared with forked processes.
+    Some services have their own session options, see SESSION_OPTIONS
+    """
+    key = (name, os.getpid())
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            logging.debug(f"Creating http session {name}")
+            session = TimpaniHttpSession(**SESSION_OPTIONS.get(name, {}))
+            _sessions[key] = session
+        return session
@@ -4,10 +4,10 @@ If a session is logged into Check and which workspaces it has access to.
 """
 
 import argparse
-import requests
 import json
 from timpani.workspace_config.workspace_cfg_manager import WorkspaceConfigManager
 from timpani.app_cfg import TimpaniAppCfg
+from timpani.util.http_session import get_http_session
 
 import timpani.util.timpani_logger
 
@@ -145,7 +145,7 @@ class CheckAPISessionAuth(object):
             session_cookie_name = "_checkdesk_session_qa"
 
         data = {"query": query}
-        response = requests.post(
+        response = get_http_session("check").post(
             self.CHECK_GRAPHQL_BASE_URL + "/api/graphql",
             data=json.dumps(data),
             headers={
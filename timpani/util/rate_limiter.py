@@ -0,0 +1,67 @@
+import time
+import hashlib
+import threading
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class RateLimiter(object):
+    """
+    Token bucket limiting how often requests can be made to an API, shared
+    by all of the threads that call acquire() before making a request.
+    Allows a burst of up to `burst` requests, after which requests are spaced
+    out to an average of `rate` per second.
+
+    Because APIs usually limit requests per key, get_shared() returns the same
+    limiter for everything that uses the same key in this process
+    """
+
+    # limiters shared by key, see get_shared()
+    shared_limiters = {}
+    shared_limiters_lock = threading.Lock()
+
+    def __init__(self, rate: float, burst: int = 1):
+        assert rate > 0, f"rate must be positive, not {rate}"
+        assert burst >= 1, f"burst must be at least 1, not {burst}"
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request can be made, returns the number of seconds waited
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.last_refill) * self.rate
+                )
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            # sleep outside of the lock so other threads can check too
+            time.sleep(delay)
+            waited += delay
+
+    @classmethod
+    def get_shared(cls, key: str, rate: float, burst: int = 1):
+        """
+        Return the limiter shared by everything using key (i.e. an api key,
+        which is hashed so that it isn't kept around), creating it if needed.
+        The rate and burst of an existing limiter are not changed
+        """
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        with cls.shared_limiters_lock:
+            limiter = cls.shared_limiters.get(key_hash)
+            if limiter is None:
+                limiter = cls(rate, burst)
+                cls.shared_limiters[key_hash] = limiter
+            return limiter
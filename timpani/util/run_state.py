@@ -2,6 +2,7 @@ import datetime
 from datetime import timezone
 import uuid
 import json
+import threading
 from timpani.util.state_model import StateModel
 
 import timpani.util.timpani_logger
@@ -32,10 +33,15 @@ class RunState(StateModel):
         STATE_FAILED: [STATE_RUNNING],  # for restarts
     }
 
-    def __init__(self, job_type, date_id: datetime.datetime = None):
+    # guards the checkpoints, which may be recorded by several threads
+    progress_lock = threading.Lock()
+
+    def __init__(self, job_type, date_id: datetime.datetime = None, run_id=None):
         self.job_type = job_type
         self.current_state = self.STATE_READY
-        self.run_id = "run_" + uuid.uuid4().hex
+        if run_id is None:
+            run_id = "run_" + uuid.uuid4().hex
+        self.run_id = run_id
         self.attempt_id = None
         self.attempt_num = 0
         self.attempt_start = None
@@ -54,6 +60,10 @@ class RunState(StateModel):
             self.date_id = date_id
         self.time_range_start = datetime.datetime.strptime(self.date_id, "%Y%m%d")
         self.time_range_end = self.time_range_start + datetime.timedelta(days=1)
+        # results of the individual queries of the run, by query_id
+        self.query_results = {}
+        # progress of the parts of the run, by checkpoint key (see record_progress())
+        self.checkpoints = {}
 
     def transitionTo(self, target_state: str):
         # call validation code in super class to do the transition
@@ -101,9 +111,40 @@ class RunState(StateModel):
 
         self.transitionTo(self.STATE_RUNNING)
 
-    # TODO: add record_progress() functionality to be able to resume partially completed runs?
+    def record_query_result(
+        self, query_id: str, state: str, num_items: int = 0, error: str = None
+    ):
+        """
+        Record the outcome (STATE_COMPLETED or STATE_FAILED) of one of the queries
+        of the run, and how many items it acquired
+        """
+        self.query_results[query_id] = {
+            "state": state,
+            "num_items": num_items,
+            "error": error,
+        }
+
+    def record_progress(self, checkpoint_key: str, **progress):
+        """
+        Record how far a part of the run (i.e. a query, or a time bin of a query)
+        has got, so that if the run fails a retry with the same run_id can resume
+        from the checkpoint instead of starting again. The progress values must
+        be json serializable, and replace any previously recorded for the key
+        """
+        with self.progress_lock:
+            self.checkpoints[checkpoint_key] = progress
+
+    def get_progress(self, checkpoint_key: str):
+        """
+        Returns the progress last recorded for the checkpoint key, or None
+        """
+        with self.progress_lock:
+            progress = self.checkpoints.get(checkpoint_key)
+            return dict(progress) if progress is not None else None
 
     def to_json(self):
+        with self.progress_lock:
+            checkpoints = {key: dict(value) for key, value in self.checkpoints.items()}
         return json.dumps(
             {
                 "job_type": self.job_type,
@@ -130,5 +171,37 @@ class RunState(StateModel):
                 "time_range_end": self.time_range_end.strftime(self.DATE_FORMAT)
                 if self.time_range_end
                 else self.time_range_end,
+                "query_results": self.query_results,
+                "checkpoints": checkpoints,
             }
         )
+
+    @classmethod
+    def from_json(cls, json_str: str):
+        """
+        Recreate a run state that was recorded with to_json(), i.e. to resume
+        the run from its checkpoints
+        """
+        obj = json.loads(json_str)
+
+        def parse_time(value):
+            if value is None:
+                return None
+            return datetime.datetime.strptime(value, cls.DATE_FORMAT)
+
+        run_state = cls(obj["job_type"], date_id=obj["date_id"], run_id=obj["run_id"])
+        run_state.current_state = obj["current_state"]
+        run_state.attempt_id = obj["attempt_id"]
+        run_state.attempt_num = obj["attempt_num"]
+        run_state.attempt_start = parse_time(obj["attempt_start"])
+        run_state.attempt_end = parse_time(obj["attempt_end"])
+        run_state.transition_timestamp = parse_time(obj["transition_timestamp"])
+        run_state.workspace_id = obj["workspace_id"]
+        run_state.source_name = obj["source_id"]
+        run_state.query_id = obj["query_id"]
+        run_state.time_range_start = parse_time(obj["time_range_start"])
+        run_state.time_range_end = parse_time(obj["time_range_end"])
+        # states recorded before these were tracked won't have them
+        run_state.query_results = obj.get("query_results", {})
+        run_state.checkpoints = obj.get("checkpoints", {})
+        return run_state
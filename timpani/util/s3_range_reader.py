@@ -0,0 +1,140 @@
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from timpani.app_cfg import TimpaniAppCfg
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Readable (binary) file object streaming an S3 object with ranged GET requests
+    of part_size bytes, so that large objects can be processed as they arrive
+    without being downloaded to local disk. Up to max_workers parts are requested
+    ahead in parallel, but are returned in order. Reading can start part way
+    into the object (i.e. to resume), and the parts are requested with the ETag
+    of the object so reading fails if the object is replaced while being read.
+    When resuming, pass the ETag of the object that was read before, so that
+    opening it fails (see is_precondition_failed()) if it has since been replaced.
+    Wrap in io.BufferedReader (or GzipFile) for line by line reading:
+    ```
+    with S3RangeReader(s3_client, bucket_name, key) as raw:
+        for line in io.BufferedReader(raw):
+            ...
+    ```
+    """
+
+    cfg = TimpaniAppCfg()
+
+    def __init__(
+        self,
+        s3_client,
+        bucket_name: str,
+        key: str,
+        start: int = 0,
+        part_size: int = None,
+        max_workers: int = None,
+        etag: str = None,
+    ):
+        super().__init__()
+        if part_size is None:
+            part_size = self.cfg.s3_csv_read_part_bytes
+        if max_workers is None:
+            max_workers = self.cfg.s3_csv_read_workers
+        assert part_size > 0, f"part_size must be positive, not {part_size}"
+        assert max_workers >= 1, f"max_workers must be at least 1, not {max_workers}"
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.part_size = part_size
+        self.max_workers = max_workers
+        if etag is None:
+            head = s3_client.head_object(Bucket=bucket_name, Key=key)
+        else:
+            head = s3_client.head_object(Bucket=bucket_name, Key=key, IfMatch=etag)
+        self.size = head["ContentLength"]
+        self.etag = head["ETag"]
+        self.position = start  # of the next byte to be read
+        self.next_part_start = start  # of the next part to be requested
+        self.part = b""
+        self.part_offset = 0
+        self.pending_parts = deque()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        logging.debug(
+            f"Streaming {self.size} byte S3 object {bucket_name}/{key} from {start}"
+        )
+        self._request_parts()
+
+    def _fetch_part(self, start: int, end: int):
+        """
+        Internal function to request the bytes from start to end (inclusive)
+        """
+        response = self.s3_client.get_object(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            Range=f"bytes={start}-{end}",
+            IfMatch=self.etag,
+        )
+        body = response["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def _request_parts(self):
+        """
+        Internal function to keep max_workers parts requested ahead of reading
+        """
+        while (
+            len(self.pending_parts) < self.max_workers
+            and self.next_part_start < self.size
+        ):
+            end = min(self.next_part_start + self.part_size, self.size) - 1
+            self.pending_parts.append(
+                self.pool.submit(self._fetch_part, self.next_part_start, end)
+            )
+            self.next_part_start = end + 1
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.part_offset >= len(self.part):
+            if len(self.pending_parts) == 0:
+                return 0  # end of the object
+            self.part = self.pending_parts.popleft().result()
+            self.part_offset = 0
+            self._request_parts()
+        num_bytes = min(len(buffer), len(self.part) - self.part_offset)
+        buffer[:num_bytes] = self.part[self.part_offset : self.part_offset + num_bytes]
+        self.part_offset += num_bytes
+        self.position += num_bytes
+        return num_bytes
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        if not self.closed:
+            # don't wait for parts that won't be read
+            for future in self.pending_parts:
+                future.cancel()
+            self.pending_parts.clear()
+            self.pool.shutdown(wait=False)
+        super().close()
+
+
+def is_precondition_failed(error: Exception) -> bool:
+    """
+    Returns True if the error is the response to a request made with an IfMatch
+    ETag that no longer matches the object
+    """
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get("Error", {}).get("Code")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    # HEAD responses have no body, so only have the status code
+    return code in ["PreconditionFailed", "412"] or status == 412
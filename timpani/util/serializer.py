@@ -0,0 +1,191 @@
+import re
+import json
+import math
+import datetime
+import functools
+from timpani.app_cfg import TimpaniAppCfg
+
+import timpani.util.timpani_logger
+
+logging = timpani.util.timpani_logger.get_logger()
+
+
+class JsonSerializer(object):
+    """
+    Encodes and decodes the json of raw content items, which happens for every
+    line of every raw store chunk that is acquired or imported.
+    This default implementation uses the standard library json module
+    """
+
+    name = "json"
+
+    def dumps(self, obj) -> str:
+        return json.dumps(obj)
+
+    def loads(self, json_string):
+        return json.loads(json_string)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """
+    Uses the orjson package, which is several times faster than the standard
+    library for the large nested dicts of raw content. The output is compact and
+    not ascii escaped (so it is not byte-identical to json.dumps) but decodes to
+    the same values.
+    orjson can't encode integers larger than 64 bits and writes NaN and Infinity
+    floats as null, so objects containing either are encoded with the standard
+    library instead (which writes the non-standard NaN and Infinity constants,
+    same as JsonSerializer).
+    orjson rejects those constants when decoding, and silently decodes integers
+    larger than 64 bits as floats, so json containing either is decoded again
+    with the standard library. Only the decoded floats are checked, rather than
+    searching every line for long numbers
+    """
+
+    name = "orjson"
+    # integers from here on don't fit in 64 bits and are decoded as floats by orjson
+    INT_LIMIT = 2.0**63
+
+    def __init__(self):
+        # only import if needed so orjson is not required
+        import orjson
+
+        self.orjson = orjson
+
+    def dumps(self, obj) -> str:
+        try:
+            json_bytes = self.orjson.dumps(obj, option=self.orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return json.dumps(obj)
+        if self._any_float(obj, lambda value: not math.isfinite(value)):
+            return json.dumps(obj)
+        return json_bytes.decode("utf-8")
+
+    def loads(self, json_string):
+        try:
+            obj = self.orjson.loads(json_string)
+        except self.orjson.JSONDecodeError:
+            # i.e. NaN or Infinity, which raises a json.JSONDecodeError if it
+            # really is invalid
+            return json.loads(json_string)
+        if self._any_float(obj, self._is_big_int):
+            return json.loads(json_string)
+        return obj
+
+    def _is_big_int(self, value: float) -> bool:
+        """
+        Internal function to check if a decoded float may have been an integer
+        too large for orjson (a float literal this large is just decoded again)
+        """
+        return (value >= self.INT_LIMIT or value <= -self.INT_LIMIT) and (
+            value.is_integer()
+        )
+
+    @staticmethod
+    def _any_float(obj, check) -> bool:
+        """
+        Internal function to check if any float in the dicts and lists of obj
+        passes the check, without recursion
+        """
+        stack = [obj]
+        while len(stack) > 0:
+            value = stack.pop()
+            value_type = type(value)
+            if value_type is dict:
+                stack.extend(value.values())
+            elif value_type is list or value_type is tuple:
+                stack.extend(value)
+            elif value_type is float and check(value):
+                return True
+        return False
+
+
+SERIALIZERS = {
+    JsonSerializer.name: JsonSerializer,
+    OrjsonSerializer.name: OrjsonSerializer,
+}
+
+
+def get_serializer(name: str = None) -> JsonSerializer:
+    """
+    Returns the json serializer with the name, default from config. The default
+    "auto" uses orjson if it is installed and otherwise the standard library
+    """
+    if name is None:
+        name = TimpaniAppCfg().json_serializer
+    if name == "auto":
+        try:
+            return OrjsonSerializer()
+        except ImportError:
+            return JsonSerializer()
+    assert name in SERIALIZERS, f"Unknown json serializer {name}"
+    return SERIALIZERS[name]()
+
+
+# regular expressions matching the strptime directives supported by the fast parser
+# NOTE: %f matches up to 6 digits, which are right padded with zeros
+DATE_DIRECTIVES = {
+    "%Y": ("year", r"(\d{4})"),
+    "%m": ("month", r"(\d{1,2})"),
+    "%d": ("day", r"(\d{1,2})"),
+    "%H": ("hour", r"(\d{1,2})"),
+    "%M": ("minute", r"(\d{1,2})"),
+    "%S": ("second", r"(\d{1,2})"),
+    "%f": ("microsecond", r"(\d{1,6})"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_date_format(date_format: str):
+    """
+    Internal function to translate a strptime format into a compiled regular
+    expression and the datetime fields of its groups. Returns None if the format
+    uses directives that are not supported, so that strptime should be used
+    """
+    pattern = ""
+    fields = []
+    for part in re.split(r"(%.)", date_format):
+        if part.startswith("%") and len(part) == 2:
+            if part not in DATE_DIRECTIVES:
+                return None
+            field, regex = DATE_DIRECTIVES[part]
+            fields.append(field)
+            pattern += regex
+        else:
+            pattern += re.escape(part)
+    return re.compile(pattern + r"\Z"), fields
+
+
+def parse_datetime(date_string: str, date_format: str) -> datetime.datetime:
+    """
+    Equivalent to datetime.datetime.strptime(date_string, date_format) but much
+    faster for the fixed, numeric formats used for raw item timestamps, because
+    the format is only interpreted once. Strings that don't match the format are
+    passed to strptime so that the same errors are raised
+    """
+    compiled = _compile_date_format(date_format)
+    if compiled is not None:
+        regex, fields = compiled
+        match = regex.match(date_string)
+        if match is not None:
+            values = {}
+            for field, value in zip(fields, match.groups()):
+                if field == "microsecond":
+                    value = value.ljust(6, "0")
+                values[field] = int(value)
+            try:
+                return datetime.datetime(**values)
+            except ValueError:
+                # out of range (i.e. month 13), let strptime raise its error
+                pass
+    return datetime.datetime.strptime(date_string, date_format)
+
+
+def format_datetime(value: datetime.datetime, date_format: str) -> str:
+    """
+    Equivalent to value.strftime(date_format), with a faster path for the
+    "%Y-%m-%d %H:%M:%S.%f" format of raw item timestamps
+    """
+    if date_format == "%Y-%m-%d %H:%M:%S.%f" and value.tzinfo is None:
+        return value.isoformat(sep=" ", timespec="microseconds")
+    return value.strftime(date_format)
@@ -1,6 +1,7 @@
-import requests
+from typing import List
 import datetime
 import json
+from concurrent.futures import ThreadPoolExecutor
 from collections import namedtuple
 
 from timpani.app_cfg import TimpaniAppCfg
@@ -16,6 +17,8 @@ from timpani.model_service.paraphrase_multilingual_vectorization_alegre_wrapper
 )
 
 from timpani.util.metrics_exporter import TelemetryMeterExporter
+from timpani.util.http_session import get_http_session
+
 import timpani.util.timpani_logger
 
 logging = timpani.util.timpani_logger.get_logger()
@@ -53,7 +56,7 @@ class AlegreVectorStoreService(object):
         Confirm that we are able to connect to Alegre service
         """
         healthcheck_url = self.app_cfg.alegre_api_endpoint + "/healthcheck"
-        response = requests.get(healthcheck_url)
+        response = get_http_session("alegre").get(healthcheck_url)
         assert (
             response.ok
         ), f"Unable to process response from Alegre service at {healthcheck_url}: {response} : {response.text}"
@@ -94,7 +97,7 @@ class AlegreVectorStoreService(object):
         ).get_context()
         get_url = self.app_cfg.alegre_api_endpoint + "/text/similarity/search/"
         logging.debug(f"requesting similar item from Alegre {get_url}")
-        response = requests.post(
+        response = get_http_session("alegre").post(
             get_url,
             json=query_blob,
             headers={
@@ -154,7 +157,7 @@ class AlegreVectorStoreService(object):
             f"requesting vector delete for content item {item.content_item_id}"
         )
         delete_url = self.app_cfg.alegre_api_endpoint + "/text/similarity/"
-        response = requests.delete(
+        response = get_http_session("alegre").delete(
             delete_url,
             data=json.dumps(
                 {
@@ -177,6 +180,32 @@ class AlegreVectorStoreService(object):
                 response.ok
             ), f"Unable to process response from Alegre service at {delete_url} {response.text}"
 
+    def discard_vectors_for_content_items(
+        self, items: List[ContentItem], max_workers=10
+    ):
+        """
+        Ask the alegre server to delete the vectors for a batch of content items,
+        sending up to `max_workers` delete requests concurrently (alegre does not
+        have a batch delete). Returns the list of items whose vectors were discarded,
+        failures are logged so the caller can decide whether to retry them
+        """
+
+        def discard(item):
+            try:
+                self.discard_vector_for_content_item(item)
+                return True
+            except Exception as e:
+                logging.error(
+                    f"Unable to discard vector for content item {item.content_item_id}: {e}"
+                )
+                return False
+
+        if len(items) == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+            discarded = list(pool.map(discard, items))
+        return [item for item, ok in zip(items, discarded) if ok]
+
     def discard_workspace(self, workspace_id):
         """
         Loop over all the items in an workspace and discard them (probably slow, mostly used for deleting tests)